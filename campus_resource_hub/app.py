@@ -16,7 +16,7 @@ except ImportError:
     pass  # python-dotenv not installed, use system env vars
 
 from src.config import config
-from src.extensions import db, login_manager, csrf_protect, bcrypt
+from src.extensions import db, login_manager, csrf_protect
 
 
 def create_app(config_name=None):
@@ -51,7 +51,6 @@ def create_app(config_name=None):
     db.init_app(app)
     login_manager.init_app(app)
     csrf_protect.init_app(app)
-    bcrypt.init_app(app)
     
     # Explicitly make csrf_token available in templates
     # Flask-WTF should do this automatically, but we'll make sure
@@ -71,8 +70,20 @@ def create_app(config_name=None):
     from src.services.email_service import email_service
     email_service.init_app(app)
     
+    # Configure password hashing
+    from src.services.password_hasher import password_hasher
+    password_hasher.init_app(app)
+    
+    # Configure the Flask-Login identity cache
+    from src.services.user_identity import user_identities
+    user_identities.init_app(app)
+    
+    # Configure the rendered review fragment cache
+    from src.services.review_fragments import review_fragments
+    review_fragments.init_app(app)
+    
     # Import models to register them with SQLAlchemy
-    from src.models import User, Resource, Booking, Message, Review
+    from src.models import User, Resource, Booking, Message, Review, EmailOutbox, PendingDigestItem
     
     # Register main routes (must be before blueprints for consistency)
     _register_main_routes(app)
@@ -87,9 +98,42 @@ def create_app(config_name=None):
     with app.app_context():
         db.create_all()
     
+    # Configure background workers (started by the server entry points only)
+    from src.services.email_outbox import outbox_worker
+    from src.services.email_digest import digest_scheduler
+    from src.services.reminder_scheduler import reminder_scheduler
+    from src.services.notification_retention import notification_retention
+    outbox_worker.init_app(app)
+    digest_scheduler.init_app(app)
+    reminder_scheduler.init_app(app)
+    notification_retention.init_app(app)
+    
     return app
 
 
+def start_background_workers(app):
+    """
+    Start the outbox, digest, reminder and retention threads enabled in config.
+    
+    Called by the serving entry points (serve.py, run.py, python app.py and the
+    gunicorn post_worker_init hook in gunicorn.conf.py), not by create_app, so
+    scripts that import the app (migrations, seeding) never run them.
+    """
+    from src.services.email_outbox import outbox_worker
+    from src.services.email_digest import digest_scheduler
+    from src.services.reminder_scheduler import reminder_scheduler
+    from src.services.notification_retention import notification_retention
+    
+    if app.config.get('EMAIL_USE_OUTBOX') and app.config.get('EMAIL_OUTBOX_AUTOSTART'):
+        outbox_worker.start()
+    if app.config.get('EMAIL_DIGEST_AUTOSTART'):
+        digest_scheduler.start()
+    if app.config.get('BOOKING_REMINDER_AUTOSTART'):
+        reminder_scheduler.start()
+    if app.config.get('NOTIFICATION_RETENTION_AUTOSTART'):
+        notification_retention.start()
+
+
 def _register_blueprints(app):
     """Register all Flask blueprints."""
     from src.controllers import auth, resources, bookings, messages, reviews, admin, staff
@@ -128,6 +172,20 @@ def _register_error_handlers(app):
         # For regular page requests, show a proper error page
         return render_template('error.html', error=f"Page not found: {request.path}"), 404
     
+    @app.errorhandler(503)
+    def service_unavailable_error(error):
+        """Handle 503 errors (e.g. a full password hashing queue)."""
+        db.session.rollback()
+        # Return JSON for API, fetch, and JSON-expecting requests; HTML otherwise
+        is_json_request = request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
+        is_api_request = request.path.startswith('/api/')
+        is_fetch_request = request.headers.get('Content-Type', '').startswith('application/json')
+        
+        headers = {'Retry-After': str(getattr(error, 'retry_after', None) or 5)}
+        if is_json_request or is_api_request or is_fetch_request:
+            return {"error": error.description}, 503, headers
+        return render_template('error.html', error=error.description), 503, headers
+    
     @app.errorhandler(500)
     def internal_error(error):
         """Handle 500 errors."""
@@ -172,4 +230,5 @@ app = create_app()
 
 if __name__ == '__main__':
     print("Starting Flask...")
+    start_background_workers(app)
     app.run(debug=False, host='127.0.0.1', port=5001)
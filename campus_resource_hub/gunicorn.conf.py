@@ -0,0 +1,10 @@
+"""
+Gunicorn configuration for Campus Resource Hub.
+Loaded automatically when gunicorn runs from this directory.
+"""
+
+
+def post_worker_init(worker):
+    """Start the background threads in each worker after it has forked."""
+    from app import app, start_background_workers
+    start_background_workers(app)
@@ -13,8 +13,9 @@ print("=" * 60)
 
 try:
     print("Importing app...")
-    from app import app
+    from app import app, start_background_workers
     print("✓ App imported successfully")
+    start_background_workers(app)
     
     print("Server URL: http://127.0.0.1:5000")
     print("Press CTRL+C to stop")
@@ -0,0 +1,66 @@
+"""
+Measure SMTP throughput against the local sink.
+Compares opening a connection per message with the pooled backend, and
+reports messages per second for each.
+
+Requires aiosmtpd (pip install aiosmtpd).
+
+Usage:
+    python scripts/benchmark_smtp.py [--messages 500] [--threads 4]
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.smtp_sink import SMTPSink
+from src.services.smtp_backend import SMTPBackend, SMTPConnectionPool
+
+
+def _run(label, send_one, count, threads):
+    """Send count messages on a thread pool and print the rate."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(send_one, range(count)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count / elapsed:>8.1f} msg/s  ({elapsed:.2f}s)")
+    return count / elapsed
+
+
+def benchmark(count: int, threads: int):
+    """Run both strategies against a fresh sink."""
+    with SMTPSink() as sink:
+        backend = SMTPBackend(
+            SMTPConnectionPool(sink.host, sink.port, use_tls=False, pool_size=threads),
+            'noreply@campus-hub.local'
+        )
+
+        def per_message(i):
+            message = backend.build_message('student@iu.edu', f'Booking {i}', 'Body')
+            with smtplib.SMTP(sink.host, sink.port) as conn:
+                conn.send_message(message)
+
+        def pooled(i):
+            backend.send('student@iu.edu', f'Booking {i}', 'Body')
+
+        baseline = _run('Connection per message', per_message, count, threads)
+        sessions_before = sink.sessions
+        rate = _run(f'Pooled ({threads} connections)', pooled, count, threads)
+        backend.close()
+
+        print(f"\nSpeedup: {rate / baseline:.1f}x, "
+              f"SMTP sessions for pooled run: {sink.sessions - sessions_before}")
+        print(f"Messages received: {len(sink.messages)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark SMTP delivery throughput.')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    benchmark(args.messages, args.threads)
@@ -0,0 +1,125 @@
+"""
+Apply schema migrations to an existing database.
+db.create_all() only creates missing tables, so indexes and columns added to
+the models after a database was first created must be applied here. Every
+step is idempotent and safe to run repeatedly.
+
+Usage:
+    python scripts/migrate_db.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+
+
+def add_missing_columns():
+    """Add columns declared on the models that are missing from existing tables."""
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable and column.server_default is not None:
+                ddl += " NOT NULL"
+            db.session.execute(db.text(ddl))
+
+
+def create_missing_indexes():
+    """Create indexes declared on the models that are missing from the database."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def drop_superseded_indexes():
+    """Drop indexes replaced by wider ones declared on the models."""
+    for name in SUPERSEDED_INDEXES:
+        db.session.execute(db.text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def backfill_conversation_keys():
+    """Fill messages.conversation_key for messages created before the column existed."""
+    from src.data_access.message_dal import MessageDAL
+    MessageDAL.backfill_conversation_keys()
+
+
+def backfill_conversations():
+    """Build the conversations read model from existing messages."""
+    from src.data_access.conversation_dal import ConversationDAL
+    from src.models import Conversation
+    if Conversation.query.first() is None:
+        ConversationDAL.rebuild_all()
+
+
+def create_message_search_index():
+    """Create the messages full-text search index and fill it from existing messages."""
+    from src.models.models import MESSAGE_SEARCH_DDL
+    if db.engine.dialect.name != 'sqlite':
+        return
+    exists = db.session.execute(db.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    )).first()
+    for statement in MESSAGE_SEARCH_DDL:
+        db.session.execute(db.text(statement))
+    if not exists:
+        db.session.execute(db.text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def backfill_review_stats():
+    """Build resource_review_stats from existing reviews."""
+    from src.data_access.review_dal import ReviewDAL
+    from src.models import ResourceReviewStats
+    if ResourceReviewStats.query.first() is None:
+        ReviewDAL.rebuild_review_stats()
+
+
+def migrate_review_flags():
+    """Move legacy flagged_by/flag_reason flags into review_flags."""
+    from src.data_access.review_dal import ReviewDAL
+    ReviewDAL.migrate_legacy_flags()
+
+
+# Indexes whose columns are a prefix of a newer index
+SUPERSEDED_INDEXES = [
+    'ix_notifications_user_read_created',  # Now ix_notifications_user_state
+]
+
+# Ordered list of migration steps
+MIGRATIONS = [
+    add_missing_columns,
+    backfill_conversation_keys,  # Before indexing, so the new index is built once
+    create_missing_indexes,
+    drop_superseded_indexes,
+    backfill_conversations,
+    create_message_search_index,
+    backfill_review_stats,
+    migrate_review_flags,
+]
+
+
+def run_migrations():
+    """Create missing tables, then apply each migration step in order."""
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for migration in MIGRATIONS:
+            migration()
+            db.session.commit()
+            print(f"✓ {migration.__doc__.strip()}")
+
+
+if __name__ == '__main__':
+    print("Migrating database...")
+    run_migrations()
+    print("\n✅ Database migration complete!")
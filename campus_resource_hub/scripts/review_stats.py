@@ -0,0 +1,42 @@
+"""
+Verify (and optionally rebuild) the resource_review_stats aggregates.
+Compares the stats maintained on every review write against a GROUP BY over
+the reviews table and reports any resource whose stats have drifted.
+
+Usage:
+    python scripts/review_stats.py            # verify only; exit status 1 on drift
+    python scripts/review_stats.py --rebuild  # recompute every row from the reviews
+"""
+import argparse
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from src.data_access.review_dal import ReviewDAL
+
+
+def main(rebuild=False):
+    """Verify the stats, rebuilding them first if requested. Returns the exit status."""
+    app = create_app()
+    with app.app_context():
+        if rebuild:
+            count = ReviewDAL.rebuild_review_stats()
+            print(f"✓ Rebuilt review stats for {count} resources")
+
+        mismatched = ReviewDAL.verify_review_stats()
+        if mismatched:
+            print(f"✗ Review stats out of date for resources: {', '.join(map(str, mismatched))}")
+            print("  Run with --rebuild to recompute them.")
+            return 1
+        print("✓ Review stats match the reviews table")
+        return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify or rebuild resource review stats.')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute all stats from the reviews table')
+    args = parser.parse_args()
+    sys.exit(main(args.rebuild))
@@ -0,0 +1,102 @@
+"""
+Local SMTP sink for development and integration tests.
+Accepts mail on localhost and keeps it in memory (and prints it when run as a
+script) so the real SMTP backend can be exercised without an external server.
+
+Requires aiosmtpd (pip install aiosmtpd).
+
+Usage:
+    python scripts/smtp_sink.py [--port 8025]
+
+Then run the app with EMAIL_SIMULATE_MODE=False, MAIL_SERVER=localhost,
+MAIL_PORT=8025 and MAIL_USE_TLS=false.
+"""
+import argparse
+import threading
+import time
+from email import message_from_bytes
+from email.policy import default as default_policy
+
+
+class SMTPSink:
+    """
+    In-process SMTP server that records every message it receives.
+
+    Usable as a context manager:
+
+        with SMTPSink() as sink:
+            ...send to sink.host:sink.port...
+            assert sink.messages
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, echo: bool = False):
+        self.host = host
+        self.port = port
+        self.echo = echo
+        self.messages = []
+        self.sessions = 0
+        self._lock = threading.Lock()
+        self._controller = None
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        """Count new SMTP sessions (one per client connection)."""
+        with self._lock:
+            self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        """Store the parsed message."""
+        message = message_from_bytes(envelope.content, policy=default_policy)
+        with self._lock:
+            self.messages.append(message)
+        if self.echo:
+            print(f"[{time.strftime('%H:%M:%S')}] {envelope.mail_from} -> "
+                  f"{', '.join(envelope.rcpt_tos)}: {message['Subject']}")
+        return '250 Message accepted for delivery'
+
+    def start(self) -> 'SMTPSink':
+        """Start the server on a background thread."""
+        from aiosmtpd.controller import Controller
+
+        port = self.port or _free_port(self.host)
+        self._controller = Controller(self, hostname=self.host, port=port)
+        self._controller.start()
+        self.port = port
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._controller:
+            self._controller.stop()
+            self._controller = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def _free_port(host: str) -> int:
+    """Ask the OS for an unused TCP port."""
+    import socket
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local SMTP sink.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, echo=True).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sink.stop()
+        print(f"\nReceived {len(sink.messages)} message(s)")
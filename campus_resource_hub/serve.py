@@ -3,7 +3,8 @@
 import os
 import sys
 from pathlib import Path
-from wsgiref.simple_server import make_server
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer
 import logging
 
 # Load environment variables from .env file BEFORE importing app
@@ -22,7 +23,12 @@ logging.basicConfig(level=logging.DEBUG)
 os.environ['FLASK_ENV'] = 'development'
 
 # Import app
-from app import app
+from app import app, start_background_workers
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """WSGI server that handles each request in its own thread (needed for SSE streams)."""
+    daemon_threads = True
 
 # Disable template caching for development
 app.config['TEMPLATES_AUTO_RELOAD'] = True
@@ -37,8 +43,10 @@ if __name__ == '__main__':
     sys.stdout.flush()
     
     try:
+        start_background_workers(app)
+        
         # Create WSGI server
-        server = make_server('127.0.0.1', 5000, app)
+        server = make_server('127.0.0.1', 5000, app, server_class=ThreadingWSGIServer)
         print(f"✓ Server listening on http://127.0.0.1:5000", flush=True)
         print(f"✓ Visit http://127.0.0.1:5000/resources to access the app\n", flush=True)
         sys.stdout.flush()
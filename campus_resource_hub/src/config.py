@@ -26,6 +26,66 @@ class Config:
     # Email configuration
     EMAIL_SIMULATE_MODE = True  # Set to False to use real email service
     EMAIL_NOTIFICATIONS_ENABLED = True  # Enable/disable email notifications
+    EMAIL_BASE_URL = os.environ.get('EMAIL_BASE_URL') or 'http://localhost:5000'  # Link prefix in email templates
+    
+    # Email outbox (asynchronous delivery with retry)
+    EMAIL_USE_OUTBOX = True  # Queue emails in the request transaction instead of sending inline
+    EMAIL_OUTBOX_AUTOSTART = True  # Start the background delivery workers with the server
+    EMAIL_OUTBOX_WORKERS = 2  # Delivery threads
+    EMAIL_OUTBOX_POLL_INTERVAL = 5  # Seconds between polls when idle
+    EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Attempts before an email is dead-lettered
+    EMAIL_OUTBOX_BACKOFF_BASE = 30  # Seconds before the first retry (doubles per attempt)
+    EMAIL_OUTBOX_BACKOFF_MAX = 3600  # Longest delay between retries
+    
+    # Email digests (users on hourly/daily delivery)
+    EMAIL_DIGEST_AUTOSTART = True  # Start the digest scheduler with the server
+    EMAIL_DIGEST_POLL_INTERVAL = 60  # Seconds between checks for closed digest windows
+    EMAIL_DIGEST_DAILY_HOUR = 7  # Hour (UTC) at which daily digests are sent
+    
+    # Booking reminders (materialized once per booking by a scheduler)
+    BOOKING_REMINDER_AUTOSTART = True  # Start the reminder scheduler with the server
+    BOOKING_REMINDER_HOURS = 24  # Remind this many hours before a booking starts
+    BOOKING_REMINDER_POLL_INTERVAL = 300  # Seconds between scans for due reminders
+    
+    # Notification retention (keeps the hot notifications table small)
+    NOTIFICATION_RETENTION_AUTOSTART = True  # Start the retention thread with the server
+    NOTIFICATION_RETENTION_DAYS = 30  # Read notifications older than this leave the hot table
+    NOTIFICATION_RETENTION_MODE = 'archive'  # 'archive' (collapse into notifications_archive) or 'delete'
+    NOTIFICATION_RETENTION_BATCH_SIZE = 500  # Notifications moved per transaction
+    NOTIFICATION_RETENTION_MAX_BATCHES = 20  # Batches per run
+    NOTIFICATION_RETENTION_POLL_INTERVAL = 3600  # Seconds between runs
+    
+    # SMTP delivery (used when EMAIL_SIMULATE_MODE is False)
+    MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'  # STARTTLS
+    MAIL_USE_SSL = os.environ.get('MAIL_USE_SSL', 'false').lower() == 'true'  # Implicit TLS
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@campus-hub.local'
+    MAIL_POOL_SIZE = 4  # Persistent connections kept open (match EMAIL_OUTBOX_WORKERS or higher)
+    MAIL_MAX_MESSAGES_PER_CONNECTION = 100  # Recycle connections after this many messages
+    MAIL_TIMEOUT = 10  # Socket timeout in seconds
+    
+    # Message threads (keyset-paginated windows)
+    MESSAGE_THREAD_PAGE_SIZE = 50  # Messages shown when a thread opens and per 'load older' page
+    
+    # Password hashing (bcrypt on a bounded worker pool)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS') or 12)  # Cost factor; logins rehash other costs
+    PASSWORD_HASH_WORKERS = min(os.cpu_count() or 1, 4)  # Concurrent bcrypt computations per process
+    PASSWORD_HASH_MAX_PENDING = 8  # Request threads per process waiting on hashes before requests get 503 (keep below gunicorn --threads)
+    
+    # Flask-Login identity cache (snapshots of users rows, dropped when a row changes)
+    USER_IDENTITY_CACHE_TTL = 30  # Seconds before a snapshot is reloaded (bounds staleness across workers)
+    
+    # Resource detail reviews (first page cached as rendered HTML per resource)
+    REVIEW_PAGE_SIZE = 10  # Reviews rendered with the detail page and per 'show more' page
+    REVIEW_FRAGMENT_CACHE_TTL = 300  # Seconds a rendered fragment is served before re-rendering
+    REVIEW_FRAGMENT_CACHE_SIZE = 500  # Fragments kept; least recently viewed are evicted
+    
+    # Live event stream (Server-Sent Events): notifications, messages and read receipts
+    NOTIFICATION_STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments
+    NOTIFICATION_STREAM_MAX_AGE = 300  # Seconds before the server recycles a stream
 
 
 class DevelopmentConfig(Config):
@@ -44,6 +104,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    EMAIL_OUTBOX_AUTOSTART = False  # Tests drain the outbox explicitly
+    EMAIL_DIGEST_AUTOSTART = False  # Tests run digests explicitly
+    BOOKING_REMINDER_AUTOSTART = False  # Tests run reminders explicitly
+    NOTIFICATION_RETENTION_AUTOSTART = False  # Tests run retention explicitly
 
 
 class ProductionConfig(Config):
@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify, render_template, flash, redirect,
 from flask_login import login_required, current_user
 from src.models import User, Resource, Booking, Review
 from src.extensions import db
+from src.services.password_hasher import PasswordHasherBusy
 from sqlalchemy import func, and_
 from datetime import datetime, timedelta
 import os
@@ -25,6 +26,7 @@ def dashboard():
         
         from datetime import datetime, timedelta
         from src.data_access.booking_dal import BookingDAL
+        from src.data_access.review_dal import ReviewDAL
         
         now = datetime.now()
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
@@ -84,7 +86,7 @@ def dashboard():
             avg_rating = 0
         
         # Flagged reviews count
-        flagged_reviews_count = db.session.query(Review).filter(Review.is_flagged == True).count()
+        flagged_reviews_count = ReviewDAL.count_flagged()
         
         # ============= BOOKING STATUS BREAKDOWN =============
         booking_statuses = db.session.query(
@@ -149,19 +151,20 @@ def dashboard():
         ]
         
         # ============= RECENT FLAGGED REVIEWS =============
-        recent_flagged_reviews = db.session.query(Review).filter(
-            Review.is_flagged == True
-        ).order_by(Review.flagged_at.desc()).limit(5).all()
+        # Top of the moderation queue: most flagged, then most recently flagged
+        recent_flagged_reviews = ReviewDAL.get_flag_queue(limit=5)
+        review_flags = ReviewDAL.get_review_flags([review.id for review in recent_flagged_reviews])
         
         flagged_reviews_list = []
         for review in recent_flagged_reviews:
+            latest_flag = review_flags[review.id][-1] if review_flags[review.id] else None
             flagged_reviews_list.append({
                 'id': review.id,
                 'reviewer_name': review.reviewer.full_name or review.reviewer.username,
                 'resource_name': review.resource.name,
                 'comment_preview': review.comment[:50] + ('...' if len(review.comment) > 50 else ''),
                 'flag_count': review.flag_count,
-                'reason': review.flag_reason[:100] if review.flag_reason else 'No reason specified',
+                'reason': latest_flag.reason[:100] if latest_flag and latest_flag.reason else 'No reason specified',
                 'flagged_at': review.flagged_at.strftime('%m/%d/%Y') if review.flagged_at else 'N/A'
             })
         
@@ -356,6 +359,8 @@ def create_user():
             flash(f'{role.capitalize()} account created successfully! Username: {user.username}', 'success')
             return redirect(url_for('admin.dashboard'))
         
+        except PasswordHasherBusy:
+            raise  # Served as 503
         except Exception as e:
             flash(f'Error creating account: {str(e)}', 'error')
             return redirect(url_for('admin.create_user'))
@@ -545,6 +550,29 @@ def update_user_role(user_id):
     return jsonify({"message": f"Update user {user_id} role endpoint ready"}), 200
 
 
+@bp.route('/users/<int:user_id>/email-frequency', methods=['PUT'])
+@login_required
+def update_user_email_frequency(user_id):
+    """Admin-only: Set a user's email delivery mode (immediate, hourly or daily digest)."""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    from src.data_access.user_dal import UserDAL
+    
+    data = request.get_json(silent=True) or {}
+    frequency = data.get('email_frequency')
+    if frequency not in User.VALID_EMAIL_FREQUENCIES:
+        return jsonify({
+            'error': f'email_frequency must be one of: {", ".join(User.VALID_EMAIL_FREQUENCIES)}'
+        }), 400
+    
+    try:
+        user = UserDAL.update_user(user_id, email_frequency=frequency)
+        return jsonify({'success': True, 'user_id': user.id, 'email_frequency': user.email_frequency}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+
 @bp.route('/statistics', methods=['GET'])
 def statistics():
     """Get system statistics."""
@@ -8,9 +8,9 @@ from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
 from sqlalchemy.exc import SQLAlchemyError
-from src.extensions import login_manager
 from src.data_access import UserDAL
 from src.models import User
+from src.services.password_hasher import password_hasher, PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth', template_folder='../views/templates')
 
@@ -127,6 +127,13 @@ def login():
                         flash('Your account has been deactivated. Please contact support.', 'error')
                         return redirect(url_for('auth.login'))
                     
+                    # Upgrade hashes made at another cost factor while the password is at hand
+                    if password_hasher.needs_rehash(user.password_hash):
+                        try:
+                            UserDAL.update_user_password(user.id, password)
+                        except (PasswordHasherBusy, SQLAlchemyError):
+                            pass  # Retried on the next login
+                    
                     login_user(user, remember=remember)
                     flash(f'Welcome back, {user.full_name}!', 'success')
                     
@@ -145,6 +152,8 @@ def login():
             flash('Invalid username or password.', 'error')
             return redirect(url_for('auth.login'))
         
+        except PasswordHasherBusy:
+            raise  # Served as 503
         except Exception as e:
             import traceback
             print(f"LOGIN ERROR: {str(e)}")
@@ -168,23 +177,8 @@ def logout():
 @login_required
 def profile():
     """View user profile."""
-    from src.extensions import db
-    from sqlalchemy import text
-    
-    # Debug: Check what's in the database
-    result = db.session.execute(
-        text("SELECT id, username, profile_image FROM users WHERE id = :user_id"),
-        {"user_id": current_user.id}
-    ).fetchone()
-    print(f"[PROFILE VIEW] Database has for user {current_user.id}: profile_image = {result[2] if result else 'None'}")
-    
-    # Refresh current_user to get latest data from database
-    db.session.expire_all()
-    db.session.refresh(current_user)
-    
-    print(f"[PROFILE VIEW] current_user.profile_image after refresh: {current_user.profile_image}")
-    
-    return render_template('auth/profile.html', user=current_user)
+    # The profile shows every column, so load the full row (profile edits invalidate the cached identity)
+    return render_template('auth/profile.html', user=current_user.load())
 
 
 @auth_bp.route('/profile/edit', methods=['GET', 'POST'])
@@ -196,18 +190,24 @@ def edit_profile():
         department = request.form.get('department', '').strip() or None
         year_in_school = request.form.get('year_in_school', '').strip() or None
         major = request.form.get('major', '').strip() or None
+        email_frequency = request.form.get('email_frequency', current_user.email_frequency)
         
         if not full_name:
             flash('Full name is required.', 'error')
             return redirect(url_for('auth.edit_profile'))
         
+        if email_frequency not in User.VALID_EMAIL_FREQUENCIES:
+            flash('Invalid email notification setting.', 'error')
+            return redirect(url_for('auth.edit_profile'))
+        
         try:
             user = UserDAL.update_user(
                 user_id=current_user.id,
                 full_name=full_name,
                 department=department,
                 year_in_school=year_in_school,
-                major=major
+                major=major,
+                email_frequency=email_frequency
             )
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('auth.profile'))
@@ -430,9 +430,3 @@ def preferences():
         return render_template('auth/preferences.html', user=current_user, prefs=prefs)
     except Exception:
         return render_template('auth/preferences.html', user=current_user, prefs={})
-
-
-@login_manager.user_loader
-def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    return UserDAL.get_user_by_id(user_id)
@@ -393,10 +393,11 @@ def create_booking():
             start_time=start_time,
             end_time=end_time,
             status=booking_status,
-            notes=notes if notes else None
+            notes=notes if notes else None,
+            commit=False
         )
         
-        # Send email notification
+        # Queue email notification in the same transaction as the booking
         if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
             try:
                 if booking.status == 'confirmed':
@@ -407,6 +408,9 @@ def create_booking():
                 # Log error but don't fail the booking
                 print(f"Error sending booking email: {str(e)}")
         
+        from src.extensions import db
+        db.session.commit()
+        
         return jsonify({
             'success': True,
             'message': 'Booking created successfully',
@@ -541,15 +545,18 @@ def cancel_booking(booking_id):
         if not current_user.is_admin() and booking.user_id != current_user.id:
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
         
-        cancelled_booking = BookingDAL.cancel_booking(booking_id)
+        cancelled_booking = BookingDAL.cancel_booking(booking_id, commit=False)
         
-        # Send email notification
+        # Queue email notification in the same transaction as the cancellation
         if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
             try:
                 email_service.send_booking_cancelled(cancelled_booking, cancelled_booking.user, current_user)
             except Exception as e:
                 print(f"Error sending cancellation email: {str(e)}")
         
+        from src.extensions import db
+        db.session.commit()
+        
         return jsonify({
             'success': True,
             'message': 'Booking cancelled successfully',
@@ -603,18 +610,22 @@ def confirm_booking(booking_id):
                 'error': f'Cannot confirm {booking.status} booking. Only pending bookings can be confirmed.'
             }), 400
         
-        confirmed_booking = BookingDAL.confirm_booking(booking_id)
+        confirmed_booking = BookingDAL.confirm_booking(booking_id, commit=False)
         
         # Set approval tracking fields
         confirmed_booking.approved_by_id = current_user.id
         confirmed_booking.approved_at = datetime.utcnow()
-        from src.extensions import db
-        db.session.commit()
         
-        # Create notification record
+        # Queue email notification in the same transaction as the approval
+        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
+            try:
+                email_service.send_booking_confirmation(confirmed_booking, confirmed_booking.user)
+            except Exception as e:
+                print(f"Error sending booking confirmation email: {str(e)}")
+        
+        # Queue notification record
         try:
-            notification_service = NotificationService()
-            notification_service.notify_booking_confirmed(confirmed_booking)
+            NotificationService.notify_booking_confirmed(confirmed_booking)
         except Exception as e:
             print(f"Error creating notification record: {str(e)}")
         
@@ -634,22 +645,21 @@ Booking Details:
 Your reservation is confirmed. Please arrive on time for your booking.
             """.strip()
             
-            MessageDAL.create_message(
-                sender_id=current_user.id,
-                recipient_id=booking.user_id,
-                subject=notification_subject,
-                body=notification_body
-            )
+            if booking.user_id != current_user.id:
+                MessageDAL.send_message(
+                    sender_id=current_user.id,
+                    recipient_id=booking.user_id,
+                    subject=notification_subject,
+                    body=notification_body,
+                    commit=False
+                )
         except Exception as e:
             # Log error but don't fail the approval
             print(f"Error sending in-app notification: {str(e)}")
         
-        # Send email notification
-        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
-            try:
-                email_service.send_booking_confirmation(confirmed_booking, confirmed_booking.user)
-            except Exception as e:
-                print(f"Error sending booking confirmation email: {str(e)}")
+        # Booking change, email, notification and message commit together
+        from src.extensions import db
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -707,13 +717,27 @@ def cancel_booking_with_reason(booking_id):
         reason = data.get('reason', 'No reason provided')
         
         # Cancel the booking
-        cancelled_booking = BookingDAL.cancel_booking(booking_id)
+        cancelled_booking = BookingDAL.cancel_booking(booking_id, commit=False)
         
         # Store cancellation reason and who cancelled it
         cancelled_booking.cancellation_reason = reason
         cancelled_booking.cancelled_by_id = current_user.id
-        from src.extensions import db
-        db.session.commit()
+        
+        # Queue email notification in the same transaction as the cancellation
+        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
+            try:
+                email_service.send_booking_cancelled(cancelled_booking, cancelled_booking.user, current_user)
+            except Exception as e:
+                print(f"Error sending cancellation email: {str(e)}")
+        
+        # Queue notification records
+        try:
+            if is_admin_or_staff and not is_owner:
+                NotificationService.notify_booking_denied(cancelled_booking, reason)
+            else:
+                NotificationService.notify_booking_cancelled(cancelled_booking, current_user.id, reason)
+        except Exception as e:
+            print(f"Error creating notification record: {str(e)}")
         
         # Send in-app notification
         try:
@@ -749,22 +773,22 @@ Booking Details:
 The resource is now available for other students to book.
                 """.strip()
             
-            MessageDAL.create_message(
-                sender_id=current_user.id,
-                recipient_id=booking.user_id,
-                subject=notification_subject,
-                body=notification_body
-            )
+            # Students cancelling their own booking don't message themselves
+            if booking.user_id != current_user.id:
+                MessageDAL.send_message(
+                    sender_id=current_user.id,
+                    recipient_id=booking.user_id,
+                    subject=notification_subject,
+                    body=notification_body,
+                    commit=False
+                )
         except Exception as e:
             # Log error but don't fail the cancellation
             print(f"Error sending in-app notification: {str(e)}")
         
-        # Send email notification
-        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
-            try:
-                email_service.send_booking_cancelled(cancelled_booking, cancelled_booking.user, current_user)
-            except Exception as e:
-                print(f"Error sending cancellation email: {str(e)}")
+        # Cancellation, email, notifications and message commit together
+        from src.extensions import db
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -854,6 +878,7 @@ def edit_booking(booking_id):
         if booking.start_time != new_start_time:
             changes.append(f"Start time: {booking.start_time.isoformat()} → {new_start_time.isoformat()}")
             booking.start_time = new_start_time
+            booking.reminder_sent_at = None  # Remind again for the new time
         
         if booking.end_time != new_end_time:
             changes.append(f"End time: {booking.end_time.isoformat()} → {new_end_time.isoformat()}")
@@ -872,9 +897,12 @@ def edit_booking(booking_id):
         booking.modified_at = datetime.utcnow()
         booking.change_summary = '\n'.join(changes)
         
-        # Commit changes
-        from src.extensions import db
-        db.session.commit()
+        # Queue email notification in the same transaction as the edit
+        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
+            try:
+                email_service.send_booking_modified(booking, booking.user, current_user, changes)
+            except Exception as e:
+                print(f"Error sending modification email: {str(e)}")
         
         # Send in-app notification to student
         try:
@@ -897,22 +925,21 @@ Modified By: {current_user.full_name}
 Please review your booking details and contact us if you have any questions.
             """.strip()
             
-            MessageDAL.create_message(
-                sender_id=current_user.id,
-                recipient_id=booking.user_id,
-                subject=notification_subject,
-                body=notification_body
-            )
+            if booking.user_id != current_user.id:
+                MessageDAL.send_message(
+                    sender_id=current_user.id,
+                    recipient_id=booking.user_id,
+                    subject=notification_subject,
+                    body=notification_body,
+                    commit=False
+                )
         except Exception as e:
             # Log error but don't fail the edit
             print(f"Error sending in-app notification: {str(e)}")
         
-        # Send email notification
-        if current_app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True):
-            try:
-                email_service.send_booking_modified(booking, booking.user, current_user, changes)
-            except Exception as e:
-                print(f"Error sending modification email: {str(e)}")
+        # Commit the edit together with its email and message
+        from src.extensions import db
+        db.session.commit()
         
         return jsonify({
             'success': True,
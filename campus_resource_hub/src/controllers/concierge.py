@@ -7,6 +7,8 @@ from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from src.models import Resource, Booking, Review, User
 from src.extensions import db, csrf_protect
+from src.services.concierge_intents import ConciergeIntentRouter
+from src.services.prompt_assembler import prompt_assembler
 from datetime import datetime, timedelta
 from pathlib import Path
 import os
@@ -223,7 +225,7 @@ def initialize_gemini():
         return False
 
 
-def get_ai_response(question, persona_context, resource_context, user_preferences=None):
+def get_ai_response(question, persona_context, resource_context, user_preferences=None, knowledge_context=""):
     """
     Get a response from the Gemini AI using the provided context.
     
@@ -232,6 +234,7 @@ def get_ai_response(question, persona_context, resource_context, user_preference
         persona_context: The concierge persona and guidelines
         resource_context: Current resource information from database
         user_preferences: Dictionary of user preferences for personalized recommendations
+        knowledge_context: RAG knowledge base content
     
     Returns:
         str: AI-generated response or error message
@@ -248,179 +251,14 @@ def get_ai_response(question, persona_context, resource_context, user_preference
         # Get the model - use gemini-2.5-flash instead of deprecated gemini-pro
         model = genai.GenerativeModel('gemini-2.5-flash')
         
-        # Build user preferences context
-        user_context = ""
-        if user_preferences:
-            user_context = "\n\nUSER PROFILE & PREFERENCES:\n"
-            
-            if user_preferences.get('year_in_school'):
-                user_context += f"- Academic Level: {user_preferences['year_in_school']}\n"
-            
-            if user_preferences.get('major'):
-                user_context += f"- Major: {user_preferences['major']}\n"
-            
-            if user_preferences.get('interests'):
-                interests = ', '.join(user_preferences['interests'])
-                user_context += f"- Interests: {interests}\n"
-            
-            if user_preferences.get('study_preferences'):
-                prefs = user_preferences['study_preferences']
-                user_context += "- Study Preferences:\n"
-                if prefs.get('environment'):
-                    user_context += f"  • Environment: {prefs['environment']}\n"
-                if prefs.get('time'):
-                    user_context += f"  • Preferred time: {prefs['time']}\n"
-                if prefs.get('group_size'):
-                    user_context += f"  • Group size: {prefs['group_size']}\n"
-            
-            if user_preferences.get('accessibility_needs'):
-                needs = ', '.join([n.replace('_', ' ').title() for n in user_preferences['accessibility_needs']])
-                user_context += f"- Accessibility Needs: {needs}\n"
-            
-            if user_preferences.get('preferred_locations'):
-                locs = ', '.join(user_preferences['preferred_locations'])
-                user_context += f"- Preferred Locations: {locs}\n"
-            
-            user_context += "\n🎯 IMPORTANT: Use these preferences to personalize your recommendations!"
-        
-        # Build the system prompt with CLEAR INFERENCE RULES
-        system_prompt = f"""You are the Campus Concierge, an AI-powered assistant for the IU Campus Resource Hub.
-
-{persona_context}
-
-{resource_context}
-
-{user_context}
-
-YOUR CORE PURPOSE:
-Help students find and use campus resources by understanding their needs and matching them to specific facilities.
-
-⚠️ CRITICAL: BE SELECTIVE WITH RECOMMENDATIONS
-- NEVER list all available resources
-- NEVER say things like "We have X different resources of that type"
-- Instead, identify the user's ACTUAL NEED and recommend only the top 2-4 best matches
-- Show off your intelligence by filtering, not by listing everything
-- Example: If asked "What resources are available?" respond with "I'd love to help! To give you the best suggestions, could you tell me what you're looking for? Are you studying, collaborating, or something else?"
-
-SELECTIVE RECOMMENDATIONS STRATEGY:
-1. User asks vague question → Ask clarifying question about their specific need
-2. User asks specific question → Recommend only the most relevant resources
-3. If multiple good options exist → Present 2-3 top choices (ranked by popularity/ratings)
-4. Always explain WHY you picked those specific resources
-5. Mention "We also have other options" if there are alternatives, but don't list them all
-
-INFERENCE GUIDELINES:
-When users ask general questions, map them to specific resources:
-
-1. QUIET STUDY QUERIES:
-   - Primary: Wells Library (study rooms on Level 2 & 4, quiet pods)
-   - Alternative: Neal-Marshall Black Culture Center (Cultural Library Study Room)
-   - Always mention hours and if booking is required
-
-2. COMPUTER/TECH QUESTIONS:
-   - Primary: Luddy Hall (AI Lab, VR/AR Studio)
-   - Alternative: Wells Library (computer stations)
-   - Include access requirements and hours
-
-3. GROUP WORK SPACES:
-   - Primary: Kelley School (Student Collaboration Rooms G100-G150)
-   - Alternative: IMU (Student Organization Meeting Rooms)
-   - Mention capacity and booking process
-
-4. PRACTICE/PERFORMANCE:
-   - Primary: Jacobs School (practice rooms, Recording Studio 2A)
-   - Always mention if staff approval is needed
-
-PERSONALIZATION RULES:
-- User preferences are SUGGESTIONS to guide recommendations, NOT hard filters
-- Prioritize resources that match user preferences, but don't exclude good options just because they violate one preference
-- ACCESSIBILITY NEEDS are the ONLY hard requirement (e.g., if user needs wheelchair access, only suggest accessible resources)
-- If a resource is genuinely helpful for solving the user's problem, recommend it even if it doesn't match all preferences
-- Example: If user prefers solo study but asks for group study spaces, recommend group spaces! Don't ignore them due to the solo preference
-- Mention HOW recommendations match their preferences when applicable (e.g., "This matches your preference for quiet study")
-- If recommendation doesn't match a preference, briefly explain why it's still a good option
-
-RESPONSE STRUCTURE:
-1. First: Answer with SPECIFIC resources (name, location, hours)
-2. Then: Add relevant details (capacity, equipment, booking rules)
-3. If applicable: Mention why it matches their preferences
-4. Finally: Ask follow-up question about booking or additional needs
-
-FORMATTING REQUIREMENTS (IMPORTANT):
-Use markdown formatting to make responses clear and scannable:
-- Use **bold** for resource names, important terms, and key information
-- Use headers (##, ###) to organize multiple sections
-- Use bullet lists (- or •) for multiple items or features
-- Add blank lines between sections for better readability
-- Keep paragraphs short (2-3 sentences max)
-- Use numbered lists for step-by-step instructions
-- **ALWAYS include clickable links** when mentioning specific resources
-
-🔗 LINKING REQUIREMENTS (CRITICAL - DO NOT SKIP):
-When you mention a specific resource by name, ALWAYS include a clickable link in this format:
-[Resource Name](http://127.0.0.1:5000/resources/RESOURCE_ID)
-
-MANDATORY RULES:
-1. EVERY resource mentioned gets a markdown link
-2. Use the resource URLs from the context above
-3. Links MUST be included in your response - do not omit them
-4. Put links directly after the resource name or in a dedicated "Quick Links" section
-5. If user asks about a specific resource, LEAD with the link
-
-Example of CORRECT format:
-✅ "The **[IMU Solarium Event Room](http://127.0.0.1:5000/resources/15)** is perfect for your needs..."
-✅ "Check out the **[Wells Library Study Rooms](http://127.0.0.1:5000/resources/5)** - click to view and book!"
-
-Example of WRONG format (DO NOT DO THIS):
-❌ "The IMU Solarium Event Room is perfect..." (missing link - WRONG!)
-
-QUICK LINKS SECTION (ALWAYS ADD):
-At the end of your response about resources, ALWAYS add a "Quick Links" section:
-
-## 🔗 Quick Links
-- **[Resource Name](http://127.0.0.1:5000/resources/ID)** - Click to view details, photos, and book
-- **[Another Resource](http://127.0.0.1:5000/resources/ID)** - Click to view details and book
-
-This makes it EASY for the user to click and navigate.
-
-GOOD FORMAT EXAMPLE:
-## Study Rooms Available
-
-**[Wells Library](http://127.0.0.1:5000/resources/5)** has several options:
-- **Level 2 Study Rooms** - Capacity 4-8 people
-  • Equipment: Whiteboards, power outlets
-  • Hours: Mon-Thu 8AM-11PM, Fri 8AM-9PM
-  • [📖 View details & book here](http://127.0.0.1:5000/resources/5)
-
-- **Level 4 Quiet Pods** - Individual study (pilot program)
-  • Perfect for focused work
-  • No booking needed
-  • Same hours as above
-
-**Why these match:** You mentioned preferring quiet spaces, and these rooms are specifically designated for silent study.
-
-Would you like to book a room? Click the links above to see more details!
-
-EXAMPLES:
-Q: "Good places to study?"
-A: "The **[Wells Library](http://127.0.0.1:5000/resources/5)** offers several excellent study options:
-   • Quiet pods on Level 2 (pilot program)
-   • Study rooms on Level 2 & 4
-   • Hours: Mon-Thu 8AM-11PM, Fri 8AM-9PM
-
-## 🔗 Quick Links
-- **[Wells Library Study Rooms](http://127.0.0.1:5000/resources/5)** - Click to view details and book
-
-Would you like me to suggest other study spaces?"
-
-REMEMBER: Every response about resources MUST include clickable markdown links.
-NO EXCEPTIONS - Always include links when mentioning specific resources.
-
-Current date/time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-        
-        # Create the message
-        message = f"{system_prompt}\n\nStudent Question: {question}"
+        # Build the prompt: static instructions + budgeted persona, knowledge, resource and profile sections
+        message = prompt_assembler.assemble(
+            question=question,
+            persona=persona_context,
+            knowledge=knowledge_context,
+            resources=resource_context,
+            user_preferences=user_preferences
+        )
         
         # Get response from Gemini
         response = model.generate_content(message)
@@ -491,6 +329,21 @@ def chat():
             logger.warning(f"[CHAT] Message too long")
             return jsonify({'error': 'Message too long (max 1000 characters)'}), 400
         
+        # Answer structured searches (capacity, building, type, time) straight from the DB
+        try:
+            routed_response = ConciergeIntentRouter.route(question)
+        except Exception as e:
+            logger.exception(f"[CHAT] Intent router failed, falling back to AI: {e}")
+            routed_response = None
+        
+        if routed_response:
+            logger.debug(f"[CHAT] Answered by intent router")
+            return jsonify({
+                'response': routed_response,
+                'source': 'intent_router',
+                'timestamp': datetime.now().isoformat()
+            }), 200
+        
         # Check if Gemini API is available
         api_key = os.environ.get('GEMINI_API_KEY')
         if not api_key:
@@ -510,9 +363,6 @@ def chat():
         if not persona_context:
             persona_context = "You are a helpful campus resource assistant. your knowledge is limited to that of the database about campus resources. do not talk about anything else."
         
-        # Combine all contexts for the AI
-        combined_context = f"{persona_context}\n\n{rag_knowledge}\n\n{resource_context}"
-        
         # Get user preferences if authenticated
         user_preferences = None
         if current_user.is_authenticated:
@@ -530,9 +380,10 @@ def chat():
         logger.debug(f"[CHAT] Sending question with context...")
         response = get_ai_response(
             question=question,
-            persona_context=combined_context,  # Pass the full combined context
-            resource_context="",  # Not needed since it's in combined_context
-            user_preferences=user_preferences  # Pass user preferences for personalization
+            persona_context=persona_context,
+            resource_context=resource_context,
+            user_preferences=user_preferences,  # Pass user preferences for personalization
+            knowledge_context=rag_knowledge
         )
         
         logger.debug(f"[CHAT] Response received: {response[:100]}...")
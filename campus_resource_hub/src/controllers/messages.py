@@ -3,65 +3,52 @@ Messages blueprint - user messaging and notifications.
 Handles messaging threads, conversations, and notifications.
 """
 
-from flask import Blueprint, request, jsonify, render_template, abort, session
+import logging
+
+from flask import Blueprint, request, jsonify, render_template, abort, session, Response, current_app
 from flask_login import login_required, current_user
-from src.data_access.message_dal import MessageDAL
+from src.data_access.message_dal import MessageDAL, SNIPPET_START, SNIPPET_END
+from src.data_access.conversation_dal import ConversationDAL
 from src.models import User
 from src.extensions import db
 from sqlalchemy.exc import SQLAlchemyError
 from src.services.notification_service import NotificationService
+from src.services.event_broker import event_broker, sse_stream
+from src.services.unread_counters import unread_counters, NOTIFICATIONS
 
 bp = Blueprint('messages', __name__, url_prefix='/messages')
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+logger = logging.getLogger(__name__)
+
 
 @bp.route('/', methods=['GET'])
 @login_required
 def list_messages():
     """
     List user's conversations (most recent first).
-    Shows last message from each conversation partner.
+    Served by one indexed query over the conversations read model.
     Returns HTML template by default, JSON if ?json=1.
     """
     try:
-        # Get all messages for current user (sent or received)
-        from src.models import Message
-        
-        all_messages = Message.query.filter(
-            (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-        ).order_by(Message.created_at.desc()).all()
-        
-        # Format response
         result = []
-        seen_partners = {}  # Map of other_user_id to their latest message
-        
-        for msg in all_messages:
-            # Determine other user (not current user)
-            other_user_id = msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id
-            
-            # Keep only the most recent message with each user
-            if other_user_id not in seen_partners:
-                seen_partners[other_user_id] = msg
-        
-        # Now convert to result list
-        for other_user_id, msg in seen_partners.items():
-            # Get other user details
-            other_user = db.session.get(User, other_user_id)
-            if not other_user:
-                continue
+        for conversation, other_user in ConversationDAL.get_user_conversations(current_user.id):
+            is_from_me = conversation.last_sender_id == current_user.id
+            unread_count = conversation.unread_for(current_user.id)
             
             result.append({
-                'thread_id': msg.thread_id or msg.id,
+                'thread_id': conversation.thread_id,
                 'other_user': {
                     'id': other_user.id,
                     'name': other_user.full_name,
                     'email': other_user.email,
                     'profile_image': other_user.profile_image
                 },
-                'last_message': msg.body[:100],  # Preview
-                'is_read': msg.is_read or msg.sender_id == current_user.id,
-                'created_at': msg.created_at.isoformat(),
-                'is_from_me': msg.sender_id == current_user.id
+                'last_message': conversation.preview,  # Preview
+                'is_read': unread_count == 0 or is_from_me,
+                'unread_count': unread_count,
+                'created_at': conversation.last_activity_at.isoformat(),
+                'is_from_me': is_from_me
             })
         
         # Check if JSON requested
@@ -84,62 +71,111 @@ def list_messages():
         }), 500
 
 
+def _message_cursor(message) -> str:
+    """Opaque keyset cursor for a message: '<created_at ISO>_<id>'."""
+    return f"{message.created_at.isoformat()}_{message.id}"
+
+
+def _parse_message_cursor(value: str) -> tuple:
+    """Parse a cursor from _message_cursor into (created_at, id); raises ValueError."""
+    from datetime import datetime
+    created_at, _, message_id = value.rpartition('_')
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+def _notification_cursor(changed_at, notification_id: int) -> str:
+    """Opaque keyset cursor for a notification change: '<changed_at ISO>_<id>'."""
+    return f"{changed_at.isoformat()}_{notification_id}"
+
+
+def _parse_notification_cursor(value: str) -> tuple:
+    """Parse a cursor from _notification_cursor into (changed_at, id); raises ValueError."""
+    from datetime import datetime
+    changed_at, _, notification_id = value.rpartition('_')
+    if not changed_at:
+        return datetime.fromisoformat(value), 0  # Bare timestamp from an older client
+    return datetime.fromisoformat(changed_at), int(notification_id)
+
+
 @bp.route('/thread/<int:thread_id>', methods=['GET'])
 @login_required
 def get_thread(thread_id):
     """
-    Get all messages in a thread.
+    Get a window of messages in a thread.
     Handles both thread_id (when thread was explicitly set) and message_id (fallback).
     Returns JSON if ?json=1, otherwise returns HTML template.
+    
+    Query parameters (JSON):
+    - before (str, optional): older_cursor from a previous response; returns the
+      page of messages just before it
+    - since (str, optional): latest_cursor from a previous response; returns only
+      messages sent after it (oldest first)
+    - limit (int, optional): Messages per page (default MESSAGE_THREAD_PAGE_SIZE, max 200)
+    
+    Without a cursor the most recent messages are returned. Pages are read by
+    (created_at, id) keyset on the conversation index, so opening a long
+    thread costs the same as a short one.
     """
     try:
         from src.models import Message
         
-        # First try to get messages with this thread_id
-        messages = MessageDAL.get_thread_messages(thread_id)
-        
-        # If no messages found with thread_id, it might be a message_id (fallback case)
-        if not messages:
-            # Try to fetch the message directly
-            message = db.session.get(Message, thread_id)
-            if not message:
-                abort(404)
-            
-            # Get the other user in the conversation
-            other_user_id = message.recipient_id if message.sender_id == current_user.id else message.sender_id
-            
-            # Get all messages between current user and other user
-            messages = MessageDAL.get_conversation_between_users(current_user.id, other_user_id)
-            
-            if not messages:
+        # Thread ids are the id of the conversation's first message
+        anchor = db.session.get(Message, thread_id)
+        if not anchor:
+            anchor = Message.query.filter_by(thread_id=thread_id).first()
+            if not anchor:
                 abort(404)
         
         # Verify current user is part of this thread
-        thread_participants = set()
-        for msg in messages:
-            thread_participants.add(msg.sender_id)
-            thread_participants.add(msg.recipient_id)
-        
-        if current_user.id not in thread_participants:
+        if current_user.id not in (anchor.sender_id, anchor.recipient_id):
             abort(403)  # Forbidden
+        other_user_id = anchor.recipient_id if anchor.sender_id == current_user.id else anchor.sender_id
+        
+        try:
+            before = _parse_message_cursor(request.args['before']) if request.args.get('before') else None
+            since = _parse_message_cursor(request.args['since']) if request.args.get('since') else None
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'error': 'Invalid cursor'
+            }), 400
+        
+        page_size = current_app.config.get('MESSAGE_THREAD_PAGE_SIZE', 50)
+        limit = min(max(request.args.get('limit', page_size, type=int), 1), 200)
+        messages, has_more = MessageDAL.get_conversation_window(
+            current_user.id, other_user_id, limit=limit, before=before, since=since
+        )
+        
+        # Mark everything addressed to the viewer as read in one UPDATE
+        if not before:
+            MessageDAL.mark_conversation_as_read(current_user.id, other_user_id)
+        
+        if since:
+            older_cursor = None
+            latest_cursor = _message_cursor(messages[-1]) if messages else request.args['since']
+        else:
+            older_cursor = _message_cursor(messages[0]) if messages and has_more else None
+            latest_cursor = _message_cursor(messages[-1]) if messages else None
         
         # Check if JSON requested
         if request.args.get('json') == '1':
             return jsonify({
                 'status': 'success',
-                'messages': [msg.to_dict() for msg in messages]
+                'messages': [msg.to_dict() for msg in messages],
+                'has_more': has_more,
+                'older_cursor': older_cursor,
+                'latest_cursor': latest_cursor
             }), 200
         
         # Return HTML template
-        # Determine other user (the one who isn't current user)
-        first_msg = messages[0]
-        other_user_id = first_msg.recipient_id if first_msg.sender_id == current_user.id else first_msg.sender_id
         other_user = db.session.get(User, other_user_id)
         
         return render_template('messages/thread.html',
                              thread_id=thread_id,
                              messages=messages,
                              other_user=other_user,
+                             older_cursor=older_cursor,
+                             latest_cursor=latest_cursor,
                              current_user=current_user)
     
     except SQLAlchemyError as e:
@@ -149,6 +185,63 @@ def get_thread(thread_id):
         }), 500
 
 
+@bp.route('/search', methods=['GET'])
+@login_required
+def search_messages():
+    """
+    Full-text search over the current user's messages, best match first.
+    
+    Query parameters:
+    - q (str): Words to search for (each matched as a prefix)
+    - cursor (str, optional): next_cursor from a previous response
+    - limit (int, optional): Results per page (default 20, max 100)
+    
+    Each result is the message plus an HTML 'snippet' with matched terms in <mark>.
+    """
+    from markupsafe import escape
+    
+    try:
+        after = None
+        if request.args.get('cursor'):
+            try:
+                rank, _, message_id = request.args['cursor'].rpartition('_')
+                after = (float(rank), int(message_id))
+            except ValueError:
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Invalid cursor'
+                }), 400
+        
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        rows, has_more = MessageDAL.search_messages(current_user.id, request.args.get('q', ''),
+                                                    limit=limit, after=after)
+        
+        results = []
+        for message, snippet, rank in rows:
+            item = message.to_dict()
+            # Escape the message text first so only our own <mark> tags are HTML
+            item['snippet'] = str(escape(snippet)).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+            results.append(item)
+        
+        next_cursor = None
+        if has_more:
+            _, _, rank = rows[-1]
+            next_cursor = f"{rank!r}_{rows[-1][0].id}"
+        
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'count': len(results),
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }), 200
+    except SQLAlchemyError as e:
+        return jsonify({
+            'status': 'error',
+            'error': 'Failed to search messages'
+        }), 500
+
+
 @bp.route('/<int:message_id>', methods=['GET'])
 @login_required
 def get_message(message_id):
@@ -240,19 +333,26 @@ def create_message():
             recipient_id=recipient_id,
             subject=subject,
             body=body,
-            thread_id=thread_id
+            thread_id=thread_id,
+            commit=False
         )
         
-        # Create notification for recipient
+        # Notify recipient in the same transaction as the message. The write
+        # happens here, inside a savepoint, rather than in the commit hook, so
+        # a failed notification can be dropped without losing the message.
         try:
-            NotificationService.notify_new_message(
-                sender_id=current_user.id,
-                recipient_id=recipient_id,
-                message=message
-            )
-        except Exception as e:
+            with db.session.begin_nested():
+                NotificationService.notify_new_message(
+                    sender_id=current_user.id,
+                    recipient_id=recipient_id,
+                    message=message
+                )
+                NotificationService.flush()
+        except Exception:
             # Log error but don't fail the message send
-            print(f"Error creating notification: {str(e)}")
+            logger.exception("Error creating new-message notification")
+        
+        db.session.commit()
         
         return jsonify({
             'status': 'success',
@@ -292,8 +392,7 @@ def mark_message_read(message_id):
                 'error': 'Unauthorized'
             }), 403
         
-        message.mark_as_read()
-        db.session.commit()
+        MessageDAL.mark_as_read(message.id)
         
         return jsonify({
             'status': 'success',
@@ -368,63 +467,75 @@ def unread_count():
 @login_required
 def get_notifications():
     """
-    Get all notifications for current user.
-    Includes stored notifications + upcoming booking reminders.
-    Returns JSON with list of notifications (unread first).
+    Get notifications for current user.
+    
+    Query parameters:
+    - since (str, optional): Cursor from a previous response; only notifications
+      created or read after it are returned (oldest change first). Cursors
+      are (changed_at, id) pairs, so changes sharing a timestamp aren't skipped
+    - limit (int, optional): Maximum notifications to return (default 50, max 200)
+    
+    Without 'since', returns the most recent notifications (unread first).
+    Booking reminders are real notifications created by the reminder scheduler.
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified
+    without loading any rows.
     """
     try:
-        from src.models import Notification, Booking
-        from datetime import datetime, timedelta
-        
-        # Get stored notifications sorted by unread status and creation date
-        notifications = Notification.query.filter_by(user_id=current_user.id).order_by(
-            Notification.is_read.asc(),
-            Notification.created_at.desc()
-        ).all()
-        
-        # Also include upcoming bookings as alerts
-        upcoming_bookings = Booking.query.filter(
-            Booking.user_id == current_user.id,
-            Booking.status.in_(['pending', 'confirmed']),
-            Booking.start_time > datetime.utcnow(),
-            Booking.start_time <= datetime.utcnow() + timedelta(days=7)  # Next 7 days
-        ).all()
-        
-        # Convert notifications to dicts
-        notif_dicts = [n.to_dict() for n in notifications]
-        
-        # Add upcoming bookings as special notifications
-        for booking in upcoming_bookings:
-            time_diff = booking.start_time - datetime.utcnow()
-            hours_left = time_diff.total_seconds() / 3600
-            days_left = int(hours_left / 24)
-            
-            if days_left == 0:
-                time_str = f"in {int(hours_left)} hours"
-            elif days_left == 1:
-                time_str = "tomorrow"
+        import hashlib
+        
+        since_param = request.args.get('since')
+        since = None
+        if since_param:
+            try:
+                since, since_id = _parse_notification_cursor(since_param)
+            except ValueError:
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Invalid since cursor'
+                }), 400
+        
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        
+        # One aggregate lookup decides whether anything changed
+        state = NotificationService.get_notification_state(current_user.id)
+        latest_change = max(filter(None, [state['last_created'], state['last_read']]), default=None)
+        
+        etag = hashlib.sha1(
+            f"{current_user.id}|{state['total']}|{state['unread']}|{latest_change}|"
+            f"{since_param}|{limit}".encode()
+        ).hexdigest()
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            if since is not None:
+                rows, has_more = NotificationService.get_notifications_since(
+                    current_user.id, since, since_id=since_id, limit=limit)
+                notif_dicts = [notification.to_dict() for notification, _ in rows]
+                # Resume after the last change delivered, never past it
+                if rows:
+                    cursor = _notification_cursor(rows[-1][1], rows[-1][0].id)
+                else:
+                    cursor = _notification_cursor(since, since_id)
             else:
-                time_str = f"in {days_left} days"
+                notifications = NotificationService.get_recent_notifications(current_user.id, limit=limit)
+                notif_dicts = [n.to_dict() for n in notifications]
+                has_more = state['total'] > limit
+                latest = NotificationService.get_latest_change(current_user.id)
+                cursor = _notification_cursor(*latest) if latest else None
             
-            booking_alert = {
-                'id': f'booking_{booking.id}',  # Virtual ID
-                'user_id': current_user.id,
-                'notification_type': 'booking_reminder',
-                'title': f'Upcoming: {booking.resource.name}',
-                'description': f'Your booking for {booking.resource.name} starts {time_str}',
-                'is_read': False,
-                'action_url': f'/bookings/{booking.id}/view',
-                'sender_id': None,
-                'created_at': booking.start_time.isoformat(),
-                'read_at': None
-            }
-            notif_dicts.insert(0, booking_alert)  # Add at the top
+            response = jsonify({
+                'status': 'success',
+                'notifications': notif_dicts,
+                'count': len(notif_dicts),
+                'unread_count': state['unread'],
+                'has_more': has_more,
+                'cursor': cursor
+            })
         
-        return jsonify({
-            'status': 'success',
-            'notifications': notif_dicts,
-            'count': len(notif_dicts)
-        }), 200
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except SQLAlchemyError as e:
         return jsonify({
             'status': 'error',
@@ -432,6 +543,34 @@ def get_notifications():
         }), 500
 
 
+@api_bp.route('/notifications/stream', methods=['GET'])
+@login_required
+def stream_notifications():
+    """
+    Server-Sent Events stream of live activity for current user; base.html
+    opens one per tab. Emits 'notification' events as they are created,
+    'message' events for messages sent or received and 'read' events when
+    either side reads a conversation (the inbox and thread views listen for
+    these through base.html), heartbeat comments while idle, and honors the
+    Last-Event-ID header so reconnects replay missed events.
+    Clients fall back to polling if streaming is unavailable.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    
+    stream = sse_stream(
+        event_broker,
+        current_user.id,
+        last_event_id=last_event_id,
+        heartbeat=current_app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15),
+        max_age=current_app.config.get('NOTIFICATION_STREAM_MAX_AGE', 300)
+    )
+    
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
+
+
 @api_bp.route('/notifications/<int:notification_id>/read', methods=['POST'])
 @login_required
 def mark_notification_read(notification_id):
@@ -460,8 +599,10 @@ def mark_notification_read(notification_id):
                 'debug': f'Notification belongs to user {notification.user_id}, current user is {current_user.id}'
             }), 403
         
-        notification.mark_as_read()
-        db.session.commit()
+        if not notification.is_read:
+            notification.mark_as_read()
+            db.session.commit()
+            unread_counters.adjust(NOTIFICATIONS, notification.user_id, -1)
         
         return jsonify({
             'status': 'success',
@@ -480,24 +621,12 @@ def mark_notification_read(notification_id):
 def mark_all_notifications_read():
     """Mark all unread notifications as read for current user."""
     try:
-        from src.models import Notification
-        
-        # Get all unread notifications for current user
-        unread_notifications = Notification.query.filter_by(
-            user_id=current_user.id,
-            is_read=False
-        ).all()
-        
-        # Mark as read
-        for notification in unread_notifications:
-            notification.mark_as_read()
-        
-        db.session.commit()
+        count = NotificationService.mark_all_read(current_user.id)
         
         return jsonify({
             'status': 'success',
-            'message': f'{len(unread_notifications)} notifications marked as read',
-            'count': len(unread_notifications)
+            'message': f'{count} notifications marked as read',
+            'count': count
         }), 200
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -512,12 +641,7 @@ def mark_all_notifications_read():
 def get_unread_notification_count():
     """Get count of unread notifications for current user."""
     try:
-        from src.models import Notification
-        
-        count = Notification.query.filter_by(
-            user_id=current_user.id,
-            is_read=False
-        ).count()
+        count = NotificationService.get_unread_count(current_user.id)
         
         return jsonify({
             'status': 'success',
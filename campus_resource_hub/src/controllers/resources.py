@@ -5,11 +5,13 @@ Handles: listing, searching, creating, editing, deleting resources
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from src.models import Resource, User, Booking, Review
+from src.models import Resource, User, Booking
 from src.extensions import db
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.user_dal import UserDAL
 from src.data_access.booking_dal import BookingDAL
+from src.data_access.review_dal import ReviewDAL
+from src.services.review_fragments import render_resource_reviews
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
@@ -308,13 +310,9 @@ def list_resources():
                 booking_counts[resource.id] = count
             all_resources.sort(key=lambda r: booking_counts.get(r.id, 0), reverse=True)
         elif sort_by == 'top_rated':
-            # Sort by average rating (if reviews exist)
-            def get_avg_rating(resource):
-                reviews = db.session.query(Review).filter_by(resource_id=resource.id).all()
-                if not reviews:
-                    return 0
-                return sum(r.rating for r in reviews) / len(reviews)
-            all_resources.sort(key=get_avg_rating, reverse=True)
+            # Sort by average rating (one lookup on the maintained review stats)
+            ratings = ReviewDAL.get_review_stats_for([r.id for r in all_resources])
+            all_resources.sort(key=lambda r: ratings[r.id]['average_rating'], reverse=True)
         else:  # 'recent' or default
             # Sort by creation date, most recent first
             all_resources.sort(key=lambda r: r.created_at or dt.min, reverse=True)
@@ -322,6 +320,9 @@ def list_resources():
         total = len(all_resources)
         resources = all_resources[offset:offset + per_page]
         
+        # Ratings for the page's cards, embedded so the page needs no extra requests
+        review_stats = ReviewDAL.get_review_stats_for([r.id for r in resources])
+        
         # Calculate pagination
         total_pages = (total + per_page - 1) // per_page
         has_prev = page > 1
@@ -397,6 +398,7 @@ def list_resources():
         return render_template(
             'resources/list.html',
             resources=resources,
+            review_stats=review_stats,
             recommendations=recommendations,
             keyword=keyword,
             resource_type=resource_type,
@@ -424,6 +426,7 @@ def list_resources():
         return render_template(
             'resources/list.html',
             resources=[],
+            review_stats={},
             recommendations=[],
             keyword='',
             resource_type='',
@@ -458,7 +461,8 @@ def detail_resource(resource_id):
         
         return render_template(
             'resources/detail.html',
-            resource=resource
+            resource=resource,
+            reviews_html=render_resource_reviews(resource.id, current_user)
         )
     
     except Exception as e:
@@ -3,13 +3,14 @@ Reviews Blueprint - Rating and review functionality for campus resources
 Handles: creating, editing, deleting reviews, and displaying averages
 """
 
-from flask import Blueprint, request, jsonify, redirect, url_for, flash, render_template
+from flask import Blueprint, request, jsonify, redirect, url_for, flash, render_template, current_app
 from flask_login import login_required, current_user
 from flask_wtf.csrf import validate_csrf, CSRFError
 from src.models import Resource, Review, Booking
 from src.extensions import db, csrf_protect
 from src.data_access.review_dal import ReviewDAL
 from src.data_access.resource_dal import ResourceDAL
+from src.services.review_fragments import review_viewer
 
 # Create Blueprint
 bp = Blueprint(
@@ -24,6 +25,19 @@ review_dal = ReviewDAL()
 resource_dal = ResourceDAL()
 
 
+def _flag_queue_cursor(review) -> str:
+    """Opaque keyset cursor for the flag queue: '<flag_count>_<flagged_at ISO>_<id>'."""
+    flagged_at = review.flagged_at.isoformat() if review.flagged_at else ''
+    return f"{review.flag_count}_{flagged_at}_{review.id}"
+
+
+def _parse_flag_queue_cursor(value: str) -> tuple:
+    """Parse a cursor from _flag_queue_cursor into (flag_count, flagged_at, id); raises ValueError."""
+    from datetime import datetime
+    flag_count, flagged_at, review_id = value.split('_')
+    return int(flag_count), datetime.fromisoformat(flagged_at) if flagged_at else None, int(review_id)
+
+
 # ==================== FLAGGED REVIEWS PAGE ====================
 
 @bp.route('/flagged-page', methods=['GET'])
@@ -155,11 +169,11 @@ def get_resource_reviews(resource_id):
     Get all reviews for a specific resource.
     
     Query params:
-    - limit: Number of reviews to return
+    - limit: Number of reviews to return (default: REVIEW_PAGE_SIZE)
     - offset: Number of reviews to skip
-    - json: Return JSON (1) or HTML (0, default)
+    - format: 'html' to return the rendered review items (detail page 'Show more reviews')
     
-    Returns: JSON with reviews and average rating
+    Returns: JSON with reviews and average rating, or rendered items and has_more
     """
     try:
         # Verify resource exists
@@ -168,7 +182,7 @@ def get_resource_reviews(resource_id):
             return jsonify({'status': 'error', 'message': 'Resource not found'}), 404
         
         # Get pagination params
-        limit = request.args.get('limit', 10, type=int)
+        limit = request.args.get('limit', current_app.config.get('REVIEW_PAGE_SIZE', 10), type=int)
         offset = request.args.get('offset', 0, type=int)
         
         # Get reviews
@@ -177,6 +191,15 @@ def get_resource_reviews(resource_id):
         # Get stats
         stats = review_dal.get_review_stats(resource_id)
         
+        if request.args.get('format') == 'html':
+            return jsonify({
+                'status': 'success',
+                'html': render_template('reviews/_review_items.html', reviews=reviews,
+                                        **review_viewer(current_user)),
+                'count': len(reviews),
+                'has_more': offset + len(reviews) < stats['total_reviews']
+            }), 200
+        
         # Get reviewer info for each review
         reviews_data = []
         for review in reviews:
@@ -226,6 +249,40 @@ def get_average_rating(resource_id):
         return jsonify({'status': 'error', 'message': f'Error fetching rating: {str(e)}'}), 500
 
 
+# ==================== BATCH STATS ====================
+
+@bp.route('/stats', methods=['GET'])
+def get_review_stats_batch():
+    """
+    Get rating stats for many resources in one request (e.g. listing cards).
+    
+    Query params:
+    - ids: Comma-separated resource IDs (at most 100)
+    
+    Returns: JSON with stats keyed by resource ID - average_rating, total_reviews, distribution
+    """
+    try:
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'ids must be comma-separated integers'}), 400
+        
+        if not ids:
+            return jsonify({'status': 'error', 'message': 'ids is required'}), 400
+        if len(ids) > 100:
+            return jsonify({'status': 'error', 'message': 'At most 100 ids per request'}), 400
+        
+        stats = review_dal.get_review_stats_for(ids)
+        
+        return jsonify({
+            'status': 'success',
+            'stats': {str(resource_id): resource_stats for resource_id, resource_stats in stats.items()}
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error fetching review stats: {str(e)}'}), 500
+
+
 # ==================== CHECK IF USER CAN REVIEW ====================
 
 @bp.route('/can-review/<int:resource_id>', methods=['GET'])
@@ -396,43 +453,14 @@ def flag_review(review_id):
             return jsonify({'status': 'error', 'message': 'Review not found'}), 404
         
         # Get flag reason
-        data = request.get_json()
-        reason = data.get('reason', 'No reason provided')
-        
-        # Parse existing flagged_by list
-        import json
-        flagged_by_list = []
-        if review.flagged_by:
-            try:
-                flagged_by_list = json.loads(review.flagged_by)
-            except:
-                flagged_by_list = []
-        
-        # Check if user already flagged this review
-        if current_user.id in flagged_by_list:
-            return jsonify({
-                'status': 'error',
-                'message': 'You have already flagged this review'
-            }), 400
-        
-        # Add user to flagged_by list
-        flagged_by_list.append(current_user.id)
-        review.flagged_by = json.dumps(flagged_by_list)
-        
-        # Update flag information
-        review.is_flagged = True
-        review.flag_count = len(flagged_by_list)
+        data = request.get_json(silent=True) or {}
+        reason = data.get('reason') or 'No reason provided'
         
-        # Update or append flag reason
-        from datetime import datetime
-        if review.flag_reason:
-            review.flag_reason += f"\n[{current_user.username} - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}]: {reason}"
-        else:
-            review.flag_reason = f"[{current_user.username} - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}]: {reason}"
-            review.flagged_at = datetime.utcnow()
-        
-        # Save changes
-        db.session.commit()
+        # One flag per user is enforced by review_flags' unique constraint
+        try:
+            review = review_dal.flag_review(review_id, current_user.id, reason)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
         
         return jsonify({
             'status': 'success',
@@ -451,31 +479,55 @@ def flag_review(review_id):
 @login_required
 def get_flagged_reviews():
     """
-    Get all flagged reviews (staff/admin only).
+    Get a page of the flagged reviews queue (staff/admin only).
+    Most flagged reviews come first, then the most recently flagged.
+    
+    Query parameters:
+    - cursor (str): next_cursor from the previous page. Optional.
+    - per_page (int): Reviews per page (max 100). Default: 20
     
-    Returns: JSON list of flagged reviews
+    Returns: JSON list of flagged reviews with their flags
     """
     try:
         # Check authorization
         if current_user.role not in ['staff', 'admin']:
             return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
         
-        # Get all flagged reviews
-        flagged_reviews = Review.query.filter_by(is_flagged=True).order_by(Review.flagged_at.desc()).all()
+        try:
+            after = _parse_flag_queue_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        
+        # Fetch one extra row to learn whether another page exists
+        flagged_reviews = review_dal.get_flag_queue(limit=per_page + 1, after=after)
+        has_more = len(flagged_reviews) > per_page
+        flagged_reviews = flagged_reviews[:per_page]
+        flags = review_dal.get_review_flags([review.id for review in flagged_reviews])
         
         # Convert to dict with additional info
         reviews_data = []
         for review in flagged_reviews:
+            review_flags = flags[review.id]
             review_dict = review.to_dict()
             review_dict['reviewer_name'] = review.reviewer.username
             review_dict['resource_name'] = review.resource.name
-            review_dict['flag_reason'] = review.flag_reason
+            review_dict['flagged_at'] = review.flagged_at.isoformat() if review.flagged_at else None
+            review_dict['flags'] = [flag.to_dict() for flag in review_flags]
+            review_dict['flag_reason'] = '\n'.join(
+                f"[{flag.user.username} - {flag.created_at.strftime('%Y-%m-%d %H:%M')}]: {flag.reason}"
+                for flag in review_flags
+            )
             reviews_data.append(review_dict)
         
         return jsonify({
             'status': 'success',
             'reviews': reviews_data,
-            'count': len(reviews_data)
+            'count': len(reviews_data),
+            'total': review_dal.count_flagged(),
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': _flag_queue_cursor(flagged_reviews[-1]) if has_more else None
         }), 200
     
     except Exception as e:
@@ -497,20 +549,10 @@ def unflag_review(review_id):
         if current_user.role not in ['staff', 'admin']:
             return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
         
-        # Get review
-        review = Review.query.get(review_id)
-        if not review:
+        # Clear flags
+        if not review_dal.clear_flags(review_id):
             return jsonify({'status': 'error', 'message': 'Review not found'}), 404
         
-        # Clear flag
-        review.is_flagged = False
-        review.flag_count = 0
-        review.flagged_by = None
-        review.flag_reason = None
-        review.flagged_at = None
-        
-        db.session.commit()
-        
         return jsonify({
             'status': 'success',
             'message': 'Flag removed successfully'
@@ -14,7 +14,8 @@ class BookingDAL:
 
     @staticmethod
     def create_booking(user_id: int, resource_id: int, start_time: datetime,
-                      end_time: datetime, status: str = 'pending', notes: str = None) -> Booking:
+                      end_time: datetime, status: str = 'pending', notes: str = None,
+                      commit: bool = True) -> Booking:
         """
         Create a new booking.
 
@@ -25,6 +26,8 @@ class BookingDAL:
             end_time (datetime): Booking end time
             status (str): Booking status - 'pending', 'confirmed', 'cancelled', 'completed'. Default: 'pending'
             notes (str): Optional notes about the booking
+            commit (bool): Commit immediately. Pass False to flush only, so the caller
+                can add related rows (e.g. outbox emails) to the same transaction
 
         Returns:
             Booking: Created booking object
@@ -46,7 +49,10 @@ class BookingDAL:
                 notes=notes
             )
             db.session.add(booking)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             return booking
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -258,6 +264,10 @@ class BookingDAL:
                 if key in allowed_fields:
                     setattr(booking, key, value)
 
+            # A rescheduled booking gets a fresh reminder
+            if 'start_time' in kwargs:
+                booking.reminder_sent_at = None
+
             db.session.commit()
             return booking
         except SQLAlchemyError as e:
@@ -265,12 +275,14 @@ class BookingDAL:
             raise SQLAlchemyError(f"Error updating booking: {str(e)}")
 
     @staticmethod
-    def confirm_booking(booking_id: int) -> Booking:
+    def confirm_booking(booking_id: int, commit: bool = True) -> Booking:
         """
         Confirm a pending booking.
 
         Args:
             booking_id (int): Booking's primary key
+            commit (bool): Commit immediately. Pass False to leave the change in the
+                caller's transaction
 
         Returns:
             Booking: Updated booking object
@@ -285,19 +297,22 @@ class BookingDAL:
                 raise ValueError(f"Booking with ID {booking_id} not found")
 
             booking.status = 'confirmed'
-            db.session.commit()
+            if commit:
+                db.session.commit()
             return booking
         except SQLAlchemyError as e:
             db.session.rollback()
             raise SQLAlchemyError(f"Error confirming booking: {str(e)}")
 
     @staticmethod
-    def cancel_booking(booking_id: int) -> Booking:
+    def cancel_booking(booking_id: int, commit: bool = True) -> Booking:
         """
         Cancel a booking.
 
         Args:
             booking_id (int): Booking's primary key
+            commit (bool): Commit immediately. Pass False to leave the change in the
+                caller's transaction
 
         Returns:
             Booking: Updated booking object
@@ -312,7 +327,8 @@ class BookingDAL:
                 raise ValueError(f"Booking with ID {booking_id} not found")
 
             booking.status = 'cancelled'
-            db.session.commit()
+            if commit:
+                db.session.commit()
             return booking
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -0,0 +1,212 @@
+"""
+Conversation Data Access Layer (DAL)
+Maintains the conversations inbox read model. Write methods run inside the
+caller's transaction and never commit.
+"""
+
+from sqlalchemy import case, or_
+from sqlalchemy.exc import SQLAlchemyError
+from src.extensions import db
+from src.data_access.upsert import upsert_insert
+from src.models import Conversation, Message, User
+
+
+class ConversationDAL:
+    """Data access layer for the conversations read model."""
+
+    @staticmethod
+    def record_message(message: Message) -> None:
+        """
+        Make a newly flushed message the latest in its conversation and count it as
+        unread for the recipient (one INSERT ... ON CONFLICT DO UPDATE).
+
+        Args:
+            message (Message): Message with id and created_at populated
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low, high = Conversation.pair(message.sender_id, message.recipient_id)
+            values = {
+                'user_low_id': low,
+                'user_high_id': high,
+                'thread_id': message.thread_id or message.id,
+                'last_message_id': message.id,
+                'last_sender_id': message.sender_id,
+                'preview': message.body[:100],
+                'last_activity_at': message.created_at,
+                'unread_low': 1 if message.recipient_id == low else 0,
+                'unread_high': 1 if message.recipient_id == high else 0
+            }
+
+            table = Conversation.__table__
+            stmt = upsert_insert(table)
+            if stmt is None:
+                conversation = Conversation.query.filter_by(user_low_id=low, user_high_id=high).first()
+                if not conversation:
+                    db.session.add(Conversation(**values))
+                    return
+                for key, value in values.items():
+                    if key.startswith('unread_'):
+                        value += getattr(conversation, key)
+                    setattr(conversation, key, value)
+                return
+
+            stmt = stmt.values(**values)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.user_low_id, table.c.user_high_id],
+                set_={
+                    'thread_id': stmt.excluded.thread_id,
+                    'last_message_id': stmt.excluded.last_message_id,
+                    'last_sender_id': stmt.excluded.last_sender_id,
+                    'preview': stmt.excluded.preview,
+                    'last_activity_at': stmt.excluded.last_activity_at,
+                    'unread_low': table.c.unread_low + stmt.excluded.unread_low,
+                    'unread_high': table.c.unread_high + stmt.excluded.unread_high
+                }
+            ))
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error recording conversation message: {str(e)}")
+
+    @staticmethod
+    def adjust_unread(recipient_id: int, sender_id: int, delta: int) -> None:
+        """
+        Change the recipient's unread count in a conversation (never below zero).
+
+        Args:
+            recipient_id (int): ID of user whose unread count changes
+            sender_id (int): ID of the other participant
+            delta (int): Amount to add (negative when messages are read)
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low, high = Conversation.pair(recipient_id, sender_id)
+            column = Conversation.unread_low if recipient_id == low else Conversation.unread_high
+            Conversation.query.filter_by(user_low_id=low, user_high_id=high).update(
+                {column: case((column + delta < 0, 0), else_=column + delta)},
+                synchronize_session=False
+            )
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error adjusting conversation unread count: {str(e)}")
+
+    @staticmethod
+    def clear_unread(recipient_id: int, sender_id: int) -> None:
+        """
+        Reset the recipient's unread count in a conversation to zero.
+
+        Args:
+            recipient_id (int): ID of user who read the conversation
+            sender_id (int): ID of the other participant
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low, high = Conversation.pair(recipient_id, sender_id)
+            column = Conversation.unread_low if recipient_id == low else Conversation.unread_high
+            Conversation.query.filter_by(user_low_id=low, user_high_id=high).update(
+                {column: 0}, synchronize_session=False
+            )
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error clearing conversation unread count: {str(e)}")
+
+    @staticmethod
+    def refresh(user_a: int, user_b: int) -> Conversation:
+        """
+        Recompute a conversation from its messages (after deletes/edits and for backfill).
+        The row is removed when no messages remain.
+
+        Args:
+            user_a (int): One participant
+            user_b (int): The other participant
+
+        Returns:
+            Conversation: Refreshed conversation, or None if the users share no messages
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low, high = Conversation.pair(user_a, user_b)
+            conversation = Conversation.query.filter_by(user_low_id=low, user_high_id=high).first()
+            last = Message.query.filter_by(
+                conversation_key=Message.make_conversation_key(low, high)
+            ).order_by(Message.created_at.desc(), Message.id.desc()).first()
+
+            if not last:
+                if conversation:
+                    db.session.delete(conversation)
+                return None
+
+            if not conversation:
+                conversation = Conversation(user_low_id=low, user_high_id=high)
+                db.session.add(conversation)
+
+            conversation.thread_id = last.thread_id or last.id
+            conversation.last_message_id = last.id
+            conversation.last_sender_id = last.sender_id
+            conversation.preview = last.body[:100]
+            conversation.last_activity_at = last.created_at
+            conversation.unread_low = Message.query.filter_by(
+                sender_id=high, recipient_id=low, is_read=False).count()
+            conversation.unread_high = Message.query.filter_by(
+                sender_id=low, recipient_id=high, is_read=False).count()
+            return conversation
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error refreshing conversation: {str(e)}")
+
+    @staticmethod
+    def rebuild_all() -> int:
+        """
+        Rebuild the read model for every pair of users who have exchanged messages.
+
+        Returns:
+            int: Number of conversations rebuilt
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low = case((Message.sender_id < Message.recipient_id, Message.sender_id), else_=Message.recipient_id)
+            high = case((Message.sender_id < Message.recipient_id, Message.recipient_id), else_=Message.sender_id)
+            pairs = db.session.query(low, high).distinct().all()
+            for user_low_id, user_high_id in pairs:
+                ConversationDAL.refresh(user_low_id, user_high_id)
+            return len(pairs)
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error rebuilding conversations: {str(e)}")
+
+    @staticmethod
+    def get_user_conversations(user_id: int, limit: int = None, offset: int = 0) -> list:
+        """
+        Get a user's conversations, most recent activity first, with the other participant.
+
+        Args:
+            user_id (int): ID of user
+            limit (int): Maximum number of conversations to return. Optional.
+            offset (int): Number of conversations to skip. Default: 0
+
+        Returns:
+            list: (Conversation, User) pairs where User is the other participant
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            other_id = case(
+                (Conversation.user_low_id == user_id, Conversation.user_high_id),
+                else_=Conversation.user_low_id
+            )
+            query = db.session.query(Conversation, User).join(User, User.id == other_id).filter(
+                or_(Conversation.user_low_id == user_id, Conversation.user_high_id == user_id)
+            ).order_by(Conversation.last_activity_at.desc(), Conversation.id.desc()).offset(offset)
+
+            if limit:
+                query = query.limit(limit)
+
+            return query.all()
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error fetching conversations: {str(e)}")
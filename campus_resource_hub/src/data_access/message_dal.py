@@ -2,12 +2,31 @@
 Message Data Access Layer (DAL)
 Handles all database operations for Message model with CRUD functions.
 Supports threading with thread_id for conversation grouping.
+Every write keeps the conversations read model (ConversationDAL) in step.
 """
 
+import re
+from contextlib import nullcontext
 from datetime import datetime
+from sqlalchemy import and_, case, cast, column, func, literal_column, or_, String, table
 from sqlalchemy.exc import SQLAlchemyError
 from src.extensions import db
+from src.data_access.conversation_dal import ConversationDAL
 from src.models import Message
+from src.services.event_broker import event_broker
+from src.services.unread_counters import unread_counters, MESSAGES
+
+# Markers around matched terms in search snippets (escape the text, then replace)
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+def _publish_read_receipt(reader_id: int, sender_id: int, read_at: datetime, message_id: int = None) -> None:
+    """Queue a 'read' event for both participants (message_id None means all of sender's messages)."""
+    data = {'reader_id': reader_id, 'sender_id': sender_id, 'message_id': message_id,
+            'read_at': read_at.isoformat()}
+    for user_id in (reader_id, sender_id):
+        event_broker.publish_after_commit(db.session, user_id, 'read', data)
 
 
 class MessageDAL:
@@ -15,7 +34,7 @@ class MessageDAL:
 
     @staticmethod
     def send_message(sender_id: int, recipient_id: int, subject: str, body: str,
-                    thread_id: int = None) -> Message:
+                    thread_id: int = None, commit: bool = True) -> Message:
         """
         Send a new message.
 
@@ -25,6 +44,9 @@ class MessageDAL:
             subject (str): Message subject
             body (str): Message body/content
             thread_id (int): Optional thread ID for conversation grouping
+            commit (bool): Commit immediately. Pass False to flush the message into
+                the caller's transaction, inside a savepoint so a failed insert
+                leaves the caller's other pending changes intact
 
         Returns:
             Message: Created message object
@@ -37,13 +59,14 @@ class MessageDAL:
             if sender_id == recipient_id:
                 raise ValueError("Sender and recipient cannot be the same user")
 
-            # If no thread_id provided, try to find an existing conversation
+            conversation_key = Message.make_conversation_key(sender_id, recipient_id)
+
+            # If no thread_id provided, join the existing conversation's thread
             if not thread_id:
-                # Look for any message in an existing conversation between these users
-                existing_message = Message.query.filter(
-                    ((Message.sender_id == sender_id) & (Message.recipient_id == recipient_id)) |
-                    ((Message.sender_id == recipient_id) & (Message.recipient_id == sender_id))
-                ).first()
+                # One seek on the conversation_key index for the conversation's first message
+                existing_message = Message.query.with_entities(Message.id, Message.thread_id).filter_by(
+                    conversation_key=conversation_key
+                ).order_by(Message.created_at, Message.id).first()
                 
                 # Use existing thread_id if found, otherwise use first message's ID as thread
                 if existing_message and existing_message.thread_id:
@@ -52,19 +75,31 @@ class MessageDAL:
                     # Use the first message's ID as the thread_id for all messages in this conversation
                     thread_id = existing_message.id
 
-            message = Message(
-                sender_id=sender_id,
-                recipient_id=recipient_id,
-                subject=subject,
-                body=body,
-                thread_id=thread_id,
-                is_read=False
-            )
-            db.session.add(message)
-            db.session.commit()
+            with nullcontext() if commit else db.session.begin_nested():
+                message = Message(
+                    sender_id=sender_id,
+                    recipient_id=recipient_id,
+                    subject=subject,
+                    body=body,
+                    thread_id=thread_id,
+                    conversation_key=conversation_key,
+                    is_read=False
+                )
+                db.session.add(message)
+                db.session.flush()
+                ConversationDAL.record_message(message)
+            for user_id in (recipient_id, sender_id):  # Sender too, for their other open tabs
+                event_broker.publish_after_commit(db.session, user_id, 'message', message.to_dict())
+            if commit:
+                db.session.commit()
+                unread_counters.adjust(MESSAGES, recipient_id, 1)
+            else:
+                unread_counters.adjust_after_commit(db.session, MESSAGES, recipient_id, 1)
             return message
         except SQLAlchemyError as e:
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
+            # Otherwise only the savepoint was rolled back; the caller's transaction decides
             raise SQLAlchemyError(f"Error sending message: {str(e)}")
 
     @staticmethod
@@ -158,10 +193,9 @@ class MessageDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            query = Message.query.filter(
-                ((Message.sender_id == user_id1) & (Message.recipient_id == user_id2)) |
-                ((Message.sender_id == user_id2) & (Message.recipient_id == user_id1))
-            ).order_by(Message.created_at).offset(offset)
+            query = Message.query.filter_by(
+                conversation_key=Message.make_conversation_key(user_id1, user_id2)
+            ).order_by(Message.created_at, Message.id).offset(offset)
 
             if limit:
                 query = query.limit(limit)
@@ -170,6 +204,57 @@ class MessageDAL:
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error fetching conversation: {str(e)}")
 
+    @staticmethod
+    def get_conversation_window(user_id1: int, user_id2: int, limit: int = 50, before: tuple = None,
+                                since: tuple = None) -> tuple:
+        """
+        Get one page of a conversation by (created_at, id) keyset, so cost depends on
+        the page size rather than the length of the conversation.
+
+        Without a cursor the most recent messages are returned; 'before' pages
+        backwards through older messages and 'since' fetches only newer ones.
+
+        Args:
+            user_id1 (int): ID of first user
+            user_id2 (int): ID of second user
+            limit (int): Maximum number of messages to return. Default: 50
+            before (tuple): (created_at, id) of the oldest message already shown. Optional.
+            since (tuple): (created_at, id) of the newest message already shown. Optional.
+
+        Returns:
+            tuple: (list of Message objects oldest first, has_more flag). has_more means
+                older messages remain, or newer ones when paging with 'since'.
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            query = Message.query.filter_by(conversation_key=Message.make_conversation_key(user_id1, user_id2))
+
+            if since:
+                created_at, message_id = since
+                query = query.filter(or_(
+                    Message.created_at > created_at,
+                    and_(Message.created_at == created_at, Message.id > message_id)
+                )).order_by(Message.created_at, Message.id)
+            else:
+                if before:
+                    created_at, message_id = before
+                    query = query.filter(or_(
+                        Message.created_at < created_at,
+                        and_(Message.created_at == created_at, Message.id < message_id)
+                    ))
+                query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+            messages = query.limit(limit + 1).all()
+            has_more = len(messages) > limit
+            messages = messages[:limit]
+            if not since:
+                messages.reverse()
+            return messages, has_more
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error fetching conversation window: {str(e)}")
+
     @staticmethod
     def get_inbox_messages(recipient_id: int, unread_only: bool = False, limit: int = None,
                           offset: int = 0) -> list:
@@ -250,7 +335,10 @@ class MessageDAL:
             if not message.is_read:
                 message.is_read = True
                 message.read_at = datetime.utcnow()
+                ConversationDAL.adjust_unread(message.recipient_id, message.sender_id, -1)
+                _publish_read_receipt(message.recipient_id, message.sender_id, message.read_at, message.id)
                 db.session.commit()
+                unread_counters.adjust(MESSAGES, message.recipient_id, -1)
 
             return message
         except SQLAlchemyError as e:
@@ -280,7 +368,9 @@ class MessageDAL:
             if message.is_read:
                 message.is_read = False
                 message.read_at = None
+                ConversationDAL.adjust_unread(message.recipient_id, message.sender_id, 1)
                 db.session.commit()
+                unread_counters.adjust(MESSAGES, message.recipient_id, 1)
 
             return message
         except SQLAlchemyError as e:
@@ -288,12 +378,15 @@ class MessageDAL:
             raise SQLAlchemyError(f"Error marking message as unread: {str(e)}")
 
     @staticmethod
-    def mark_thread_as_read(thread_id: int) -> int:
+    def mark_thread_as_read(thread_id: int, recipient_id: int = None) -> int:
         """
-        Mark all unread messages in a thread as read.
+        Mark all unread messages in a thread as read with a single UPDATE.
+        A grouped count taken first keeps conversation and badge counts exact.
 
         Args:
             thread_id (int): Thread's ID
+            recipient_id (int): Only mark messages addressed to this user. Optional
+                (when omitted, every unread message in the thread is marked).
 
         Returns:
             int: Number of messages marked as read
@@ -302,26 +395,77 @@ class MessageDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            messages = Message.query.filter_by(thread_id=thread_id, is_read=False).all()
-            count = 0
+            query = Message.query.filter_by(thread_id=thread_id, is_read=False)
+            if recipient_id is not None:
+                query = query.filter_by(recipient_id=recipient_id)
+
+            # Per-pair totals keep the conversation and badge counts exact
+            unread_by_pair = query.with_entities(
+                Message.recipient_id, Message.sender_id, func.count(Message.id)
+            ).group_by(Message.recipient_id, Message.sender_id).all()
+            if not unread_by_pair:
+                return 0
+
+            read_at = datetime.utcnow()
+            count = query.update(
+                {Message.is_read: True, Message.read_at: read_at},
+                synchronize_session='evaluate'
+            )
+            for reader_id, sender_id, pair_count in unread_by_pair:
+                ConversationDAL.adjust_unread(reader_id, sender_id, -pair_count)
+                _publish_read_receipt(reader_id, sender_id, read_at)
+            db.session.commit()
 
-            for message in messages:
-                message.is_read = True
-                message.read_at = datetime.utcnow()
-                count += 1
+            for reader_id, _, pair_count in unread_by_pair:
+                unread_counters.adjust(MESSAGES, reader_id, -pair_count)
+            return count
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error marking thread as read: {str(e)}")
+
+    @staticmethod
+    def mark_conversation_as_read(recipient_id: int, sender_id: int) -> int:
+        """
+        Mark all unread messages from one user to another as read with a single UPDATE.
+
+        Args:
+            recipient_id (int): ID of user reading the conversation
+            sender_id (int): ID of the other participant
+
+        Returns:
+            int: Number of messages marked as read
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            read_at = datetime.utcnow()
+            count = Message.query.filter_by(
+                recipient_id=recipient_id,
+                sender_id=sender_id,
+                is_read=False
+            ).update(
+                {Message.is_read: True, Message.read_at: read_at},
+                synchronize_session='evaluate'
+            )
 
             if count > 0:
+                ConversationDAL.clear_unread(recipient_id, sender_id)
+                _publish_read_receipt(recipient_id, sender_id, read_at)
                 db.session.commit()
+                unread_counters.adjust(MESSAGES, recipient_id, -count)
 
             return count
         except SQLAlchemyError as e:
             db.session.rollback()
-            raise SQLAlchemyError(f"Error marking thread as read: {str(e)}")
+            raise SQLAlchemyError(f"Error marking conversation as read: {str(e)}")
 
     @staticmethod
     def get_unread_count(user_id: int) -> int:
         """
         Get count of unread messages for a user.
+        Served from the per-user counter cache; the COUNT query only runs on a
+        cache miss or when the counter is due for reconciliation.
 
         Args:
             user_id (int): ID of recipient
@@ -333,38 +477,65 @@ class MessageDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            return Message.query.filter_by(recipient_id=user_id, is_read=False).count()
+            return unread_counters.get(
+                MESSAGES, user_id,
+                lambda: Message.query.filter_by(recipient_id=user_id, is_read=False).count()
+            )
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error counting unread messages: {str(e)}")
 
     @staticmethod
-    def search_messages(user_id: int, search_term: str, limit: int = None, offset: int = 0) -> list:
+    def search_messages(user_id: int, search_term: str, limit: int = 20, after: tuple = None) -> tuple:
         """
-        Search messages by subject or body for a user.
+        Search a user's sent and received messages by subject or body, best match first.
+
+        On SQLite this is a MATCH against the messages_fts index joined to the
+        participant filter, ranked by bm25 with highlighted snippets. Other
+        databases fall back to a substring scan ordered newest first.
 
         Args:
             user_id (int): ID of user (searches both sent and received)
-            search_term (str): Term to search for
-            limit (int): Maximum number of messages to return. Optional.
-            offset (int): Number of messages to skip. Default: 0
+            search_term (str): Words to search for (each matched as a prefix)
+            limit (int): Maximum number of results to return. Default: 20
+            after (tuple): (rank, id) of the last result already shown. Optional.
 
         Returns:
-            list: List of Message objects matching search term
+            tuple: (list of (Message, snippet, rank) triples, has_more flag). Matched
+                terms in snippets are wrapped in SNIPPET_START and SNIPPET_END.
 
         Raises:
             SQLAlchemyError: For database errors
         """
         try:
-            search_pattern = f"%{search_term}%"
-            query = Message.query.filter(
-                (Message.sender_id == user_id) | (Message.recipient_id == user_id),
-                (Message.subject.ilike(search_pattern)) | (Message.body.ilike(search_pattern))
-            ).order_by(Message.created_at.desc()).offset(offset)
-
-            if limit:
-                query = query.limit(limit)
-
-            return query.all()
+            terms = re.findall(r'\w+', search_term or '')
+            if not terms:
+                return [], False
+
+            participant = or_(Message.sender_id == user_id, Message.recipient_id == user_id)
+
+            if db.session.get_bind().dialect.name == 'sqlite':
+                messages_fts = table('messages_fts', column('rowid'))
+                fts = literal_column('messages_fts')  # The table name doubles as its hidden MATCH column
+                rank = func.bm25(fts)
+                snippet = func.snippet(fts, -1, SNIPPET_START, SNIPPET_END, '…', 16)
+                match = ' '.join(f'"{term}"*' for term in terms)
+                query = db.session.query(Message, snippet, rank).join(
+                    messages_fts, messages_fts.c.rowid == Message.id
+                ).filter(fts.op('MATCH')(match), participant)
+            else:
+                rank = -Message.id
+                query = db.session.query(Message, func.substr(Message.body, 1, 160), rank).filter(
+                    participant,
+                    and_(*(or_(Message.subject.ilike(f"%{term}%"), Message.body.ilike(f"%{term}%"))
+                           for term in terms))
+                )
+
+            if after:
+                after_rank, after_id = after
+                query = query.filter(or_(rank > after_rank, and_(rank == after_rank, Message.id > after_id)))
+
+            rows = query.order_by(rank, Message.id).limit(limit + 1).all()
+            return [tuple(row) for row in rows[:limit]], len(rows) > limit
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error searching messages: {str(e)}")
 
@@ -394,6 +565,8 @@ class MessageDAL:
                 if key in allowed_fields:
                     setattr(message, key, value)
 
+            if 'body' in kwargs or 'thread_id' in kwargs:
+                ConversationDAL.refresh(message.sender_id, message.recipient_id)
             db.session.commit()
             return message
         except SQLAlchemyError as e:
@@ -419,8 +592,14 @@ class MessageDAL:
             if not message:
                 return False
 
+            was_unread = not message.is_read
+            recipient_id = message.recipient_id
             db.session.delete(message)
+            db.session.flush()
+            ConversationDAL.refresh(message.sender_id, recipient_id)
             db.session.commit()
+            if was_unread:
+                unread_counters.adjust(MESSAGES, recipient_id, -1)
             return True
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -441,3 +620,38 @@ class MessageDAL:
             return Message.query.count()
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error counting messages: {str(e)}")
+
+    @staticmethod
+    def backfill_conversation_keys(batch_size: int = 10000) -> int:
+        """
+        Fill conversation_key on messages created before the column existed,
+        committing one bounded batch at a time.
+
+        Args:
+            batch_size (int): Messages updated per commit. Default: 10000
+
+        Returns:
+            int: Number of messages updated
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            low = case((Message.sender_id < Message.recipient_id, Message.sender_id), else_=Message.recipient_id)
+            high = case((Message.sender_id < Message.recipient_id, Message.recipient_id), else_=Message.sender_id)
+            key = cast(low, String) + '-' + cast(high, String)
+            updated = 0
+            while True:
+                ids = [row.id for row in db.session.query(Message.id).filter(
+                    Message.conversation_key.is_(None)
+                ).limit(batch_size)]
+                if not ids:
+                    return updated
+                Message.query.filter(Message.id.in_(ids)).update(
+                    {Message.conversation_key: key}, synchronize_session=False
+                )
+                db.session.commit()
+                updated += len(ids)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error backfilling conversation keys: {str(e)}")
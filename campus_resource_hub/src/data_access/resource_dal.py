@@ -225,6 +225,68 @@ class ResourceDAL:
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error searching resources: {str(e)}")
 
+    @staticmethod
+    def find_resources(resource_type: str = None, min_capacity: int = None, location: str = None,
+                       start_time: datetime = None, end_time: datetime = None,
+                       limit: int = None) -> list:
+        """
+        Find bookable resources matching structured criteria.
+        Only published, available resources are returned. When a time window is
+        given, resources with an active (pending or confirmed) booking overlapping
+        the window or an availability range excluding it are filtered out.
+
+        Args:
+            resource_type (str): Resource type, matched as a substring so 'room' also
+                matches 'study_room'. Optional.
+            min_capacity (int): Minimum capacity required. Optional.
+            location (str): Substring matched against the location (case-insensitive). Optional.
+            start_time (datetime): Start of the requested window. Optional.
+            end_time (datetime): End of the requested window. Optional.
+            limit (int): Maximum number of resources to return. Optional.
+
+        Returns:
+            list: List of matching Resource objects, smallest sufficient capacity first
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            from src.models import Booking
+
+            query = Resource.query.filter_by(is_available=True, status='published')
+
+            if resource_type:
+                query = query.filter(Resource.resource_type.ilike(f"%{resource_type}%"))
+
+            if min_capacity:
+                query = query.filter(Resource.capacity >= min_capacity)
+
+            if location:
+                query = query.filter(Resource.location.ilike(f"%{location}%"))
+
+            if start_time and end_time:
+                booked_ids = db.session.query(Booking.resource_id).filter(
+                    Booking.status.in_(['pending', 'confirmed']),
+                    Booking.start_time < end_time,
+                    Booking.end_time > start_time
+                )
+                query = query.filter(
+                    ~Resource.id.in_(booked_ids),
+                    (Resource.available_from.is_(None)) | (Resource.available_from <= start_time),
+                    (Resource.available_until.is_(None)) | (Resource.available_until >= end_time)
+                )
+
+            if min_capacity:
+                query = query.order_by(Resource.capacity.asc(), Resource.name.asc())
+            else:
+                query = query.order_by(Resource.name.asc())
+
+            if limit:
+                query = query.limit(limit)
+            return query.all()
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error finding resources: {str(e)}")
+
     @staticmethod
     def update_resource(resource_id: int, **kwargs) -> Resource:
         """
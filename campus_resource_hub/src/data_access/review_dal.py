@@ -1,13 +1,35 @@
 """
 Review Data Access Layer (DAL)
 Handles all database operations for Review model with CRUD functions.
-Includes rating aggregation and validation.
+Includes rating aggregation and validation. Rating aggregates are kept in
+resource_review_stats, updated in the same transaction as each review write.
+Flags live in review_flags (one row per user per review); reviews carry the
+flag count and latest flag time that order the moderation queue. Every write
+bumps the resource's review version (resource_review_stats.updated_at), which
+keys the cached review fragments in every worker process, and drops this
+process's fragments once it commits.
 """
 
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func
+import json
+import re
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import joinedload
 from src.extensions import db
-from src.models import Review
+from src.data_access.upsert import upsert_insert
+from src.models import Review, ReviewFlag, ResourceReviewStats, User
+from src.services.review_fragments import review_fragments
+
+# One line of the legacy flag_reason text: "[username - YYYY-mm-dd HH:MM]: reason"
+LEGACY_FLAG_LINE = re.compile(r'^\[(?P<username>.+?) - (?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2})\]: (?P<reason>.*)$')
+
+
+def _empty_stats() -> dict:
+    """Column values of a stats row for a resource with no reviews."""
+    stats = {'review_count': 0, 'rating_sum': 0}
+    stats.update({f'rating_{rating}': 0 for rating in ResourceReviewStats.RATINGS})
+    return stats
 
 
 class ReviewDAL:
@@ -44,6 +66,8 @@ class ReviewDAL:
                 title=title
             )
             db.session.add(review)
+            ReviewDAL._adjust_stats(resource_id, added=rating)
+            ReviewDAL._reviews_changed(resource_id)
             db.session.commit()
             return review
         except SQLAlchemyError as e:
@@ -110,7 +134,9 @@ class ReviewDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            query = Review.query.filter_by(resource_id=resource_id).order_by(Review.created_at.desc()).offset(offset)
+            query = Review.query.options(joinedload(Review.reviewer)).filter_by(resource_id=resource_id).order_by(
+                Review.created_at.desc(), Review.id.desc()
+            ).offset(offset)
             if limit:
                 query = query.limit(limit)
             return query.all()
@@ -173,6 +199,26 @@ class ReviewDAL:
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error fetching reviews: {str(e)}")
 
+    @staticmethod
+    def get_review_stats_row(resource_id: int) -> ResourceReviewStats:
+        """
+        Get the maintained review aggregates for a resource (primary-key lookup).
+
+        Args:
+            resource_id (int): ID of resource
+
+        Returns:
+            ResourceReviewStats: Stats row, or an unsaved empty one if the resource has no reviews
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            return (db.session.get(ResourceReviewStats, resource_id)
+                    or ResourceReviewStats(resource_id=resource_id, **_empty_stats()))
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error fetching review stats: {str(e)}")
+
     @staticmethod
     def get_average_rating(resource_id: int) -> float:
         """
@@ -188,8 +234,7 @@ class ReviewDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            result = db.session.query(func.avg(Review.rating)).filter_by(resource_id=resource_id).scalar()
-            return float(result) if result else 0.0
+            return float(ReviewDAL.get_review_stats_row(resource_id).average_rating)
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error calculating average rating: {str(e)}")
 
@@ -208,17 +253,7 @@ class ReviewDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-
-            results = db.session.query(
-                Review.rating,
-                func.count(Review.id)
-            ).filter_by(resource_id=resource_id).group_by(Review.rating).all()
-
-            for rating, count in results:
-                distribution[rating] = count
-
-            return distribution
+            return ReviewDAL.get_review_stats_row(resource_id).distribution()
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error getting rating distribution: {str(e)}")
 
@@ -237,18 +272,180 @@ class ReviewDAL:
             SQLAlchemyError: For database errors
         """
         try:
-            total_reviews = Review.query.filter_by(resource_id=resource_id).count()
-            average_rating = ReviewDAL.get_average_rating(resource_id)
-            distribution = ReviewDAL.get_rating_distribution(resource_id)
-
-            return {
-                'average_rating': round(average_rating, 2),
-                'total_reviews': total_reviews,
-                'distribution': distribution
-            }
+            return ReviewDAL.get_review_stats_row(resource_id).to_dict()
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error getting review stats: {str(e)}")
+
+    @staticmethod
+    def get_review_stats_for(resource_ids: list) -> dict:
+        """
+        Get review statistics for many resources with one IN lookup on the stats table.
+
+        Args:
+            resource_ids (list): IDs of resources
+
+        Returns:
+            dict: resource_id -> get_review_stats() dict (zeros for resources without reviews)
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            ids = set(resource_ids)
+            rows = ResourceReviewStats.query.filter(ResourceReviewStats.resource_id.in_(ids)).all() if ids else []
+            stats = {row.resource_id: row.to_dict() for row in rows}
+            for resource_id in ids - stats.keys():
+                stats[resource_id] = ResourceReviewStats(resource_id=resource_id, **_empty_stats()).to_dict()
+            return stats
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error getting review stats: {str(e)}")
 
+    @staticmethod
+    def get_review_version(resource_id: int):
+        """
+        Get the version of a resource's reviews: one primary-key lookup used to
+        tell whether a cached review fragment is current.
+
+        Args:
+            resource_id (int): ID of resource
+
+        Returns:
+            datetime: Time of the last review write, or None if the resource has no stats row
+        """
+        return db.session.query(ResourceReviewStats.updated_at).filter(
+            ResourceReviewStats.resource_id == resource_id
+        ).scalar()
+
+    @staticmethod
+    def _reviews_changed(resource_id: int = None) -> None:
+        """
+        Bump the review version of a resource (of every resource when
+        resource_id is None) inside the caller's transaction, and drop its
+        cached fragments once that commits. Covers writes that leave the rating
+        aggregates alone, such as comment edits and flags.
+        """
+        stmt = update(ResourceReviewStats).values(updated_at=datetime.utcnow())
+        if resource_id is not None:
+            stmt = stmt.where(ResourceReviewStats.resource_id == resource_id)
+        db.session.execute(stmt)
+        review_fragments.invalidate_after_commit(db.session, resource_id)
+
+    @staticmethod
+    def _adjust_stats(resource_id: int, added: int = None, removed: int = None) -> None:
+        """
+        Apply one review's rating change to the resource's stats row inside the
+        caller's transaction, as a single INSERT ... ON CONFLICT DO UPDATE of deltas.
+
+        Args:
+            resource_id (int): ID of resource
+            added (int): Rating entering the aggregates (new review or new rating). Optional.
+            removed (int): Rating leaving the aggregates (deleted review or old rating). Optional.
+        """
+        deltas = _empty_stats()
+        if added is not None:
+            deltas['review_count'] += 1
+            deltas['rating_sum'] += added
+            deltas[f'rating_{added}'] += 1
+        if removed is not None:
+            deltas['review_count'] -= 1
+            deltas['rating_sum'] -= removed
+            deltas[f'rating_{removed}'] -= 1
+
+        table = ResourceReviewStats.__table__
+        stmt = upsert_insert(table)
+        if stmt is None:
+            stats = db.session.get(ResourceReviewStats, resource_id)
+            if not stats:
+                stats = ResourceReviewStats(resource_id=resource_id, **_empty_stats())
+                db.session.add(stats)
+            for key, delta in deltas.items():
+                setattr(stats, key, getattr(stats, key) + delta)
+            return
+
+        stmt = stmt.values(resource_id=resource_id, updated_at=datetime.utcnow(), **deltas)
+        set_ = {key: table.c[key] + stmt.excluded[key] for key in deltas}
+        set_['updated_at'] = stmt.excluded.updated_at
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[table.c.resource_id], set_=set_))
+
+    @staticmethod
+    def compute_review_stats(resource_id: int = None) -> dict:
+        """
+        Compute review aggregates from the reviews table (one GROUP BY).
+
+        Args:
+            resource_id (int): Limit to one resource. Optional (all resources).
+
+        Returns:
+            dict: resource_id -> stats column values, for resources with reviews
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            query = db.session.query(Review.resource_id, Review.rating, func.count(Review.id))
+            if resource_id is not None:
+                query = query.filter(Review.resource_id == resource_id)
+
+            computed = {}
+            for review_resource_id, rating, count in query.group_by(Review.resource_id, Review.rating):
+                stats = computed.setdefault(review_resource_id, _empty_stats())
+                stats['review_count'] += count
+                stats['rating_sum'] += rating * count
+                stats[f'rating_{rating}'] = count
+            return computed
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error computing review stats: {str(e)}")
+
+    @staticmethod
+    def verify_review_stats() -> list:
+        """
+        Compare every stored stats row with aggregates computed from the reviews.
+
+        Returns:
+            list: IDs of resources whose stored stats are missing, stale or orphaned
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            computed = ReviewDAL.compute_review_stats()
+            empty = _empty_stats()
+            mismatched = []
+            stored_ids = set()
+            for stats in ResourceReviewStats.query.all():
+                stored_ids.add(stats.resource_id)
+                stored = {key: getattr(stats, key) for key in empty}
+                if stored != computed.get(stats.resource_id, empty):
+                    mismatched.append(stats.resource_id)
+            mismatched.extend(resource_id for resource_id in computed if resource_id not in stored_ids)
+            return sorted(mismatched)
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error verifying review stats: {str(e)}")
+
+    @staticmethod
+    def rebuild_review_stats() -> int:
+        """
+        Replace every stats row with aggregates computed from the reviews.
+
+        Returns:
+            int: Number of resources with reviews
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            computed = ReviewDAL.compute_review_stats()
+            ResourceReviewStats.query.delete()
+            now = datetime.utcnow()
+            db.session.add_all(ResourceReviewStats(resource_id=resource_id, updated_at=now, **stats)
+                               for resource_id, stats in computed.items())
+            ReviewDAL._reviews_changed()
+            db.session.commit()
+            return len(computed)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error rebuilding review stats: {str(e)}")
+
     @staticmethod
     def update_review(review_id: int, **kwargs) -> Review:
         """
@@ -274,11 +471,15 @@ class ReviewDAL:
                 if not (1 <= kwargs['rating'] <= 5):
                     raise ValueError("Rating must be between 1 and 5")
 
+            if 'rating' in kwargs and kwargs['rating'] != review.rating:
+                ReviewDAL._adjust_stats(review.resource_id, added=kwargs['rating'], removed=review.rating)
+
             allowed_fields = {'rating', 'comment'}
             for key, value in kwargs.items():
                 if key in allowed_fields:
                     setattr(review, key, value)
 
+            ReviewDAL._reviews_changed(review.resource_id)
             db.session.commit()
             return review
         except SQLAlchemyError as e:
@@ -304,6 +505,8 @@ class ReviewDAL:
             if not review:
                 return False
 
+            ReviewDAL._adjust_stats(review.resource_id, removed=review.rating)
+            ReviewDAL._reviews_changed(review.resource_id)
             db.session.delete(review)
             db.session.commit()
             return True
@@ -327,7 +530,12 @@ class ReviewDAL:
         """
         try:
             count = Review.query.filter_by(resource_id=resource_id).count()
+            review_ids = db.session.query(Review.id).filter_by(resource_id=resource_id)
+            ReviewFlag.query.filter(ReviewFlag.review_id.in_(review_ids.scalar_subquery())).delete(
+                synchronize_session=False)
             Review.query.filter_by(resource_id=resource_id).delete()
+            ResourceReviewStats.query.filter_by(resource_id=resource_id).delete()
+            ReviewDAL._reviews_changed(resource_id)
             db.session.commit()
             return count
         except SQLAlchemyError as e:
@@ -369,3 +577,238 @@ class ReviewDAL:
             return Review.query.filter_by(reviewer_id=user_id, resource_id=resource_id).count() > 0
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"Error checking user review: {str(e)}")
+
+    # ==================== FLAGS ====================
+
+    @staticmethod
+    def flag_review(review_id: int, user_id: int, reason: str = None) -> Review:
+        """
+        Record a user's flag on a review and bump the review's flag aggregates.
+
+        Args:
+            review_id (int): Review's primary key
+            user_id (int): ID of user flagging the review
+            reason (str): Reason for flagging. Optional.
+
+        Returns:
+            Review: Flagged review with updated flag_count
+
+        Raises:
+            ValueError: If review not found or the user already flagged it
+            SQLAlchemyError: For database errors
+        """
+        try:
+            review = db.session.get(Review, review_id)
+            if not review:
+                raise ValueError(f"Review with ID {review_id} not found")
+
+            if ReviewFlag.query.filter_by(review_id=review_id, user_id=user_id).first():
+                raise ValueError("You have already flagged this review")
+
+            now = datetime.utcnow()
+            db.session.add(ReviewFlag(review_id=review_id, user_id=user_id, reason=reason, created_at=now))
+            db.session.flush()
+
+            # Increment in SQL so concurrent flags are not lost
+            Review.query.filter_by(id=review_id).update({
+                Review.is_flagged: True,
+                Review.flag_count: Review.flag_count + 1,
+                Review.flagged_at: now
+            }, synchronize_session=False)
+
+            ReviewDAL._reviews_changed(review.resource_id)
+            db.session.commit()
+            return review
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError("You have already flagged this review")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error flagging review: {str(e)}")
+
+    @staticmethod
+    def clear_flags(review_id: int) -> bool:
+        """
+        Dismiss every flag on a review.
+
+        Args:
+            review_id (int): Review's primary key
+
+        Returns:
+            bool: True if flags cleared, False if review not found
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            review = db.session.get(Review, review_id)
+            if not review:
+                return False
+
+            ReviewFlag.query.filter_by(review_id=review_id).delete(synchronize_session=False)
+            review.is_flagged = False
+            review.flag_count = 0
+            review.flagged_at = None
+            review.flagged_by = None
+            review.flag_reason = None
+            ReviewDAL._reviews_changed(review.resource_id)
+            db.session.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error clearing review flags: {str(e)}")
+
+    @staticmethod
+    def get_flag_queue(limit: int = 20, after: tuple = None) -> list:
+        """
+        Get flagged reviews for moderation, most flagged first, then most recently
+        flagged (served by ix_reviews_flag_queue).
+
+        Pages by keyset rather than offset, so later pages cost the same as the
+        first and reviews flagged again while a moderator pages never repeat.
+
+        Args:
+            limit (int): Maximum number of reviews to return. Default: 20
+            after (tuple): (flag_count, flagged_at, id) of the last review already
+                shown. Optional.
+
+        Returns:
+            list: Review objects with reviewer and resource loaded
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            query = Review.query.options(
+                joinedload(Review.reviewer), joinedload(Review.resource)
+            ).filter(Review.is_flagged == True)
+            if after:
+                flag_count, flagged_at, review_id = after
+                if flagged_at is None:
+                    # NULL flagged_at sorts last within a flag count
+                    same_count = and_(Review.flagged_at.is_(None), Review.id < review_id)
+                else:
+                    same_count = or_(
+                        Review.flagged_at < flagged_at,
+                        and_(Review.flagged_at == flagged_at, Review.id < review_id),
+                        Review.flagged_at.is_(None)
+                    )
+                query = query.filter(or_(
+                    Review.flag_count < flag_count,
+                    and_(Review.flag_count == flag_count, same_count)
+                ))
+            return query.order_by(
+                Review.flag_count.desc(), Review.flagged_at.desc(), Review.id.desc()
+            ).limit(limit).all()
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error fetching flagged reviews: {str(e)}")
+
+    @staticmethod
+    def count_flagged() -> int:
+        """
+        Get count of flagged reviews.
+
+        Returns:
+            int: Number of reviews awaiting moderation
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            return Review.query.filter(Review.is_flagged == True).count()
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error counting flagged reviews: {str(e)}")
+
+    @staticmethod
+    def get_review_flags(review_ids: list) -> dict:
+        """
+        Get the flags on several reviews in one query, oldest first.
+
+        Args:
+            review_ids (list): Review IDs
+
+        Returns:
+            dict: review_id -> list of ReviewFlag objects (empty list when unflagged)
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            flags = {review_id: [] for review_id in review_ids}
+            if not flags:
+                return flags
+            rows = ReviewFlag.query.options(joinedload(ReviewFlag.user)).filter(
+                ReviewFlag.review_id.in_(flags.keys())
+            ).order_by(ReviewFlag.created_at, ReviewFlag.id).all()
+            for flag in rows:
+                flags[flag.review_id].append(flag)
+            return flags
+        except SQLAlchemyError as e:
+            raise SQLAlchemyError(f"Error fetching review flags: {str(e)}")
+
+    @staticmethod
+    def migrate_legacy_flags() -> int:
+        """
+        Move flags stored in the legacy flagged_by (JSON user IDs) and flag_reason
+        (one "[username - time]: reason" line per flag) columns into review_flags,
+        then clear those columns. Safe to run repeatedly.
+
+        Returns:
+            int: Number of flag rows created
+
+        Raises:
+            SQLAlchemyError: For database errors
+        """
+        try:
+            legacy = Review.query.filter(
+                (Review.flagged_by.isnot(None)) | (Review.flag_reason.isnot(None))
+            ).all()
+            created = 0
+            for review in legacy:
+                try:
+                    user_ids = [int(user_id) for user_id in json.loads(review.flagged_by or '[]')]
+                except (TypeError, ValueError):
+                    user_ids = []
+
+                # Reasons are matched to users by username; users without a line keep no reason
+                details = {}
+                for line in (review.flag_reason or '').splitlines():
+                    match = LEGACY_FLAG_LINE.match(line.strip())
+                    if match:
+                        details.setdefault(match.group('username'), match)
+                users = User.query.filter(
+                    User.id.in_(user_ids) | User.username.in_(details.keys())
+                ).all() if user_ids or details else []
+
+                existing = {flag.user_id for flag in review.flags}
+                fallback_time = review.flagged_at or review.created_at
+                for user in users:
+                    if user.id in existing:
+                        continue
+                    match = details.get(user.username)
+                    db.session.add(ReviewFlag(
+                        review_id=review.id,
+                        user_id=user.id,
+                        reason=match.group('reason') if match else None,
+                        created_at=datetime.strptime(match.group('ts'), '%Y-%m-%d %H:%M') if match
+                        else fallback_time
+                    ))
+                    existing.add(user.id)
+                    created += 1
+                db.session.flush()
+
+                count, latest = db.session.query(func.count(ReviewFlag.id), func.max(ReviewFlag.created_at)).filter(
+                    ReviewFlag.review_id == review.id).one()
+                if count:
+                    review.is_flagged = True
+                    review.flag_count = count
+                    review.flagged_at = latest
+                review.flagged_by = None
+                review.flag_reason = None
+
+            ReviewDAL._reviews_changed()
+            db.session.commit()
+            return created
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise SQLAlchemyError(f"Error migrating legacy review flags: {str(e)}")
@@ -0,0 +1,27 @@
+"""
+Dialect-specific INSERT ... ON CONFLICT support for upserts.
+SQLite and PostgreSQL share the on_conflict_do_update() API; other dialects
+get None and callers fall back to a plain read-then-write.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.extensions import db
+
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def upsert_insert(table, session=None):
+    """
+    Get an INSERT construct that supports on_conflict_do_update() for the bound dialect.
+
+    Args:
+        table: Table (or model __table__) to insert into
+        session: Session whose bind decides the dialect (defaults to db.session)
+
+    Returns:
+        Insert: Dialect INSERT for the table, or None if upserts are unsupported
+    """
+    dialect = (session or db.session).get_bind().dialect.name
+    insert = _UPSERT_INSERTS.get(dialect)
+    return insert(table) if insert else None
@@ -173,7 +173,8 @@ class UserDAL:
         Args:
             user_id (int): User's primary key
             **kwargs: Fields to update (email, full_name, department, profile_image, role, is_active, 
-                      year_in_school, major, interests, study_preferences, accessibility_needs, preferred_locations)
+                      year_in_school, major, interests, study_preferences, accessibility_needs, preferred_locations,
+                      email_frequency)
 
         Returns:
             User: Updated user object
@@ -191,7 +192,7 @@ class UserDAL:
             allowed_fields = {
                 'email', 'full_name', 'department', 'profile_image', 'role', 'is_active',
                 'year_in_school', 'major', 'interests', 'study_preferences', 
-                'accessibility_needs', 'preferred_locations'
+                'accessibility_needs', 'preferred_locations', 'email_frequency'
             }
             for key, value in kwargs.items():
                 if key in allowed_fields:
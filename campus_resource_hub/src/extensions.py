@@ -3,16 +3,38 @@ Flask extensions initialization.
 Separated from app creation to avoid circular imports.
 """
 
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
-from flask_bcrypt import Bcrypt
 
 # Initialize extensions without binding to app
 db = SQLAlchemy()
 login_manager = LoginManager()
 csrf_protect = CSRFProtect()
-bcrypt = Bcrypt()
+
+
+# pysqlite defers BEGIN until the first write and commits on its own around
+# SAVEPOINT, so a savepoint opened as a transaction's first statement was
+# committed by its RELEASE. Let SQLAlchemy emit BEGIN itself instead, as the
+# SQLAlchemy docs recommend, so session.begin_nested() nests inside a real
+# transaction that the outer rollback still undoes.
+@event.listens_for(Engine, 'connect')
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    """Engine hook: stop pysqlite from issuing its own BEGIN and COMMIT."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(Engine, 'begin')
+def _begin_sqlite_transaction(conn):
+    """Engine hook: start the SQLite transaction when SQLAlchemy does."""
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql('BEGIN')
+
 
 # Configure login manager
 login_manager.login_view = 'auth.login'
@@ -22,6 +44,6 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    from src.models import User
-    return User.query.get(int(user_id))
+    """Load the user's cached identity by ID for Flask-Login."""
+    from src.services.user_identity import user_identities
+    return user_identities.load_identity(int(user_id))
@@ -2,6 +2,8 @@
 Models Module - Database models and schemas
 """
 
-from src.models.models import User, Resource, Booking, Message, Notification, Review
+from src.models.models import (User, Resource, Booking, Message, Conversation, Notification, NotificationArchive,
+                               Review, ReviewFlag, ResourceReviewStats, EmailOutbox, PendingDigestItem)
 
-__all__ = ['User', 'Resource', 'Booking', 'Message', 'Notification', 'Review']
+__all__ = ['User', 'Resource', 'Booking', 'Message', 'Conversation', 'Notification', 'NotificationArchive',
+           'Review', 'ReviewFlag', 'ResourceReviewStats', 'EmailOutbox', 'PendingDigestItem']
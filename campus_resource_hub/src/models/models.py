@@ -1,10 +1,13 @@
 """
 Database models for Campus Resource Hub.
-Includes User, Resource, Booking, Message, and Review models with relationships.
+Includes User, Resource, Booking, Message, and Review models with relationships,
+plus the email outbox and digest queue used for asynchronous delivery.
 """
 
 from datetime import datetime
-from src.extensions import db, bcrypt
+from sqlalchemy import DDL, event
+from sqlalchemy.schema import insert_sentinel
+from src.extensions import db
 from flask_login import UserMixin
 
 
@@ -20,6 +23,13 @@ class User(UserMixin, db.Model):
     
     VALID_ROLES = [ROLE_STUDENT, ROLE_STAFF, ROLE_ADMIN]
     
+    # Email delivery frequency
+    EMAIL_IMMEDIATE = 'immediate'
+    EMAIL_HOURLY = 'hourly'
+    EMAIL_DAILY = 'daily'
+    
+    VALID_EMAIL_FREQUENCIES = [EMAIL_IMMEDIATE, EMAIL_HOURLY, EMAIL_DAILY]
+    
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
     
@@ -45,6 +55,9 @@ class User(UserMixin, db.Model):
     accessibility_needs = db.Column(db.Text, nullable=True)  # JSON: ["wheelchair_access", "quiet_space"]
     preferred_locations = db.Column(db.Text, nullable=True)  # JSON: ["Wells Library", "IMU"]
     
+    # Notification Preferences
+    email_frequency = db.Column(db.String(10), default=EMAIL_IMMEDIATE, server_default=EMAIL_IMMEDIATE, nullable=False)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -59,12 +72,14 @@ class User(UserMixin, db.Model):
     reviews = db.relationship('Review', backref='reviewer', lazy='dynamic', foreign_keys='Review.reviewer_id')
     
     def set_password(self, password):
-        """Hash and set the user's password using bcrypt."""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        """Hash and set the user's password using bcrypt (on the hashing pool)."""
+        from src.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Verify the user's password against bcrypt hash."""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """Verify the user's password against bcrypt hash (on the hashing pool)."""
+        from src.services.password_hasher import password_hasher
+        return password_hasher.verify(password, self.password_hash)
     
     def is_admin(self):
         """Check if user has admin role."""
@@ -96,6 +111,7 @@ class User(UserMixin, db.Model):
             'study_preferences': json.loads(self.study_preferences) if self.study_preferences else {},
             'accessibility_needs': json.loads(self.accessibility_needs) if self.accessibility_needs else [],
             'preferred_locations': json.loads(self.preferred_locations) if self.preferred_locations else [],
+            'email_frequency': self.email_frequency,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -150,6 +166,7 @@ class Resource(db.Model):
     # Relationships
     bookings = db.relationship('Booking', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='resource', lazy='dynamic', cascade='all, delete-orphan')
+    review_stats = db.relationship('ResourceReviewStats', uselist=False, cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert resource to dictionary."""
@@ -219,6 +236,9 @@ class Booking(db.Model):
     modified_at = db.Column(db.DateTime, nullable=True)  # When modified by admin
     change_summary = db.Column(db.Text, nullable=True)  # Summary of what changed (JSON or text)
     
+    # Reminder tracking (set once the reminder notification/email has been created)
+    reminder_sent_at = db.Column(db.DateTime, nullable=True)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -229,6 +249,11 @@ class Booking(db.Model):
     modified_by = db.relationship('User', foreign_keys=[modified_by_id], lazy='joined')
     recurring_instances = db.relationship('Booking', backref=db.backref('parent_booking', remote_side=[id]), lazy='dynamic')
     
+    # The reminder scheduler range-scans unsent reminders by start time
+    __table_args__ = (
+        db.Index('ix_bookings_reminder_due', 'reminder_sent_at', 'start_time'),
+    )
+    
     def to_dict(self):
         """Convert booking to dictionary."""
         return {
@@ -257,6 +282,7 @@ class Message(db.Model):
     
     # Conversation Threading
     thread_id = db.Column(db.Integer, nullable=True, index=True)  # Group related messages
+    conversation_key = db.Column(db.String(50), nullable=True)  # Canonical '<low user id>-<high user id>' pair
     
     # Foreign Keys
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -277,6 +303,16 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     read_at = db.Column(db.DateTime, nullable=True)
     
+    # Thread resolution and conversation views seek on the pair, in time order
+    __table_args__ = (
+        db.Index('ix_messages_conversation_created', 'conversation_key', 'created_at', 'id'),
+    )
+    
+    @staticmethod
+    def make_conversation_key(user_a: int, user_b: int) -> str:
+        """Canonical key shared by every message between two users, in either direction."""
+        return f"{min(user_a, user_b)}-{max(user_a, user_b)}"
+    
     def mark_as_read(self):
         """Mark message as read."""
         self.is_read = True
@@ -300,6 +336,79 @@ class Message(db.Model):
         return f'<Message {self.id}>'
 
 
+# Full-text search over message subject and body (SQLite FTS5). The index is an
+# external-content table keyed by message id, so it stores no second copy of the
+# text, and triggers keep it current on insert, update and delete.
+MESSAGE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "subject, body, content='messages', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, subject, body) "
+    "VALUES ('delete', old.id, old.subject, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF subject, body ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, subject, body) "
+    "VALUES ('delete', old.id, old.subject, old.body); "
+    "INSERT INTO messages_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body); END",
+)
+
+for _statement in MESSAGE_SEARCH_DDL:
+    event.listen(Message.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Message.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS messages_fts").execute_if(dialect='sqlite'))
+
+
+class Conversation(db.Model):
+    """
+    Inbox read model: one row per pair of users who have exchanged messages.
+    Maintained by MessageDAL as messages are sent, read and deleted.
+    """
+    
+    __tablename__ = 'conversations'
+    
+    # Primary Key
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Participants, stored as an ordered pair (user_low_id < user_high_id)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    
+    # Latest message
+    thread_id = db.Column(db.Integer, nullable=True)  # Thread the inbox links to
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_sender_id = db.Column(db.Integer, nullable=True)
+    preview = db.Column(db.String(100), nullable=False, default='')
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Unread messages addressed to each participant
+    unread_low = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    unread_high = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # The inbox lists a user's conversations by recency from either side of the pair
+    __table_args__ = (
+        db.Index('uq_conversations_pair', 'user_low_id', 'user_high_id', unique=True),
+        db.Index('ix_conversations_low_activity', 'user_low_id', 'last_activity_at'),
+        db.Index('ix_conversations_high_activity', 'user_high_id', 'last_activity_at'),
+    )
+    
+    @staticmethod
+    def pair(user_a: int, user_b: int) -> tuple:
+        """Order two user IDs as (user_low_id, user_high_id)."""
+        return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+    
+    def other_user_id(self, user_id: int) -> int:
+        """ID of the participant who is not user_id."""
+        return self.user_high_id if user_id == self.user_low_id else self.user_low_id
+    
+    def unread_for(self, user_id: int) -> int:
+        """Unread messages addressed to user_id."""
+        return self.unread_low if user_id == self.user_low_id else self.unread_high
+    
+    def __repr__(self):
+        return f'<Conversation {self.user_low_id}-{self.user_high_id}>'
+
+
 class Notification(db.Model):
     """User notification model for system events."""
     
@@ -344,10 +453,27 @@ class Notification(db.Model):
     action_url = db.Column(db.String(255), nullable=True)  # URL to navigate to when clicked
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # User who triggered the notification
     
+    # Write-time coalescing: a new event with the same key updates the user's unread row
+    coalesce_key = db.Column(db.String(100), nullable=True)  # e.g. 'new_message:<sender>:<thread>'
+    event_count = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # Events merged into this row
+    
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Bumped on coalesce
     read_at = db.Column(db.DateTime, nullable=True)
     
+    # Lets a bulk INSERT ... RETURNING hand ids back in parameter order on SQLite
+    # (which has no implicit sentinel) without falling back to one row per statement
+    _sentinel = insert_sentinel('_sentinel')
+    
+    __table_args__ = (
+        # Composite index: per-user polling filters on user_id/is_read and orders by created_at;
+        # read_at makes it cover the notification state aggregate behind ETags
+        db.Index('ix_notifications_user_state', 'user_id', 'is_read', 'created_at', 'read_at'),
+        # Upsert target: at most one unread notification per coalesce key
+        db.Index('uq_notifications_user_coalesce_unread', 'user_id', 'coalesce_key', unique=True,
+                 sqlite_where=is_read == False, postgresql_where=is_read == False),
+    )
+    
     def mark_as_read(self):
         """Mark notification as read."""
         self.is_read = True
@@ -364,6 +490,7 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'action_url': self.action_url,
             'sender_id': self.sender_id,
+            'count': self.event_count or 1,
             'created_at': self.created_at.isoformat(),
             'read_at': self.read_at.isoformat() if self.read_at else None
         }
@@ -372,6 +499,56 @@ class Notification(db.Model):
         return f'<Notification {self.id} - {self.notification_type}>'
 
 
+class NotificationArchive(db.Model):
+    """
+    Read notification moved out of the hot notifications table by retention.
+    A row with collapsed_count > 1 summarizes a burst of similar notifications.
+    """
+    
+    __tablename__ = 'notifications_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)  # ID of the (newest) original notification
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    message_id = db.Column(db.Integer, nullable=True)  # Plain IDs: the originals may be deleted later
+    booking_id = db.Column(db.Integer, nullable=True)
+    sender_id = db.Column(db.Integer, nullable=True)
+    notification_type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    action_url = db.Column(db.String(255), nullable=True)
+    collapsed_count = db.Column(db.Integer, default=1, nullable=False)  # Originals summarized by this row
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=False)  # Newest original's creation time
+    first_created_at = db.Column(db.DateTime, nullable=False)  # Oldest original's creation time
+    read_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Archived history is read per user, newest first
+    __table_args__ = (
+        db.Index('ix_notifications_archive_user_created', 'user_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        """Convert archived notification to dictionary."""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'notification_type': self.notification_type,
+            'title': self.title,
+            'description': self.description,
+            'is_read': True,
+            'action_url': self.action_url,
+            'sender_id': self.sender_id,
+            'collapsed_count': self.collapsed_count,
+            'created_at': self.created_at.isoformat(),
+            'read_at': self.read_at.isoformat() if self.read_at else None
+        }
+    
+    def __repr__(self):
+        return f'<NotificationArchive {self.id} - {self.notification_type} x{self.collapsed_count}>'
+
+
 class Review(db.Model):
     """Resource review/rating model."""
     
@@ -389,20 +566,26 @@ class Review(db.Model):
     title = db.Column(db.String(255), nullable=True)
     comment = db.Column(db.Text, nullable=True)
     
-    # Flagging System
+    # Flagging System (individual flags live in review_flags; these are its aggregates)
     is_flagged = db.Column(db.Boolean, default=False, nullable=False, index=True)
     flag_count = db.Column(db.Integer, default=0, nullable=False)
-    flag_reason = db.Column(db.Text, nullable=True)
-    flagged_by = db.Column(db.Text, nullable=True)  # JSON array of user IDs who flagged
-    flagged_at = db.Column(db.DateTime, nullable=True)
+    flagged_at = db.Column(db.DateTime, nullable=True)  # Most recent flag
+    flag_reason = db.Column(db.Text, nullable=True)  # Legacy: read only by the review_flags migration
+    flagged_by = db.Column(db.Text, nullable=True)  # Legacy: JSON array of user IDs who flagged
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Relationships
+    flags = db.relationship('ReviewFlag', backref='review', lazy='dynamic', cascade='all, delete-orphan',
+                            order_by='ReviewFlag.created_at')
+    
     # Constraint: Rating must be 1-5
+    # The moderation queue reads flagged reviews by flag count, then recency
     __table_args__ = (
         db.CheckConstraint('rating >= 1 AND rating <= 5', name='check_rating_range'),
+        db.Index('ix_reviews_flag_queue', 'is_flagged', 'flag_count', 'flagged_at'),
     )
     
     def to_dict(self):
@@ -422,3 +605,157 @@ class Review(db.Model):
     
     def __repr__(self):
         return f'<Review {self.id} - {self.rating} stars>'
+
+
+class ReviewFlag(db.Model):
+    """One user's report of a review, with their reason."""
+    
+    __tablename__ = 'review_flags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    review_id = db.Column(db.Integer, db.ForeignKey('reviews.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    reason = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    user = db.relationship('User')
+    
+    # A user flags a review at most once; the index also serves per-review lookups
+    __table_args__ = (
+        db.UniqueConstraint('review_id', 'user_id', name='uq_review_flags_review_user'),
+    )
+    
+    def to_dict(self):
+        """Convert flag to dictionary."""
+        return {
+            'id': self.id,
+            'review_id': self.review_id,
+            'user_id': self.user_id,
+            'username': self.user.username if self.user else None,
+            'reason': self.reason,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<ReviewFlag {self.review_id} by {self.user_id}>'
+
+
+class ResourceReviewStats(db.Model):
+    """
+    Review aggregates for one resource, maintained by ReviewDAL on every review
+    write so stats and distribution reads are a single primary-key lookup.
+    """
+    
+    __tablename__ = 'resource_review_stats'
+    
+    RATINGS = (1, 2, 3, 4, 5)
+    
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), primary_key=True)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Star histogram
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    @property
+    def average_rating(self) -> float:
+        """Mean rating (0.0 when there are no reviews)."""
+        return self.rating_sum / self.review_count if self.review_count else 0.0
+    
+    def distribution(self) -> dict:
+        """Review count per star rating, {1: count, ..., 5: count}."""
+        return {rating: getattr(self, f'rating_{rating}') or 0 for rating in self.RATINGS}
+    
+    def to_dict(self):
+        """Convert to the ReviewDAL.get_review_stats() shape."""
+        return {
+            'average_rating': round(self.average_rating, 2),
+            'total_reviews': self.review_count or 0,
+            'distribution': self.distribution()
+        }
+    
+    def __repr__(self):
+        return f'<ResourceReviewStats {self.resource_id} - {self.review_count} reviews>'
+
+
+class EmailOutbox(db.Model):
+    """Outgoing email queued in the same transaction as the change that triggered it."""
+    
+    __tablename__ = 'email_outbox'
+    
+    # Delivery status
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    
+    VALID_STATUSES = [STATUS_PENDING, STATUS_SENDING, STATUS_SENT, STATUS_DEAD]
+    
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    to_name = db.Column(db.String(255), nullable=True)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    
+    # Delivery tracking
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)  # When a worker claimed the row
+    last_error = db.Column(db.Text, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    # Workers poll for due rows by status and next attempt time
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def to_dict(self):
+        """Convert outbox entry to dictionary."""
+        return {
+            'id': self.id,
+            'to_email': self.to_email,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} to {self.to_email} ({self.status})>'
+
+
+class PendingDigestItem(db.Model):
+    """Email-worthy event held back for a user's hourly or daily digest."""
+    
+    __tablename__ = 'pending_digest_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    user = db.relationship('User', foreign_keys=[user_id])
+    
+    # The scheduler collects each user's items older than the window cutoff
+    __table_args__ = (
+        db.Index('ix_pending_digest_items_user_created', 'user_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<PendingDigestItem {self.id} for user {self.user_id}>'
@@ -0,0 +1,54 @@
+"""
+Deferred side effects for Campus Resource Hub.
+Caches, counters, live streams and background workers must only see committed
+data. Writes register that work with run_after_commit(); it runs once the
+session's outermost transaction commits and is dropped if it rolls back.
+Savepoints (session.begin_nested()) neither run nor drop it, since the outer
+transaction decides.
+"""
+
+import logging
+from typing import Callable, Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'after_commit_pending'
+
+
+def run_after_commit(session, key: Hashable, callback: Callable[[], None]) -> None:
+    """
+    Run callback once the session's transaction commits.
+
+    Args:
+        session: SQLAlchemy session whose commit triggers the callback
+        key (hashable): Names the work; a key already pending in this
+            transaction is not scheduled again (e.g. one cache invalidation per
+            resource). None always schedules the callback.
+        callback (callable): Called with no arguments after the commit
+    """
+    pending = session.info.setdefault(PENDING_KEY, {})
+    if key is None:
+        key = (PENDING_KEY, len(pending))
+    pending.setdefault(key, callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    """Session hook: run work deferred until the outermost commit."""
+    if session.in_nested_transaction():
+        return  # Savepoint released; the outer transaction can still roll back
+    for key, callback in session.info.pop(PENDING_KEY, {}).items():
+        try:
+            callback()
+        except Exception:
+            logger.exception(f"After-commit callback {key!r} failed")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    """Session hook: drop work deferred by a rolled back transaction."""
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,311 @@
+"""
+Concierge intent router for Campus Resource Hub.
+Recognizes structured resource searches (capacity, building, resource type and
+time window) with local rules and answers them straight from the database,
+so only open-ended questions need a round trip to the Gemini API.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.data_access.resource_dal import ResourceDAL
+
+RESOURCE_URL = "http://127.0.0.1:5000/resources/{id}"
+
+# Keywords mapped to the resource_type values used in the catalog
+TYPE_KEYWORDS = [
+    ('lab', re.compile(r'\b(labs?|studios?)\b')),
+    ('equipment', re.compile(r'\b(equipment|laptops?|cameras?|projectors?|tripods?|kits?|gear)\b')),
+    ('facility', re.compile(r'\b(facilit(?:y|ies)|gyms?|courts?|halls? for events?|auditoriums?)\b')),
+    ('space', re.compile(r'\b(spaces?|lounges?|pods?)\b')),
+    ('room', re.compile(r'\b(rooms?)\b')),
+]
+
+# Common short names mapped to a fragment of the stored location
+BUILDING_ALIASES = {
+    'wells': 'Wells Library',
+    'library': 'Library',
+    'luddy': 'Luddy Hall',
+    'imu': 'Indiana Memorial Union',
+    'memorial union': 'Indiana Memorial Union',
+    'kelley': 'Kelley School',
+    'hodge': 'Hodge Hall',
+    'jacobs': 'Jacobs School',
+    'neal-marshall': 'Neal-Marshall',
+    'neal marshall': 'Neal-Marshall',
+    'srsc': 'Student Recreational Sports Center',
+    'rec center': 'Student Recreational Sports Center',
+    'wright': 'Wright Education',
+    'msb': 'Multidisciplinary Science',
+    'chemistry': 'Chemistry Building',
+}
+
+# Questions containing these cues need reasoning, not a lookup
+OPEN_ENDED_PATTERN = re.compile(
+    r'\b(why|how (?:do|can|does|should)|policy|policies|rules?|recommend|suggest|best|better|'
+    r'compare|difference|should i|explain|hours|open|close|quiet|cancel|approve|approval)\b'
+)
+
+SEARCH_PATTERN = re.compile(r'\b(available|free|find|show|list|any|need|looking for|book)\b')
+
+PEOPLE_WORDS = r'(?:people|persons?|students|ppl|guests|attendees|seats?|capacity)'
+
+# "for 2 days" or "for 3 pm" is a duration or a time, not a head count
+NOT_PEOPLE = r'(?!\s*(?:days?|hours?|hrs?|minutes?|mins?|weeks?|am|pm)\b)'
+
+CAPACITY_PATTERNS = [
+    re.compile(r'\b(?:for|fits?|seats?|holds?)\s+(?:up to\s+|at least\s+)?(\d{1,4})\b' + NOT_PEOPLE),
+    re.compile(r'\bcapacity(?:\s+of)?\s+(?:at least\s+)?(\d{1,4})\b'),
+    re.compile(r'\b(\d{1,4})\s*' + PEOPLE_WORDS + r'\b'),
+]
+
+LOCATION_PATTERN = re.compile(r"\b(?:in|at|inside|near)\s+(?:the\s+)?([A-Z][\w'\-]*(?:\s+[A-Z][\w'\-]*)*)")
+
+TIME_PATTERN = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
+# "8 to 10 people" is a head count, not a time range
+TIME_RANGE_PATTERN = re.compile(
+    r'\b(?:from\s+|between\s+)?' + TIME_PATTERN + r'\s*(?:-|to|until|and)\s*' + TIME_PATTERN + r'\b'
+    r'(?!\s*' + PEOPLE_WORDS + r')'
+)
+TIME_POINT_PATTERN = re.compile(r'\b(?:at|@|around|by)\s+' + TIME_PATTERN + r'\b|\b' + r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b')
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+MAX_RESULTS = 4
+DEFAULT_WINDOW_HOURS = 1
+
+
+class ConciergeIntentRouter:
+    """Rule-based fast path for structured concierge queries."""
+
+    @staticmethod
+    def parse(question: str, now: datetime = None) -> Optional[dict]:
+        """
+        Extract a structured search intent from a question.
+
+        Args:
+            question: User's question
+            now: Reference time for relative dates (defaults to datetime.now())
+
+        Returns:
+            dict with resource_type, min_capacity, location, start_time and end_time
+            keys, or None if the question is open-ended
+        """
+        text = question.strip()
+        lowered = text.lower()
+
+        if OPEN_ENDED_PATTERN.search(lowered):
+            return None
+
+        intent = {
+            'resource_type': ConciergeIntentRouter._parse_type(lowered),
+            'min_capacity': ConciergeIntentRouter._parse_capacity(lowered),
+            'location': ConciergeIntentRouter._parse_location(text, lowered),
+            'start_time': None,
+            'end_time': None,
+        }
+
+        window = ConciergeIntentRouter._parse_window(lowered, now or datetime.now())
+        if window:
+            intent['start_time'], intent['end_time'] = window
+
+        # A building name alone ("Where is the Wells Library?") is a question
+        # about the building; it only narrows a search for resources
+        searching = SEARCH_PATTERN.search(lowered)
+        has_filter = intent['min_capacity'] or intent['start_time'] or (
+            intent['location'] and (intent['resource_type'] or searching)
+        )
+        has_search = intent['resource_type'] and searching
+        if not (has_filter or has_search):
+            return None
+
+        return intent
+
+    @staticmethod
+    def answer(intent: dict) -> Optional[str]:
+        """
+        Answer a parsed intent with a markdown response built from the database.
+
+        Args:
+            intent: Intent dict returned by parse()
+
+        Returns:
+            Markdown response, or None if nothing matched (caller falls back to the LLM)
+        """
+        resources = ResourceDAL.find_resources(
+            resource_type=intent.get('resource_type'),
+            min_capacity=intent.get('min_capacity'),
+            location=intent.get('location'),
+            start_time=intent.get('start_time'),
+            end_time=intent.get('end_time'),
+            limit=MAX_RESULTS + 1
+        )
+
+        if not resources:
+            return None
+
+        shown = resources[:MAX_RESULTS]
+        lines = [f"## {ConciergeIntentRouter._describe(intent)}", ""]
+
+        for res in shown:
+            url = RESOURCE_URL.format(id=res.id)
+            lines.append(f"- **[{res.name}]({url})**")
+            lines.append(f"  • Location: {res.location}")
+            if res.capacity:
+                lines.append(f"  • Capacity: {res.capacity}")
+            if res.requires_approval:
+                lines.append("  • Requires staff approval")
+        lines.append("")
+
+        if len(resources) > MAX_RESULTS:
+            lines.append("We also have other options — narrow your search to see more.")
+            lines.append("")
+
+        lines.append("## 🔗 Quick Links")
+        for res in shown:
+            lines.append(f"- **[{res.name}]({RESOURCE_URL.format(id=res.id)})** - Click to view details and book")
+        lines.append("")
+        lines.append("Would you like help booking one of these?")
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def route(question: str, now: datetime = None) -> Optional[str]:
+        """
+        Try to answer a question locally.
+
+        Returns:
+            Markdown response, or None if the question should go to the LLM
+        """
+        intent = ConciergeIntentRouter.parse(question, now=now)
+        if not intent:
+            return None
+        return ConciergeIntentRouter.answer(intent)
+
+    @staticmethod
+    def _parse_type(lowered: str) -> Optional[str]:
+        for resource_type, pattern in TYPE_KEYWORDS:
+            if pattern.search(lowered):
+                return resource_type
+        return None
+
+    @staticmethod
+    def _parse_capacity(lowered: str) -> Optional[int]:
+        for pattern in CAPACITY_PATTERNS:
+            match = pattern.search(lowered)
+            if match:
+                # Skip clock times such as "for 3pm"
+                tail = lowered[match.end():match.end() + 3].strip()
+                if tail.startswith(('am', 'pm', ':')):
+                    continue
+                value = int(match.group(1))
+                if value > 0:
+                    return value
+        return None
+
+    @staticmethod
+    def _parse_location(text: str, lowered: str) -> Optional[str]:
+        for alias, fragment in BUILDING_ALIASES.items():
+            if re.search(r'\b' + re.escape(alias) + r'\b', lowered):
+                return fragment
+
+        match = LOCATION_PATTERN.search(text)
+        if match:
+            candidate = match.group(1).strip()
+            if candidate.lower() not in WEEKDAYS and len(candidate) > 2:
+                return candidate
+        return None
+
+    @staticmethod
+    def _parse_window(lowered: str, now: datetime):
+        day = None
+        if re.search(r'\btoday\b|\btonight\b', lowered):
+            day = now.date()
+        elif re.search(r'\btomorrow\b', lowered):
+            day = (now + timedelta(days=1)).date()
+        else:
+            for index, name in enumerate(WEEKDAYS):
+                if re.search(r'\b' + name + r'\b', lowered):
+                    days_ahead = (index - now.weekday()) % 7 or 7
+                    day = (now + timedelta(days=days_ahead)).date()
+                    break
+
+        start_hour = end_hour = None
+        range_match = TIME_RANGE_PATTERN.search(lowered)
+        if range_match:
+            h1, m1, ap1, h2, m2, ap2 = range_match.groups()
+            start_hour, end_hour = ConciergeIntentRouter._to_range(h1, m1, ap1, h2, m2, ap2)
+        else:
+            point_match = TIME_POINT_PATTERN.search(lowered)
+            if point_match:
+                groups = point_match.groups()
+                h, m, ap = groups[0:3] if groups[0] else groups[3:6]
+                start_hour = ConciergeIntentRouter._to_time(h, m, ap)
+
+        if start_hour is None:
+            return None
+
+        if day is None:
+            day = now.date()
+        start_time = datetime.combine(day, datetime.min.time()) + start_hour
+        if end_hour is not None and end_hour > start_hour:
+            end_time = datetime.combine(day, datetime.min.time()) + end_hour
+        else:
+            end_time = start_time + timedelta(hours=DEFAULT_WINDOW_HOURS)
+
+        # A bare time that has already passed today means tomorrow
+        if start_time < now and not re.search(r'\btoday\b|\btonight\b', lowered) and day == now.date():
+            start_time += timedelta(days=1)
+            end_time += timedelta(days=1)
+
+        return start_time, end_time
+
+    @staticmethod
+    def _to_range(h1, m1, ap1, h2, m2, ap2):
+        # "2-4pm" shares the trailing meridiem, but "11-1pm" crosses noon, so
+        # the missing one is only borrowed while it keeps start before end
+        start = ConciergeIntentRouter._to_time(h1, m1, ap1 or ap2)
+        end = ConciergeIntentRouter._to_time(h2, m2, ap2 or ap1)
+        if start is not None and end is not None and start >= end:
+            flipped = {'am': 'pm', 'pm': 'am'}
+            if ap2 and not ap1:
+                start = ConciergeIntentRouter._to_time(h1, m1, flipped[ap2])
+            elif ap1 and not ap2:
+                end = ConciergeIntentRouter._to_time(h2, m2, flipped[ap1])
+        return start, end
+
+    @staticmethod
+    def _to_time(hour: str, minute: Optional[str], meridiem: Optional[str]) -> Optional[timedelta]:
+        h = int(hour)
+        m = int(minute) if minute else 0
+        if h > 23 or m > 59:
+            return None
+        if meridiem == 'pm' and h < 12:
+            h += 12
+        elif meridiem == 'am' and h == 12:
+            h = 0
+        elif not meridiem and 1 <= h <= 7:
+            # Bookings run 8 AM - 8 PM, so "at 3" means the afternoon
+            h += 12
+        return timedelta(hours=h, minutes=m)
+
+    @staticmethod
+    def _describe(intent: dict) -> str:
+        noun = {
+            'room': 'Rooms',
+            'lab': 'Labs',
+            'equipment': 'Equipment',
+            'facility': 'Facilities',
+            'space': 'Spaces',
+        }.get(intent.get('resource_type'), 'Resources')
+
+        title = f"{noun} Available"
+        if intent.get('min_capacity'):
+            title += f" for {intent['min_capacity']}+ People"
+        if intent.get('location'):
+            title += f" in {intent['location']}"
+        if intent.get('start_time'):
+            start = intent['start_time']
+            title += f" on {start.strftime('%A, %B %d')} at {start.strftime('%I:%M %p').lstrip('0')}"
+        return title
@@ -0,0 +1,152 @@
+"""
+Email digest scheduler for Campus Resource Hub.
+Collects events held back for users on hourly or daily delivery and sends one
+combined email per user (rendered from the 'digest' template) once their
+digest window closes.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from src.extensions import db
+from src.models import PendingDigestItem, User
+from src.services.email_templates import email_renderer
+
+logger = logging.getLogger(__name__)
+
+
+class DigestScheduler:
+    """
+    Periodically sends digests whose window has closed.
+
+    Hourly windows close on the hour and daily windows at daily_hour (UTC).
+    Users who switched back to immediate delivery have any leftover items
+    flushed on the next run.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.poll_interval = 60
+        self.daily_hour = 7
+        self._thread = None
+        self._stop = threading.Event()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize scheduler settings from the Flask app config."""
+        self.app = app
+        self.poll_interval = app.config.get('EMAIL_DIGEST_POLL_INTERVAL', self.poll_interval)
+        self.daily_hour = app.config.get('EMAIL_DIGEST_DAILY_HOUR', self.daily_hour)
+
+    def start(self):
+        """Start the scheduler thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='email-digest-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Email digest scheduler started")
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """Scheduler loop."""
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_due()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Email digest scheduler error: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def window_cutoff(self, frequency: str, now: datetime) -> datetime:
+        """
+        Items created before this time belong to a closed window.
+
+        Args:
+            frequency (str): User.EMAIL_HOURLY, EMAIL_DAILY or EMAIL_IMMEDIATE
+            now (datetime): Current UTC time
+
+        Returns:
+            datetime: Cutoff time
+        """
+        if frequency == User.EMAIL_HOURLY:
+            return now.replace(minute=0, second=0, microsecond=0)
+        if frequency == User.EMAIL_DAILY:
+            cutoff = now.replace(hour=self.daily_hour, minute=0, second=0, microsecond=0)
+            return cutoff if cutoff <= now else cutoff - timedelta(days=1)
+        return now
+
+    def run_due(self, now: datetime = None) -> int:
+        """
+        Send every digest whose window has closed.
+
+        Each digest's items are claimed by deleting them in the transaction
+        that queues the email. A concurrent run (every worker process may run
+        a scheduler) deletes fewer rows than it read and skips the digest, so
+        it is sent once. With the outbox enabled a crash never loses or
+        duplicates a digest.
+
+        Args:
+            now (datetime): Current UTC time (defaults to utcnow)
+
+        Returns:
+            int: Number of digest emails sent
+        """
+        from src.services.email_service import email_service
+
+        now = now or datetime.utcnow()
+        sent = 0
+        for frequency in User.VALID_EMAIL_FREQUENCIES:
+            items = PendingDigestItem.query.join(
+                User, PendingDigestItem.user_id == User.id
+            ).filter(
+                User.email_frequency == frequency,
+                PendingDigestItem.created_at < self.window_cutoff(frequency, now)
+            ).order_by(PendingDigestItem.user_id, PendingDigestItem.created_at).all()
+
+            # Read IDs up front; a rollback below expires the loaded items
+            groups = []
+            for user_id, group in groupby(items, key=lambda item: item.user_id):
+                group = list(group)
+                groups.append((user_id, [item.id for item in group], group))
+
+            for user_id, item_ids, group in groups:
+                try:
+                    user = group[0].user
+                    email = email_renderer.render('digest', user=user, items=group, frequency=frequency)
+
+                    claimed = PendingDigestItem.query.filter(
+                        PendingDigestItem.id.in_(item_ids)
+                    ).delete(synchronize_session=False)
+                    if claimed != len(item_ids):
+                        db.session.rollback()  # Another run is sending this digest
+                        continue
+
+                    if not email_service.send_email(user.email, email.subject, email.text,
+                                                    user.full_name, email.html):
+                        raise RuntimeError('Email service reported failure')
+                    db.session.commit()
+                    sent += 1
+                except ObjectDeletedError:
+                    db.session.rollback()  # Items sent by another run since they were read
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error sending digest to user {user_id}: {str(e)}")
+        return sent
+
+
+# Global instance
+digest_scheduler = DigestScheduler()
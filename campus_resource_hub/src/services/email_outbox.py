@@ -0,0 +1,223 @@
+"""
+Email outbox worker for Campus Resource Hub.
+Drains the email_outbox table on a background thread pool so requests return
+as soon as the outbox row is committed. Failed sends are retried with
+exponential backoff and moved to a dead-letter state after too many attempts.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from src.extensions import db
+from src.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    """
+    Polls the outbox for due emails and delivers them on a thread pool.
+
+    Rows are claimed with a conditional UPDATE (status and attempt count must
+    still match), so several workers or processes can share one outbox without
+    sending an email twice. A claim expires after lease_seconds, which returns
+    rows held by a crashed worker to the queue.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.workers = 2
+        self.poll_interval = 5
+        self.batch_size = 20
+        self.max_attempts = 5
+        self.backoff_base = 30
+        self.backoff_max = 3600
+        self.lease_seconds = 300
+        self._executor = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize worker settings from the Flask app config."""
+        self.app = app
+        self.workers = app.config.get('EMAIL_OUTBOX_WORKERS', self.workers)
+        self.poll_interval = app.config.get('EMAIL_OUTBOX_POLL_INTERVAL', self.poll_interval)
+        self.batch_size = app.config.get('EMAIL_OUTBOX_BATCH_SIZE', self.batch_size)
+        self.max_attempts = app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff_base = app.config.get('EMAIL_OUTBOX_BACKOFF_BASE', self.backoff_base)
+        self.backoff_max = app.config.get('EMAIL_OUTBOX_BACKOFF_MAX', self.backoff_max)
+        self.lease_seconds = app.config.get('EMAIL_OUTBOX_LEASE_SECONDS', self.lease_seconds)
+
+    def start(self):
+        """Start the dispatcher thread and delivery pool (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='email-outbox')
+        self._thread = threading.Thread(target=self._run, name='email-outbox-dispatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Email outbox worker started with {self.workers} delivery threads")
+
+    def stop(self, wait: bool = True):
+        """Stop polling and shut down the delivery pool."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1 if wait else 0)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def wake(self):
+        """Ask the dispatcher to poll now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def _run(self):
+        """Dispatcher loop: claim due rows and hand them to the pool."""
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    claimed = self.claim_due()
+                    db.session.remove()
+                futures = [self._executor.submit(self._deliver_in_context, entry_id) for entry_id in claimed]
+                for future in futures:
+                    future.result()
+                if len(claimed) == self.batch_size:
+                    continue  # More work is probably waiting
+            except Exception as e:
+                logger.error(f"Email outbox dispatcher error: {str(e)}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _deliver_in_context(self, entry_id: int):
+        """Deliver one claimed row inside its own app context and session."""
+        with self.app.app_context():
+            try:
+                self.deliver(entry_id)
+            finally:
+                db.session.remove()
+
+    def claim_due(self, now: datetime = None) -> list:
+        """
+        Claim due outbox rows for delivery.
+
+        Args:
+            now (datetime): Current time (defaults to utcnow)
+
+        Returns:
+            list: IDs of rows claimed by this worker
+        """
+        now = now or datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.lease_seconds)
+        candidates = db.session.query(EmailOutbox.id, EmailOutbox.attempts).filter(
+            or_(
+                and_(EmailOutbox.status == EmailOutbox.STATUS_PENDING,
+                     EmailOutbox.next_attempt_at <= now),
+                and_(EmailOutbox.status == EmailOutbox.STATUS_SENDING,
+                     EmailOutbox.locked_at < lease_expired)
+            )
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(self.batch_size).all()
+
+        claimed = []
+        for entry_id, attempts in candidates:
+            updated = EmailOutbox.query.filter(
+                EmailOutbox.id == entry_id,
+                EmailOutbox.attempts == attempts,
+                EmailOutbox.status.in_([EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING])
+            ).update({
+                EmailOutbox.status: EmailOutbox.STATUS_SENDING,
+                EmailOutbox.attempts: attempts + 1,
+                EmailOutbox.locked_at: now
+            }, synchronize_session=False)
+            if updated:
+                claimed.append(entry_id)
+        db.session.commit()
+        return claimed
+
+    def deliver(self, entry_id: int) -> bool:
+        """
+        Send one claimed outbox row and record the outcome.
+
+        Args:
+            entry_id (int): ID of a row claimed by claim_due()
+
+        Returns:
+            bool: True if the email was sent
+        """
+        from src.services.email_service import email_service
+
+        entry = db.session.get(EmailOutbox, entry_id)
+        if not entry or entry.status != EmailOutbox.STATUS_SENDING:
+            return False
+
+        try:
+            if not email_service.deliver(entry.to_email, entry.subject, entry.body,
+                                         entry.to_name, entry.html_body):
+                raise RuntimeError('Email backend reported failure')
+        except Exception as e:
+            self._record_failure(entry, str(e))
+            db.session.commit()
+            return False
+
+        entry.status = EmailOutbox.STATUS_SENT
+        entry.sent_at = datetime.utcnow()
+        entry.locked_at = None
+        entry.last_error = None
+        db.session.commit()
+        return True
+
+    def process_due(self, now: datetime = None) -> int:
+        """
+        Claim and deliver due rows synchronously (for scripts and tests).
+
+        Returns:
+            int: Number of emails sent
+        """
+        return sum(1 for entry_id in self.claim_due(now) if self.deliver(entry_id))
+
+    def retry_dead(self) -> int:
+        """
+        Return dead-lettered emails to the queue for another round of attempts.
+
+        Returns:
+            int: Number of rows requeued
+        """
+        count = EmailOutbox.query.filter_by(status=EmailOutbox.STATUS_DEAD).update({
+            EmailOutbox.status: EmailOutbox.STATUS_PENDING,
+            EmailOutbox.attempts: 0,
+            EmailOutbox.next_attempt_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        self.wake()
+        return count
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Delay before the next attempt: base * 2^(attempts - 1), capped."""
+        return timedelta(seconds=min(self.backoff_base * 2 ** max(attempts - 1, 0), self.backoff_max))
+
+    def _record_failure(self, entry: EmailOutbox, error: str):
+        """Schedule a retry, or dead-letter the row once attempts are exhausted."""
+        entry.last_error = error
+        entry.locked_at = None
+        if entry.attempts >= self.max_attempts:
+            entry.status = EmailOutbox.STATUS_DEAD
+            logger.error(f"Email {entry.id} to {entry.to_email} dead-lettered after "
+                         f"{entry.attempts} attempts: {error}")
+        else:
+            entry.status = EmailOutbox.STATUS_PENDING
+            entry.next_attempt_at = datetime.utcnow() + self.backoff(entry.attempts)
+            logger.warning(f"Email {entry.id} to {entry.to_email} failed (attempt "
+                           f"{entry.attempts}), retrying at {entry.next_attempt_at}: {error}")
+
+
+# Global instance
+outbox_worker = EmailOutboxWorker()
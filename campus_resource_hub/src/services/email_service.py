@@ -1,6 +1,9 @@
 """
 Email notification service for Campus Resource Hub.
-Sends email notifications for booking events or simulates them in development.
+Sends email notifications for booking events (rendered from Jinja templates)
+or simulates them in development.
+Emails are queued in the email outbox and delivered by background workers;
+users on hourly or daily delivery receive a combined digest instead.
 """
 
 import os
@@ -8,6 +11,8 @@ from datetime import datetime
 from typing import Optional, List
 import logging
 
+from src.services.email_templates import email_renderer
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,12 +21,18 @@ class EmailService:
     Service for sending email notifications.
     In development mode, emails are simulated and logged to console/file.
     In production, integrate with actual email service (SendGrid, AWS SES, etc.)
+    
+    With the outbox enabled, send_email() only stages an EmailOutbox row in the
+    current database session, so the email commits (or rolls back) together with
+    the booking change and delivery happens off the request thread.
     """
     
     def __init__(self, app=None):
         self.app = app
         self.simulate_mode = True  # Default to simulation
+        self.use_outbox = False  # Deliver inline until configured by init_app
         self.notification_log_path = None
+        self.smtp_backend = None
         
         if app:
             self.init_app(app)
@@ -30,6 +41,9 @@ class EmailService:
         """Initialize email service with Flask app."""
         self.app = app
         self.simulate_mode = app.config.get('EMAIL_SIMULATE_MODE', True)
+        self.use_outbox = app.config.get('EMAIL_USE_OUTBOX', True)
+        email_renderer.init_app(app)
+        email_renderer.precompile()
         
         # Set up log file for simulated emails
         if self.simulate_mode:
@@ -37,6 +51,10 @@ class EmailService:
             os.makedirs(instance_path, exist_ok=True)
             self.notification_log_path = os.path.join(instance_path, 'email_notifications.log')
             logger.info(f"Email simulation enabled. Notifications will be logged to: {self.notification_log_path}")
+        else:
+            from src.services.smtp_backend import SMTPBackend
+            self.smtp_backend = SMTPBackend.from_config(app.config)
+            logger.info(f"SMTP delivery enabled via {self.smtp_backend.pool.host}:{self.smtp_backend.pool.port}")
     
     def send_email(
         self,
@@ -49,6 +67,9 @@ class EmailService:
         """
         Send an email or simulate sending.
         
+        When the outbox is enabled the email is only queued; the caller's
+        commit makes it visible to the outbox workers.
+        
         Args:
             to_email: Recipient email address
             subject: Email subject
@@ -60,14 +81,95 @@ class EmailService:
             True if successful, False otherwise
         """
         try:
-            if self.simulate_mode:
-                return self._simulate_email(to_email, subject, body, to_name)
-            else:
-                return self._send_real_email(to_email, subject, body, to_name, html_body)
+            if self.use_outbox:
+                self.queue_email(to_email, subject, body, to_name, html_body)
+                return True
+            return self.deliver(to_email, subject, body, to_name, html_body)
         except Exception as e:
             logger.error(f"Error sending email to {to_email}: {str(e)}")
             return False
     
+    def send_to_user(self, user, subject: str, body: str, html_body: Optional[str] = None) -> bool:
+        """
+        Send an email to a user, honoring their digest preference.
+        
+        Users on hourly or daily delivery get the event added to their pending
+        digest (in the caller's transaction) instead of a separate email.
+        
+        Args:
+            user: Recipient User
+            subject: Email subject
+            body: Plain text email body
+            html_body: Optional HTML version of email body
+        
+        Returns:
+            True if sent or queued, False otherwise
+        """
+        from src.extensions import db
+        from src.models import PendingDigestItem, User
+        
+        if (user.email_frequency or User.EMAIL_IMMEDIATE) == User.EMAIL_IMMEDIATE:
+            return self.send_email(user.email, subject, body, user.full_name, html_body)
+        
+        try:
+            db.session.add(PendingDigestItem(user_id=user.id, subject=subject, body=body))
+            return True
+        except Exception as e:
+            logger.error(f"Error queueing digest item for user {user.id}: {str(e)}")
+            return False
+    
+    def queue_email(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        to_name: Optional[str] = None,
+        html_body: Optional[str] = None
+    ):
+        """
+        Stage an email in the outbox without committing.
+        
+        Returns:
+            EmailOutbox: The pending outbox row (committed with the caller's transaction)
+        """
+        from src.extensions import db
+        from src.models import EmailOutbox
+        from src.services.after_commit import run_after_commit
+        from src.services.email_outbox import outbox_worker
+        
+        entry = EmailOutbox(
+            to_email=to_email,
+            to_name=to_name,
+            subject=subject,
+            body=body,
+            html_body=html_body
+        )
+        db.session.add(entry)
+        # Lets the outbox worker wake up as soon as this transaction commits
+        run_after_commit(db.session, 'email_outbox_wake', outbox_worker.wake)
+        return entry
+    
+    def deliver(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        to_name: Optional[str] = None,
+        html_body: Optional[str] = None
+    ) -> bool:
+        """
+        Deliver an email immediately (used by the outbox workers).
+        
+        Returns:
+            True if delivered
+        
+        Raises:
+            Exception: Any transport error, so the caller can retry
+        """
+        if self.simulate_mode:
+            return self._simulate_email(to_email, subject, body, to_name)
+        return self._send_real_email(to_email, subject, body, to_name, html_body)
+    
     def _simulate_email(self, to_email: str, subject: str, body: str, to_name: Optional[str] = None) -> bool:
         """Simulate sending email by logging to console and file."""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -108,214 +210,37 @@ class EmailService:
         to_name: Optional[str] = None,
         html_body: Optional[str] = None
     ) -> bool:
-        """
-        Send real email using configured email service.
-        TODO: Implement with SendGrid, AWS SES, or SMTP
-        """
-        # Placeholder for real email implementation
-        logger.warning("Real email sending not implemented yet. Use EMAIL_SIMULATE_MODE=True")
-        return self._simulate_email(to_email, subject, body, to_name)
+        """Send real email over the pooled SMTP backend (raises on transport errors)."""
+        if self.smtp_backend is None:
+            logger.warning("SMTP backend not configured. Use EMAIL_SIMULATE_MODE=True or call init_app()")
+            return self._simulate_email(to_email, subject, body, to_name)
+        return self.smtp_backend.send(to_email, subject, body, to_name, html_body)
+    
+    def send_rendered(self, template: str, user, **context) -> bool:
+        """Render an email template for a user and send it (text and HTML)."""
+        email = email_renderer.render(template, user=user, **context)
+        return self.send_to_user(user, email.subject, email.text, email.html)
     
     def send_booking_confirmation(self, booking, user) -> bool:
         """Send booking confirmation email to user."""
-        subject = f"Booking Confirmed: {booking.resource.name}"
-        body = f"""
-Hi {user.full_name},
-
-Your booking has been confirmed!
-
-Booking Details:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Resource: {booking.resource.name}
-Type: {booking.resource.resource_type.title()}
-Location: {booking.resource.location or 'Not specified'}
-
-Date: {booking.start_time.strftime('%A, %B %d, %Y')}
-Start Time: {booking.start_time.strftime('%I:%M %p')}
-End Time: {booking.end_time.strftime('%I:%M %p')}
-Duration: {self._format_duration(booking.start_time, booking.end_time)}
-
-Booking ID: {booking.id}
-Status: {booking.status.upper()}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-{self._get_booking_notes(booking)}
-
-Please arrive on time for your reservation. If you need to make changes, 
-please contact us as soon as possible.
-
-View your booking: http://localhost:5000/bookings/view/{booking.id}
-Download calendar event: http://localhost:5000/bookings/{booking.id}/calendar
-
-Best regards,
-Campus Resource Hub Team
-        """.strip()
-        
-        return self.send_email(user.email, subject, body, user.full_name)
+        return self.send_rendered('booking_confirmation', user, booking=booking)
     
     def send_booking_created(self, booking, user) -> bool:
         """Send notification when booking is created (pending approval)."""
-        subject = f"Booking Request Received: {booking.resource.name}"
-        body = f"""
-Hi {user.full_name},
-
-We've received your booking request!
-
-Booking Details:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Resource: {booking.resource.name}
-Type: {booking.resource.resource_type.title()}
-Location: {booking.resource.location or 'Not specified'}
-
-Date: {booking.start_time.strftime('%A, %B %d, %Y')}
-Start Time: {booking.start_time.strftime('%I:%M %p')}
-End Time: {booking.end_time.strftime('%I:%M %p')}
-Duration: {self._format_duration(booking.start_time, booking.end_time)}
-
-Booking ID: {booking.id}
-Status: PENDING APPROVAL
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-{self._get_booking_notes(booking)}
-
-Your booking is currently pending approval from our staff. You'll receive 
-another email once your booking has been reviewed.
-
-View your booking: http://localhost:5000/bookings/view/{booking.id}
-
-Best regards,
-Campus Resource Hub Team
-        """.strip()
-        
-        return self.send_email(user.email, subject, body, user.full_name)
+        return self.send_rendered('booking_created', user, booking=booking)
     
     def send_booking_cancelled(self, booking, user, cancelled_by) -> bool:
         """Send notification when booking is cancelled."""
-        subject = f"Booking Cancelled: {booking.resource.name}"
-        
-        cancelled_by_text = "You" if cancelled_by.id == user.id else f"Staff ({cancelled_by.full_name})"
-        
-        body = f"""
-Hi {user.full_name},
-
-Your booking has been cancelled.
-
-Booking Details:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Resource: {booking.resource.name}
-Type: {booking.resource.resource_type.title()}
-Location: {booking.resource.location or 'Not specified'}
-
-Date: {booking.start_time.strftime('%A, %B %d, %Y')}
-Time: {booking.start_time.strftime('%I:%M %p')} - {booking.end_time.strftime('%I:%M %p')}
-
-Booking ID: {booking.id}
-Cancelled By: {cancelled_by_text}
-Status: CANCELLED
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-If you did not request this cancellation or have any questions, 
-please contact us immediately.
-
-Best regards,
-Campus Resource Hub Team
-        """.strip()
-        
-        return self.send_email(user.email, subject, body, user.full_name)
+        return self.send_rendered('booking_cancelled', user, booking=booking, cancelled_by=cancelled_by)
     
     def send_booking_reminder(self, booking, user, hours_before: int = 24) -> bool:
         """Send reminder email before booking starts."""
-        subject = f"Reminder: Upcoming Booking for {booking.resource.name}"
-        body = f"""
-Hi {user.full_name},
-
-This is a reminder about your upcoming booking in {hours_before} hours.
-
-Booking Details:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Resource: {booking.resource.name}
-Type: {booking.resource.resource_type.title()}
-Location: {booking.resource.location or 'Not specified'}
-
-Date: {booking.start_time.strftime('%A, %B %d, %Y')}
-Start Time: {booking.start_time.strftime('%I:%M %p')}
-End Time: {booking.end_time.strftime('%I:%M %p')}
-
-Booking ID: {booking.id}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-Please arrive on time. If you need to cancel, please do so as soon as possible.
-
-View your booking: http://localhost:5000/bookings/view/{booking.id}
-Download calendar event: http://localhost:5000/bookings/{booking.id}/calendar
-
-Best regards,
-Campus Resource Hub Team
-        """.strip()
-        
-        return self.send_email(user.email, subject, body, user.full_name)
+        return self.send_rendered('booking_reminder', user, booking=booking, hours_before=hours_before)
     
     def send_booking_modified(self, booking, user, modified_by, changes: list) -> bool:
         """Send email notification when booking is modified by admin."""
-        subject = f"Booking Modified: {booking.resource.name}"
-        
-        # Format changes list
-        changes_text = "\n".join([f"  • {change}" for change in changes])
-        
-        body = f"""
-Hi {user.full_name},
-
-Your booking has been modified by an administrator.
-
-Modified Booking Details:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Resource: {booking.resource.name}
-Type: {booking.resource.resource_type.title()}
-Location: {booking.resource.location or 'Not specified'}
-
-Date: {booking.start_time.strftime('%A, %B %d, %Y')}
-Start Time: {booking.start_time.strftime('%I:%M %p')}
-End Time: {booking.end_time.strftime('%I:%M %p')}
-
-Booking ID: {booking.id}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-Changes Made:
-{changes_text}
-
-Modified By: {modified_by.full_name}
-
-{self._get_booking_notes(booking)}
-
-Please review your booking details. If you have questions about these changes, 
-please contact the resource administrator.
-
-View your booking: http://localhost:5000/bookings/{booking.id}/view
-
-Best regards,
-Campus Resource Hub Team
-        """.strip()
-        
-        return self.send_email(user.email, subject, body, user.full_name)
-    
-    def _format_duration(self, start_time, end_time) -> str:
-        """Format duration between two times."""
-        duration = end_time - start_time
-        hours = duration.total_seconds() / 3600
-        
-        if hours < 1:
-            minutes = int(duration.total_seconds() / 60)
-            return f"{minutes} minutes"
-        elif hours == 1:
-            return "1 hour"
-        else:
-            return f"{hours:.1f} hours"
-    
-    def _get_booking_notes(self, booking) -> str:
-        """Get formatted notes section."""
-        if booking.notes:
-            return f"Notes: {booking.notes}\n"
-        return ""
+        return self.send_rendered('booking_modified', user, booking=booking,
+                                  modified_by=modified_by, changes=changes)
 
 
 # Global instance
@@ -0,0 +1,126 @@
+"""
+Email template rendering for Campus Resource Hub.
+Renders plain-text and HTML email bodies from Jinja templates in
+src/views/templates/emails using a dedicated environment whose compiled
+templates are cached in memory and on disk (bytecode cache).
+"""
+
+import os
+import tempfile
+from collections import namedtuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'views', 'templates', 'emails')
+SEPARATOR = '━' * 40
+
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'text', 'html'])
+
+
+def format_duration(booking) -> str:
+    """Format a booking's duration, e.g. '45 minutes', '1 hour', '2.5 hours'."""
+    duration = booking.end_time - booking.start_time
+    hours = duration.total_seconds() / 3600
+
+    if hours < 1:
+        return f"{int(duration.total_seconds() / 60)} minutes"
+    elif hours == 1:
+        return "1 hour"
+    return f"{hours:.1f} hours"
+
+
+class EmailRenderer:
+    """
+    Renders '<name>.txt' / '<name>.html' template pairs.
+
+    The text template defines the subject with {% set subject = ... %}; the
+    HTML variant is optional. Templates are compiled once per process (the
+    environment never auto-reloads) and their bytecode is cached on disk so
+    new worker processes skip compilation too.
+    """
+
+    def __init__(self, template_dir: str = TEMPLATE_DIR, cache_dir: str = None,
+                 base_url: str = 'http://localhost:5000'):
+        self.template_dir = template_dir
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'campus_hub_email_templates')
+        self.base_url = base_url
+        self.env = self._create_environment()
+
+    def init_app(self, app):
+        """Configure the base URL and cache directory from the Flask app."""
+        self.base_url = app.config.get('EMAIL_BASE_URL', self.base_url).rstrip('/')
+        self.cache_dir = os.path.join(app.instance_path, 'email_template_cache')
+        self.env = self._create_environment()
+
+    def _create_environment(self) -> Environment:
+        """Build the dedicated Jinja environment."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+            bytecode_cache=FileSystemBytecodeCache(self.cache_dir),
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            undefined=StrictUndefined
+        )
+        env.globals.update(base_url=self.base_url, separator=SEPARATOR)
+        env.filters['duration'] = format_duration
+        return env
+
+    def precompile(self) -> int:
+        """
+        Load every email template so later renders never compile.
+
+        Returns:
+            int: Number of templates loaded
+        """
+        names = self.env.list_templates(extensions=('txt', 'html'))
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def render(self, name: str, **context) -> RenderedEmail:
+        """
+        Render one email.
+
+        Args:
+            name (str): Template name without extension (e.g. 'booking_confirmation')
+            **context: Template variables
+
+        Returns:
+            RenderedEmail: (subject, text, html); html is None without an HTML variant
+        """
+        return self.render_many(name, [context])[0]
+
+    def render_many(self, name: str, contexts: list) -> list:
+        """
+        Render the same email for many recipients in one call.
+
+        Templates are resolved once for the whole batch; render() is the
+        single-email case.
+
+        Args:
+            name (str): Template name without extension
+            contexts (list): One dict of template variables per email
+
+        Returns:
+            list: RenderedEmail per context, in order
+        """
+        text_template = self.env.get_template(f'{name}.txt')
+        html_template = self.env.select_template([f'{name}.html', f'{name}.txt']) if contexts else None
+        if html_template is text_template:
+            html_template = None
+
+        rendered = []
+        for context in contexts:
+            module = text_template.make_module(context)
+            subject = str(getattr(module, 'subject', '')).strip()
+            text = str(module).strip()
+            html = html_template.render(context, subject=subject) if html_template else None
+            rendered.append(RenderedEmail(subject, text, html))
+        return rendered
+
+
+# Global instance
+email_renderer = EmailRenderer()
@@ -0,0 +1,220 @@
+"""
+In-process event broker for Campus Resource Hub.
+Fans out per-user events (new notifications, messages, read receipts) to live
+Server-Sent Events streams so browsers no longer need to poll for changes.
+Every event type travels on one stream, so each browser tab holds a single
+connection.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from functools import partial
+
+from src.services.after_commit import run_after_commit
+
+
+class Broker(ABC):
+    """
+    Interface for per-user event fan-out.
+
+    Streams and publishers only use these methods, so a multi-process
+    implementation (e.g. Redis pub/sub or PostgreSQL LISTEN/NOTIFY feeding
+    local subscriber queues) can replace EventBroker without touching them.
+    """
+
+    @abstractmethod
+    def subscribe(self, user_id: int, last_event_id: int = None) -> queue.Queue:
+        """Register a subscriber and return the queue its events arrive on."""
+
+    @abstractmethod
+    def unsubscribe(self, user_id: int, subscriber: queue.Queue) -> None:
+        """Remove a subscriber queue registered with subscribe()."""
+
+    @abstractmethod
+    def publish(self, user_id: int, event_type: str, data: dict) -> dict:
+        """Deliver an event to every live subscriber of a user."""
+
+    def publish_after_commit(self, session, user_id: int, event_type: str, data: dict) -> None:
+        """
+        Publish an event once the session's transaction commits.
+        Used by writes inside a request transaction; the event is dropped if
+        the transaction rolls back, so clients never see uncommitted changes.
+        """
+        run_after_commit(session, None, partial(self.publish, user_id, event_type, data))
+
+
+class EventBroker(Broker):
+    """
+    Thread-safe publish/subscribe hub keyed by user ID.
+
+    Each subscriber gets its own bounded queue. A short per-user replay buffer
+    lets a reconnecting client resume from its Last-Event-ID without missing
+    events published while it was disconnected. Buffers of users without a
+    live subscriber are dropped after replay_ttl seconds without activity, and
+    at most max_replay_users buffers are kept (least recently used go first).
+    """
+
+    def __init__(self, queue_size: int = 100, replay_size: int = 50,
+                 replay_ttl: float = 120, max_replay_users: int = 1000):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.replay_ttl = replay_ttl
+        self.max_replay_users = max_replay_users
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of queues
+        self._replay = OrderedDict()  # user_id -> [deque of recent events, last used], LRU order
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id: int, last_event_id: int = None) -> queue.Queue:
+        """
+        Register a subscriber for a user's events.
+
+        Args:
+            user_id (int): ID of user to receive events for
+            last_event_id (int, optional): Last event the client saw; newer
+                buffered events are queued immediately for replay
+
+        Returns:
+            queue.Queue: Queue that receives event dicts
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            replay = self._touch_replay(user_id, create=False)
+            if last_event_id is not None and replay is not None:
+                for event in replay:
+                    if event['id'] > last_event_id:
+                        self._offer(subscriber, event)
+        return subscriber
+
+    def unsubscribe(self, user_id: int, subscriber: queue.Queue) -> None:
+        """Remove a subscriber queue registered with subscribe()."""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+                    # The replay TTL starts when the last stream closes
+                    self._touch_replay(user_id, create=False)
+
+    def publish(self, user_id: int, event_type: str, data: dict) -> dict:
+        """
+        Publish an event to every live subscriber of a user.
+
+        Args:
+            user_id (int): ID of user the event is for
+            event_type (str): SSE event name (e.g. 'notification')
+            data (dict): JSON-serializable payload
+
+        Returns:
+            dict: The published event with its assigned ID
+        """
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data}
+            self._touch_replay(user_id, create=True).append(event)
+            for subscriber in self._subscribers.get(user_id, ()):
+                self._offer(subscriber, event)
+        return event
+
+    def subscriber_count(self, user_id: int = None) -> int:
+        """Count live subscribers for one user, or for all users."""
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def replay_user_count(self) -> int:
+        """Count users with a replay buffer."""
+        with self._lock:
+            return len(self._replay)
+
+    def _touch_replay(self, user_id: int, create: bool) -> deque:
+        """Mark a user's replay buffer as used (creating it if asked) and evict idle ones. Lock held."""
+        now = time.monotonic()
+        entry = self._replay.get(user_id)
+        if entry is not None:
+            entry[1] = now
+            self._replay.move_to_end(user_id)
+        elif create:
+            entry = self._replay[user_id] = [deque(maxlen=self.replay_size), now]
+
+        while len(self._replay) > self.max_replay_users:
+            self._replay.popitem(last=False)
+        # Oldest first; a subscribed user's buffer is refreshed instead of evicted
+        for idle_user in list(self._replay):
+            idle = self._replay[idle_user]
+            if now - idle[1] < self.replay_ttl or idle_user == user_id:
+                break
+            if idle_user in self._subscribers:
+                idle[1] = now
+                self._replay.move_to_end(idle_user)
+            else:
+                del self._replay[idle_user]
+        return entry[0] if entry is not None else None
+
+    @staticmethod
+    def _offer(subscriber: queue.Queue, event: dict) -> None:
+        """Queue an event, dropping the oldest one if a slow client is full."""
+        try:
+            subscriber.put_nowait(event)
+        except queue.Full:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                pass
+            subscriber.put_nowait(event)
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event dict in Server-Sent Events wire format."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def sse_stream(broker: Broker, user_id: int, last_event_id: int = None,
+               heartbeat: float = 15, max_age: float = 300, retry_ms: int = 5000):
+    """
+    Generate an SSE response body for one user's events.
+
+    Sends a retry hint first, then events as they are published, with a comment
+    heartbeat whenever the stream is idle so proxies keep the connection open.
+    The stream ends after max_age seconds; EventSource reconnects on its own
+    and resumes from Last-Event-ID, which keeps worker threads from being held
+    indefinitely.
+
+    Args:
+        broker (Broker): Broker to subscribe to
+        user_id (int): ID of user whose events are streamed
+        last_event_id (int, optional): Resume point sent by a reconnecting client
+        heartbeat (float): Seconds of idleness before a heartbeat comment
+        max_age (float): Seconds before the server closes the stream
+        retry_ms (int): Reconnect delay hint for the client, in milliseconds
+
+    Yields:
+        str: SSE-formatted chunks
+    """
+    subscriber = broker.subscribe(user_id, last_event_id=last_event_id)
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        deadline = time.monotonic() + max_age
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = subscriber.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(user_id, subscriber)
+
+
+# Global instance: 'notification', 'message' and 'read' events
+event_broker = EventBroker()
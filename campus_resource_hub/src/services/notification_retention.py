@@ -0,0 +1,187 @@
+"""
+Notification retention for Campus Resource Hub.
+Moves read notifications older than the retention age out of the hot
+notifications table, either into notifications_archive (collapsing bursts of
+similar notifications into one summary row) or by deleting them.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import delete, insert
+
+from src.extensions import db
+from src.models import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+MODE_ARCHIVE = 'archive'
+MODE_DELETE = 'delete'
+
+
+def _burst_key(notification: Notification) -> tuple:
+    """Notifications for the same user, type and sender on the same day form a burst."""
+    return (notification.user_id, notification.notification_type, notification.sender_id,
+            notification.created_at.date())
+
+
+def summarize_burst(burst: list) -> dict:
+    """
+    Build the archive row for a burst of notifications.
+
+    Args:
+        burst (list): Notifications sharing a _burst_key, oldest first
+
+    Returns:
+        dict: notifications_archive column values
+    """
+    newest = burst[-1]
+    count = sum(n.event_count or 1 for n in burst)  # Rows may already be coalesced at write time
+    title = newest.title
+    description = newest.description
+    if count > 1:
+        if newest.notification_type == Notification.TYPE_NEW_MESSAGE:
+            title = title.replace('New message from', f'{count} new messages from', 1)
+        else:
+            title = f"{title} (+{count - 1} more)"
+        description = (f"{count} similar notifications between "
+                       f"{burst[0].created_at.strftime('%b %d %I:%M %p')} and "
+                       f"{newest.created_at.strftime('%I:%M %p')}. Latest: {newest.description}")
+
+    return {
+        'id': newest.id,
+        'user_id': newest.user_id,
+        'message_id': newest.message_id,
+        'booking_id': newest.booking_id,
+        'sender_id': newest.sender_id,
+        'notification_type': newest.notification_type,
+        'title': title[:255],
+        'description': description,
+        'action_url': newest.action_url,
+        'collapsed_count': count,
+        'created_at': newest.created_at,
+        'first_created_at': burst[0].created_at,
+        'read_at': max((n.read_at for n in burst if n.read_at), default=None),
+        'archived_at': datetime.utcnow()
+    }
+
+
+class NotificationRetention:
+    """
+    Periodically trims the notifications table in bounded batches.
+
+    Each batch is one indexed range read on created_at, one bulk INSERT into
+    the archive and one DELETE, committed together, so the table never holds
+    long locks and an interrupted run simply resumes on the next poll.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.poll_interval = 3600
+        self.retention = timedelta(days=30)
+        self.mode = MODE_ARCHIVE
+        self.batch_size = 500
+        self.max_batches = 20
+        self._thread = None
+        self._stop = threading.Event()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize retention settings from the Flask app config."""
+        self.app = app
+        self.poll_interval = app.config.get('NOTIFICATION_RETENTION_POLL_INTERVAL', self.poll_interval)
+        self.retention = timedelta(days=app.config.get('NOTIFICATION_RETENTION_DAYS', 30))
+        self.mode = app.config.get('NOTIFICATION_RETENTION_MODE', self.mode)
+        self.batch_size = app.config.get('NOTIFICATION_RETENTION_BATCH_SIZE', self.batch_size)
+        self.max_batches = app.config.get('NOTIFICATION_RETENTION_MAX_BATCHES', self.max_batches)
+        if self.mode not in (MODE_ARCHIVE, MODE_DELETE):
+            raise ValueError(f"Invalid NOTIFICATION_RETENTION_MODE: {self.mode}")
+
+    def start(self):
+        """Start the retention thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-retention', daemon=True)
+        self._thread.start()
+        logger.info("Notification retention started")
+
+    def stop(self):
+        """Stop the retention thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """Retention loop."""
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_due()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Notification retention error: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def run_batch(self, cutoff: datetime) -> int:
+        """
+        Archive or delete one batch of expired read notifications.
+
+        Args:
+            cutoff (datetime): Read notifications created before this are expired
+
+        Returns:
+            int: Number of notifications removed from the hot table
+        """
+        try:
+            expired = Notification.query.filter(
+                Notification.created_at < cutoff,
+                Notification.is_read == True
+            ).order_by(Notification.created_at, Notification.id).limit(self.batch_size).all()
+            if not expired:
+                return 0
+
+            if self.mode == MODE_ARCHIVE:
+                ordered = sorted(expired, key=lambda n: (_burst_key(n), n.created_at, n.id))
+                rows = [summarize_burst(list(burst)) for _, burst in groupby(ordered, key=_burst_key)]
+                db.session.execute(insert(NotificationArchive), rows)
+
+            db.session.execute(
+                delete(Notification).where(Notification.id.in_([n.id for n in expired])),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+            return len(expired)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def run_due(self, now: datetime = None) -> int:
+        """
+        Run up to max_batches batches, stopping early once nothing is left.
+
+        Args:
+            now (datetime): Current UTC time (defaults to utcnow)
+
+        Returns:
+            int: Number of notifications removed from the hot table
+        """
+        cutoff = (now or datetime.utcnow()) - self.retention
+        removed = 0
+        for _ in range(self.max_batches):
+            count = self.run_batch(cutoff)
+            removed += count
+            if count < self.batch_size:
+                break
+        if removed:
+            logger.info(f"Notification retention removed {removed} notifications ({self.mode})")
+        return removed
+
+
+# Global instance
+notification_retention = NotificationRetention()
@@ -1,11 +1,21 @@
 """
 Notification Service - Handles creation and management of notifications.
 Provides centralized methods for triggering notifications on system events.
+Event notifications are queued on the session and written with one bulk
+INSERT as part of the caller's commit.
 """
 
 from datetime import datetime
+from functools import partial
+from sqlalchemy import and_, case, event, func, insert, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 from src.extensions import db
+from src.data_access.upsert import upsert_insert
 from src.models import Notification, Message, Booking, User
+from src.services.after_commit import run_after_commit
+from src.services.event_broker import event_broker
+from src.services.unread_counters import unread_counters, NOTIFICATIONS
 
 
 class NotificationService:
@@ -17,7 +27,8 @@ class NotificationService:
                            sender_id: int = None, message_id: int = None, 
                            booking_id: int = None) -> Notification:
         """
-        Create a new notification for a user.
+        Create a new notification for a user and commit it immediately.
+        Use enqueue() for notifications that belong to a larger unit of work.
         
         Args:
             user_id (int): ID of user receiving the notification
@@ -48,15 +59,78 @@ class NotificationService:
             db.session.add(notification)
             db.session.commit()
             
+            unread_counters.adjust(NOTIFICATIONS, user_id, 1)
+            
+            # Push to any open notification streams for this user
+            event_broker.publish(user_id, 'notification', notification.to_dict())
+            
             return notification
         except Exception as e:
             db.session.rollback()
             raise Exception(f"Error creating notification: {str(e)}")
     
     @staticmethod
-    def notify_new_message(sender_id: int, recipient_id: int, message: Message) -> Notification:
+    def enqueue(user_id: int, notification_type: str, title: str,
+                description: str, action_url: str = None,
+                sender_id: int = None, message_id: int = None,
+                booking_id: int = None, coalesce_key: str = None) -> dict:
+        """
+        Queue a notification to be written with the current transaction.
+        
+        Queued notifications are inserted in one bulk INSERT by flush(), which
+        runs automatically when the session commits, so a booking action and
+        all of its notifications cost a single commit. Nothing is written if
+        the transaction rolls back.
+        
+        With a coalesce_key, the user's unread notification with the same key
+        (if any) is updated in place instead: its count is incremented and its
+        text, links and timestamp are replaced by this event's.
+        
+        Args:
+            user_id (int): ID of user receiving the notification
+            notification_type (str): Type of notification (from Notification.VALID_TYPES)
+            title (str): Short title of the notification
+            description (str): Detailed description of the notification
+            action_url (str, optional): URL to navigate to when clicked
+            sender_id (int, optional): ID of user who triggered the notification
+            message_id (int, optional): Associated message ID
+            booking_id (int, optional): Associated booking ID
+            coalesce_key (str, optional): Merge with the unread notification sharing this key
+            
+        Returns:
+            dict: The queued notification's column values ('id' is filled in on flush)
+        """
+        mapping = {
+            'user_id': user_id,
+            'notification_type': notification_type,
+            'title': title,
+            'description': description,
+            'action_url': action_url,
+            'sender_id': sender_id,
+            'message_id': message_id,
+            'booking_id': booking_id,
+            'coalesce_key': coalesce_key,
+            'event_count': 1,
+            'is_read': False,
+            'created_at': datetime.utcnow()
+        }
+        db.session.info.setdefault('notifications_pending', []).append(mapping)
+        return mapping
+    
+    @staticmethod
+    def flush() -> int:
+        """
+        Insert all queued notifications without committing.
+        
+        Returns:
+            int: Number of notifications inserted
+        """
+        return _flush_pending(db.session)
+    
+    @staticmethod
+    def notify_new_message(sender_id: int, recipient_id: int, message: Message) -> dict:
         """
-        Create notification for a new message.
+        Queue notification for a new message.
         
         Args:
             sender_id (int): ID of message sender
@@ -64,37 +138,40 @@ class NotificationService:
             message (Message): The message object
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         sender = db.session.get(User, sender_id)
         sender_name = sender.full_name if sender else "Unknown User"
+        thread_id = message.thread_id or message.id
         
-        return NotificationService.create_notification(
+        # One unread notification per conversation, however many messages arrive
+        return NotificationService.enqueue(
             user_id=recipient_id,
             notification_type=Notification.TYPE_NEW_MESSAGE,
             title=f"New message from {sender_name}",
             description=message.body[:100] + ('...' if len(message.body) > 100 else ''),
-            action_url=f"/messages/thread/{message.thread_id or message.id}",
+            action_url=f"/messages/thread/{thread_id}",
             sender_id=sender_id,
-            message_id=message.id
+            message_id=message.id,
+            coalesce_key=f"{Notification.TYPE_NEW_MESSAGE}:{sender_id}:{thread_id}"
         )
     
     @staticmethod
-    def notify_booking_request(booking: Booking) -> Notification:
+    def notify_booking_request(booking: Booking) -> dict:
         """
-        Create notification for a new booking request (sent to resource owner).
+        Queue notification for a new booking request (sent to resource owner).
         
         Args:
             booking (Booking): The booking object
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         user = db.session.get(User, booking.user_id)
         user_name = user.full_name if user else "Unknown User"
         resource_name = booking.resource.name if booking.resource else "A Resource"
         
-        return NotificationService.create_notification(
+        return NotificationService.enqueue(
             user_id=booking.resource.creator_id,
             notification_type=Notification.TYPE_BOOKING_REQUEST,
             title=f"Booking request for {resource_name}",
@@ -105,19 +182,19 @@ class NotificationService:
         )
     
     @staticmethod
-    def notify_booking_confirmed(booking: Booking) -> Notification:
+    def notify_booking_confirmed(booking: Booking) -> dict:
         """
-        Create notification for confirmed booking (sent to requester).
+        Queue notification for confirmed booking (sent to requester).
         
         Args:
             booking (Booking): The booking object
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         resource_name = booking.resource.name if booking.resource else "A Resource"
         
-        return NotificationService.create_notification(
+        return NotificationService.enqueue(
             user_id=booking.user_id,
             notification_type=Notification.TYPE_BOOKING_CONFIRMED,
             title=f"Booking confirmed for {resource_name}",
@@ -128,23 +205,23 @@ class NotificationService:
         )
     
     @staticmethod
-    def notify_booking_denied(booking: Booking, reason: str = "") -> Notification:
+    def notify_booking_denied(booking: Booking, reason: str = "") -> dict:
         """
-        Create notification for denied booking (sent to requester).
+        Queue notification for denied booking (sent to requester).
         
         Args:
             booking (Booking): The booking object
             reason (str, optional): Reason for denial
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         resource_name = booking.resource.name if booking.resource else "A Resource"
         description = f"Your booking for {resource_name} was denied."
         if reason:
             description += f" Reason: {reason}"
         
-        return NotificationService.create_notification(
+        return NotificationService.enqueue(
             user_id=booking.user_id,
             notification_type=Notification.TYPE_BOOKING_DENIED,
             title=f"Booking denied for {resource_name}",
@@ -157,7 +234,7 @@ class NotificationService:
     @staticmethod
     def notify_booking_cancelled(booking: Booking, cancelled_by_id: int, reason: str = "") -> list:
         """
-        Create notifications for cancelled booking (sent to both parties).
+        Queue notifications for cancelled booking (sent to both parties).
         
         Args:
             booking (Booking): The booking object
@@ -165,7 +242,7 @@ class NotificationService:
             reason (str, optional): Reason for cancellation
             
         Returns:
-            list: List of created notifications
+            list: The queued notifications
         """
         resource_name = booking.resource.name if booking.resource else "A Resource"
         reason_text = f" Reason: {reason}" if reason else ""
@@ -173,7 +250,7 @@ class NotificationService:
         notifications = []
         
         # Notify requester
-        notifications.append(NotificationService.create_notification(
+        notifications.append(NotificationService.enqueue(
             user_id=booking.user_id,
             notification_type=Notification.TYPE_BOOKING_CANCELLED,
             title=f"Booking cancelled for {resource_name}",
@@ -185,7 +262,7 @@ class NotificationService:
         
         # Notify resource owner if not the one who cancelled
         if cancelled_by_id != booking.resource.creator_id:
-            notifications.append(NotificationService.create_notification(
+            notifications.append(NotificationService.enqueue(
                 user_id=booking.resource.creator_id,
                 notification_type=Notification.TYPE_BOOKING_CANCELLED,
                 title=f"Booking cancelled for {resource_name}",
@@ -198,41 +275,42 @@ class NotificationService:
         return notifications
     
     @staticmethod
-    def notify_booking_reminder(booking: Booking) -> Notification:
+    def notify_booking_reminder(booking: Booking) -> dict:
         """
-        Create reminder notification for upcoming booking (sent to requester).
+        Queue reminder notification for upcoming booking (sent to requester).
         
         Args:
             booking (Booking): The booking object
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         resource_name = booking.resource.name if booking.resource else "A Resource"
         
-        return NotificationService.create_notification(
+        return NotificationService.enqueue(
             user_id=booking.user_id,
             notification_type=Notification.TYPE_BOOKING_REMINDER,
-            title=f"Reminder: Your booking is coming up",
-            description=f"Your booking for {resource_name} is scheduled to begin soon.",
-            action_url=f"/bookings/{booking.id}",
+            title=f"Upcoming: {resource_name}",
+            description=f"Your booking for {resource_name} starts "
+                        f"{booking.start_time.strftime('%b %d at %I:%M %p')}.",
+            action_url=f"/bookings/{booking.id}/view",
             booking_id=booking.id
         )
     
     @staticmethod
-    def notify_review_flagged(review) -> Notification:
+    def notify_review_flagged(review) -> dict:
         """
-        Create notification for flagged review (sent to resource owner).
+        Queue notification for flagged review (sent to resource owner).
         
         Args:
             review: The review object
             
         Returns:
-            Notification: The created notification
+            dict: The queued notification
         """
         resource_name = review.resource.name if review.resource else "A Resource"
         
-        return NotificationService.create_notification(
+        return NotificationService.enqueue(
             user_id=review.resource.creator_id,
             notification_type=Notification.TYPE_REVIEW_FLAGGED,
             title=f"Review flagged for {resource_name}",
@@ -245,6 +323,8 @@ class NotificationService:
     def get_unread_count(user_id: int) -> int:
         """
         Get count of unread notifications for a user.
+        Served from the per-user counter cache; the COUNT query only runs on a
+        cache miss or when the counter is due for reconciliation.
         
         Args:
             user_id (int): ID of user
@@ -252,10 +332,36 @@ class NotificationService:
         Returns:
             int: Count of unread notifications
         """
-        return Notification.query.filter_by(
+        return unread_counters.get(NOTIFICATIONS, user_id, lambda: Notification.query.filter_by(
             user_id=user_id,
             is_read=False
-        ).count()
+        ).count())
+    
+    @staticmethod
+    def mark_all_read(user_id: int) -> int:
+        """
+        Mark every unread notification for a user as read in one statement.
+        
+        Args:
+            user_id (int): ID of user
+            
+        Returns:
+            int: Number of notifications marked as read
+        """
+        try:
+            count = Notification.query.filter_by(
+                user_id=user_id,
+                is_read=False
+            ).update(
+                {Notification.is_read: True, Notification.read_at: datetime.utcnow()},
+                synchronize_session='evaluate'
+            )
+            db.session.commit()
+            unread_counters.adjust(NOTIFICATIONS, user_id, -count)
+            return count
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
     
     @staticmethod
     def get_recent_notifications(user_id: int, limit: int = 10) -> list:
@@ -273,3 +379,161 @@ class NotificationService:
             Notification.is_read.asc(),
             Notification.created_at.desc()
         ).limit(limit).all()
+    
+    @staticmethod
+    def get_notification_state(user_id: int) -> dict:
+        """
+        Get a cheap fingerprint of a user's notifications.
+        One aggregate answered from the (user_id, is_read, created_at, read_at)
+        index alone; used to build ETags so idle polls can be answered without
+        loading any rows.
+        
+        Args:
+            user_id (int): ID of user
+            
+        Returns:
+            dict: total, unread, last_created and last_read values
+        """
+        total, unread, last_created, last_read = db.session.query(
+            func.count(Notification.id),
+            func.sum(case((Notification.is_read == False, 1), else_=0)),
+            func.max(Notification.created_at),
+            func.max(Notification.read_at)
+        ).filter(Notification.user_id == user_id).one()
+        
+        return {
+            'total': total or 0,
+            'unread': unread or 0,
+            'last_created': last_created,
+            'last_read': last_read
+        }
+    
+    @staticmethod
+    def get_latest_change(user_id: int):
+        """
+        Get the newest (changed_at, id) of a user's notifications, for cursors.
+        
+        Args:
+            user_id (int): ID of user
+            
+        Returns:
+            tuple: (changed_at, notification id), or None if the user has none
+        """
+        changed_at = _changed_at()
+        return db.session.query(changed_at, Notification.id).filter(
+            Notification.user_id == user_id
+        ).order_by(changed_at.desc(), Notification.id.desc()).first()
+    
+    @staticmethod
+    def get_notifications_since(user_id: int, since: datetime, since_id: int = 0, limit: int = 50) -> tuple:
+        """
+        Get notifications created or read after a (changed_at, id) cursor, oldest change first.
+        
+        Args:
+            user_id (int): ID of user
+            since (datetime): Cursor time; only changes at or after it are considered
+            since_id (int): Cursor ID; changes at exactly since must have a larger ID
+            limit (int): Maximum number of notifications to return
+            
+        Returns:
+            tuple: (list of (notification, changed_at) pairs, has_more flag)
+        """
+        changed_at = _changed_at()
+        
+        rows = db.session.query(Notification, changed_at).filter(
+            Notification.user_id == user_id,
+            or_(Notification.created_at >= since, Notification.read_at >= since),
+            or_(changed_at > since, and_(changed_at == since, Notification.id > since_id))
+        ).order_by(changed_at.asc(), Notification.id.asc()).limit(limit + 1).all()
+        
+        return rows[:limit], len(rows) > limit
+
+
+def _changed_at():
+    """SQL expression for when a notification last changed (created or read)."""
+    return case(
+        (Notification.read_at > Notification.created_at, Notification.read_at),
+        else_=Notification.created_at
+    )
+
+
+def _flush_pending(session) -> int:
+    """Write a session's queued notifications and schedule their side effects."""
+    pending = session.info.pop('notifications_pending', None)
+    if not pending:
+        return 0
+    
+    # Stamp at write time rather than queue time, so created_at follows the
+    # order rows become visible in and since-cursors don't step over them
+    now = datetime.utcnow()
+    for mapping in pending:
+        mapping['created_at'] = now
+    
+    inserted = [m for m in pending if not m['coalesce_key']]
+    if inserted:
+        # ORM bulk INSERT (the 2.0 form of bulk_insert_mappings) sends one
+        # multi-row statement; sort_by_parameter_order returns the ids in
+        # mapping order, which the stream events rely on.
+        ids = session.scalars(
+            insert(Notification).returning(Notification.id, sort_by_parameter_order=True), inserted
+        ).all()
+        for mapping, notification_id in zip(inserted, ids):
+            mapping['id'] = notification_id
+    
+    for mapping in pending:
+        merged = mapping['coalesce_key'] and not _upsert_coalesced(session, mapping)
+        if not merged:  # A merge into an existing unread notification leaves the badge unchanged
+            unread_counters.adjust_after_commit(session, NOTIFICATIONS, mapping['user_id'], 1)
+        run_after_commit(session, None, partial(_publish, mapping))
+    
+    return len(pending)
+
+
+def _publish(mapping: dict) -> None:
+    """Push a committed notification to the user's open streams."""
+    event_broker.publish(mapping['user_id'], 'notification', Notification(**mapping).to_dict())
+
+
+def _upsert_coalesced(session, mapping: dict) -> bool:
+    """
+    Insert a notification or merge it into the user's unread one with the same key.
+    Uses INSERT ... ON CONFLICT on the partial unique index over unread rows.
+    
+    Returns:
+        bool: True if a new row was inserted, False if an existing one was updated
+    """
+    table = Notification.__table__
+    stmt = upsert_insert(table, session)
+    if stmt is None:
+        mapping['id'] = session.scalars(insert(Notification).returning(Notification.id), [mapping]).one()
+        return True
+    
+    stmt = stmt.values(**mapping)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.coalesce_key],
+        index_where=table.c.is_read == False,
+        set_={
+            'event_count': table.c.event_count + 1,
+            'title': stmt.excluded.title,
+            'description': stmt.excluded.description,
+            'action_url': stmt.excluded.action_url,
+            'message_id': stmt.excluded.message_id,
+            'created_at': stmt.excluded.created_at
+        }
+    ).returning(table.c.id, table.c.event_count)
+    
+    mapping['id'], mapping['event_count'] = session.execute(stmt).one()
+    return mapping['event_count'] == 1
+
+
+@event.listens_for(Session, 'before_commit')
+def _flush_on_commit(session):
+    """Session hook: write queued notifications as part of the commit."""
+    _flush_pending(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    """Session hook: drop notifications queued in a rolled back transaction."""
+    if not previous_transaction.nested:  # The outer transaction decides
+        session.info.pop('notifications_pending', None)
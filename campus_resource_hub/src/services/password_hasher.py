@@ -0,0 +1,112 @@
+"""
+Password hashing for Campus Resource Hub.
+bcrypt runs on a small bounded worker pool instead of in whichever request
+thread asked, so a login burst or bulk account creation uses at most
+PASSWORD_HASH_WORKERS cores per process. bcrypt releases the GIL while hashing,
+so the workers run in parallel with each other and with request threads.
+
+The request thread waits for its hash, so the pool and the limit below only
+come into play with threaded workers (gunicorn -k gthread, see README); a sync
+worker never has more than one hash pending. When PASSWORD_HASH_MAX_PENDING
+request threads in a process are already waiting on the pool, new requests fail
+fast with PasswordHasherBusy (served as 503) rather than tying up the rest of
+the worker's threads. Keep it below the worker's --threads.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    """Raised when the hashing queue is full; served as 503 so the client retries shortly."""
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__("Too many password operations in progress. Please try again shortly.",
+                         retry_after=retry_after)
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded worker pool."""
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 8):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = None
+
+    def init_app(self, app):
+        """Initialize cost factor and pool limits from the Flask app config."""
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+
+    def _run(self, fn, *args):
+        """Run fn on the pool and wait for it, or raise PasswordHasherBusy if max_pending threads already wait."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            executor = self._executor
+
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password: str) -> str:
+        """
+        Hash a password at the configured cost factor.
+
+        Args:
+            password (str): Plain text password
+
+        Returns:
+            str: bcrypt hash
+
+        Raises:
+            PasswordHasherBusy: If the hashing queue is full
+        """
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Check a password against a bcrypt hash.
+
+        Args:
+            password (str): Plain text password
+            password_hash (str): Stored bcrypt hash
+
+        Returns:
+            bool: True if the password matches
+
+        Raises:
+            PasswordHasherBusy: If the hashing queue is full
+        """
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash ($2b$<cost>$...) was made at a cost other than the configured one."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        """Stop the worker pool (a later call starts a new one)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+
+# Global instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,307 @@
+"""
+Prompt assembler for the Resource Concierge.
+Builds the Gemini prompt from a precompiled static instruction prefix plus
+persona, knowledge, resource and user-profile sections, each trimmed to a
+token budget so prompt size stays predictable as the catalog grows.
+"""
+
+import logging
+import math
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Default per-section token budgets
+DEFAULT_BUDGETS = {
+    'persona': 1500,
+    'knowledge': 3000,
+    'resources': 2500,
+    'profile': 300,
+}
+
+TRUNCATION_NOTE = "[... truncated to fit token budget ...]"
+
+# Static instructions shared by every request. Kept as one constant prefix so
+# it is built once at import time and is identical across calls.
+STATIC_PREFIX = """You are the Campus Concierge, an AI-powered assistant for the IU Campus Resource Hub.
+
+YOUR CORE PURPOSE:
+Help students find and use campus resources by understanding their needs and matching them to specific facilities.
+
+⚠️ CRITICAL: BE SELECTIVE WITH RECOMMENDATIONS
+- NEVER list all available resources
+- NEVER say things like "We have X different resources of that type"
+- Instead, identify the user's ACTUAL NEED and recommend only the top 2-4 best matches
+- Show off your intelligence by filtering, not by listing everything
+- Example: If asked "What resources are available?" respond with "I'd love to help! To give you the best suggestions, could you tell me what you're looking for? Are you studying, collaborating, or something else?"
+
+SELECTIVE RECOMMENDATIONS STRATEGY:
+1. User asks vague question → Ask clarifying question about their specific need
+2. User asks specific question → Recommend only the most relevant resources
+3. If multiple good options exist → Present 2-3 top choices (ranked by popularity/ratings)
+4. Always explain WHY you picked those specific resources
+5. Mention "We also have other options" if there are alternatives, but don't list them all
+
+INFERENCE GUIDELINES:
+When users ask general questions, map them to specific resources:
+
+1. QUIET STUDY QUERIES:
+   - Primary: Wells Library (study rooms on Level 2 & 4, quiet pods)
+   - Alternative: Neal-Marshall Black Culture Center (Cultural Library Study Room)
+   - Always mention hours and if booking is required
+
+2. COMPUTER/TECH QUESTIONS:
+   - Primary: Luddy Hall (AI Lab, VR/AR Studio)
+   - Alternative: Wells Library (computer stations)
+   - Include access requirements and hours
+
+3. GROUP WORK SPACES:
+   - Primary: Kelley School (Student Collaboration Rooms G100-G150)
+   - Alternative: IMU (Student Organization Meeting Rooms)
+   - Mention capacity and booking process
+
+4. PRACTICE/PERFORMANCE:
+   - Primary: Jacobs School (practice rooms, Recording Studio 2A)
+   - Always mention if staff approval is needed
+
+PERSONALIZATION RULES:
+- User preferences are SUGGESTIONS to guide recommendations, NOT hard filters
+- Prioritize resources that match user preferences, but don't exclude good options just because they violate one preference
+- ACCESSIBILITY NEEDS are the ONLY hard requirement (e.g., if user needs wheelchair access, only suggest accessible resources)
+- If a resource is genuinely helpful for solving the user's problem, recommend it even if it doesn't match all preferences
+- Example: If user prefers solo study but asks for group study spaces, recommend group spaces! Don't ignore them due to the solo preference
+- Mention HOW recommendations match their preferences when applicable (e.g., "This matches your preference for quiet study")
+- If recommendation doesn't match a preference, briefly explain why it's still a good option
+
+RESPONSE STRUCTURE:
+1. First: Answer with SPECIFIC resources (name, location, hours)
+2. Then: Add relevant details (capacity, equipment, booking rules)
+3. If applicable: Mention why it matches their preferences
+4. Finally: Ask follow-up question about booking or additional needs
+
+FORMATTING REQUIREMENTS (IMPORTANT):
+Use markdown formatting to make responses clear and scannable:
+- Use **bold** for resource names, important terms, and key information
+- Use headers (##, ###) to organize multiple sections
+- Use bullet lists (- or •) for multiple items or features
+- Add blank lines between sections for better readability
+- Keep paragraphs short (2-3 sentences max)
+- Use numbered lists for step-by-step instructions
+- **ALWAYS include clickable links** when mentioning specific resources
+
+🔗 LINKING REQUIREMENTS (CRITICAL - DO NOT SKIP):
+When you mention a specific resource by name, ALWAYS include a clickable link in this format:
+[Resource Name](http://127.0.0.1:5000/resources/RESOURCE_ID)
+
+MANDATORY RULES:
+1. EVERY resource mentioned gets a markdown link
+2. Use the resource URLs from the resource context below
+3. Links MUST be included in your response - do not omit them
+4. Put links directly after the resource name or in a dedicated "Quick Links" section
+5. If user asks about a specific resource, LEAD with the link
+
+Example of CORRECT format:
+✅ "The **[IMU Solarium Event Room](http://127.0.0.1:5000/resources/15)** is perfect for your needs..."
+✅ "Check out the **[Wells Library Study Rooms](http://127.0.0.1:5000/resources/5)** - click to view and book!"
+
+Example of WRONG format (DO NOT DO THIS):
+❌ "The IMU Solarium Event Room is perfect..." (missing link - WRONG!)
+
+QUICK LINKS SECTION (ALWAYS ADD):
+At the end of your response about resources, ALWAYS add a "Quick Links" section:
+
+## 🔗 Quick Links
+- **[Resource Name](http://127.0.0.1:5000/resources/ID)** - Click to view details, photos, and book
+- **[Another Resource](http://127.0.0.1:5000/resources/ID)** - Click to view details and book
+
+This makes it EASY for the user to click and navigate.
+
+GOOD FORMAT EXAMPLE:
+## Study Rooms Available
+
+**[Wells Library](http://127.0.0.1:5000/resources/5)** has several options:
+- **Level 2 Study Rooms** - Capacity 4-8 people
+  • Equipment: Whiteboards, power outlets
+  • Hours: Mon-Thu 8AM-11PM, Fri 8AM-9PM
+  • [📖 View details & book here](http://127.0.0.1:5000/resources/5)
+
+- **Level 4 Quiet Pods** - Individual study (pilot program)
+  • Perfect for focused work
+  • No booking needed
+  • Same hours as above
+
+**Why these match:** You mentioned preferring quiet spaces, and these rooms are specifically designated for silent study.
+
+Would you like to book a room? Click the links above to see more details!
+
+EXAMPLES:
+Q: "Good places to study?"
+A: "The **[Wells Library](http://127.0.0.1:5000/resources/5)** offers several excellent study options:
+   • Quiet pods on Level 2 (pilot program)
+   • Study rooms on Level 2 & 4
+   • Hours: Mon-Thu 8AM-11PM, Fri 8AM-9PM
+
+## 🔗 Quick Links
+- **[Wells Library Study Rooms](http://127.0.0.1:5000/resources/5)** - Click to view details and book
+
+Would you like me to suggest other study spaces?"
+
+REMEMBER: Every response about resources MUST include clickable markdown links.
+NO EXCEPTIONS - Always include links when mentioning specific resources."""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a string without a model tokenizer.
+    Uses the larger of ~4 characters per token and ~1.3 tokens per word,
+    which tracks SentencePiece/BPE counts closely for English markdown.
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 1.3))
+
+
+STATIC_PREFIX_TOKENS = estimate_tokens(STATIC_PREFIX)
+
+
+class PromptAssembler:
+    """Assembles concierge prompts within fixed per-section token budgets."""
+    
+    def __init__(self, budgets: Optional[dict] = None):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+    
+    def assemble(self, question: str, persona: str = "", knowledge: str = "",
+                 resources: str = "", user_preferences: Optional[dict] = None,
+                 now: Optional[datetime] = None) -> str:
+        """
+        Build the full prompt for a question.
+        
+        Args:
+            question: User's question
+            persona: Persona and guideline text
+            knowledge: RAG knowledge base text
+            resources: Resource context built from the database
+            user_preferences: Dictionary of user preferences, if any
+            now: Timestamp to embed (defaults to datetime.now())
+        
+        Returns:
+            str: Prompt text ready to send to the model
+        """
+        sections = {
+            'persona': self.fit(persona, self.budgets['persona']),
+            'knowledge': self.fit(knowledge, self.budgets['knowledge']),
+            'resources': self.fit(resources, self.budgets['resources']),
+            'profile': self.fit(format_user_profile(user_preferences), self.budgets['profile']),
+        }
+        
+        timestamp = (now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+        parts = [STATIC_PREFIX]
+        parts.extend(text for text in sections.values() if text)
+        parts.append(f"Current date/time: {timestamp}")
+        parts.append(f"Student Question: {question}")
+        prompt = "\n\n".join(parts)
+        
+        sizes = {name: estimate_tokens(text) for name, text in sections.items()}
+        logger.info(
+            f"[PROMPT] ~{estimate_tokens(prompt)} tokens "
+            f"(prefix={STATIC_PREFIX_TOKENS}, "
+            + ", ".join(f"{name}={size}" for name, size in sizes.items())
+            + f", question={estimate_tokens(question)})"
+        )
+        return prompt
+    
+    @staticmethod
+    def fit(text: str, budget: int) -> str:
+        """
+        Trim text to a token budget on line boundaries.
+        Leading lines are kept (callers order content by importance); headings
+        from the dropped tail are listed in a one-line summary when room allows.
+        
+        Args:
+            text: Section text
+            budget: Maximum estimated tokens for the section
+        
+        Returns:
+            str: Text that fits within the budget
+        """
+        if not text or estimate_tokens(text) <= budget:
+            return text or ""
+        
+        # Leave ~10% of the budget for the summary of dropped headings
+        reserve = estimate_tokens(TRUNCATION_NOTE) + 1 + budget // 10
+        kept = []
+        used = 0
+        lines = text.split('\n')
+        index = 0
+        for index, line in enumerate(lines):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget - reserve:
+                break
+            kept.append(line)
+            used += cost
+        
+        dropped_headings = [
+            line.lstrip('#').strip() for line in lines[index:]
+            if line.startswith('#') and line.lstrip('#').strip()
+        ]
+        if dropped_headings:
+            summary = "Also covered (details omitted): "
+            room = budget - estimate_tokens(TRUNCATION_NOTE) - 1 - used - estimate_tokens(summary)
+            topics = []
+            for heading in dropped_headings:
+                cost = estimate_tokens(heading) + 1
+                if cost > room:
+                    break
+                topics.append(heading)
+                room -= cost
+            if topics:
+                kept.append(summary + "; ".join(topics))
+        
+        kept.append(TRUNCATION_NOTE)
+        return "\n".join(kept)
+
+
+def format_user_profile(user_preferences: Optional[dict]) -> str:
+    """Format user preferences as a prompt section (empty if none)."""
+    if not user_preferences:
+        return ""
+    
+    user_context = "USER PROFILE & PREFERENCES:\n"
+    
+    if user_preferences.get('year_in_school'):
+        user_context += f"- Academic Level: {user_preferences['year_in_school']}\n"
+    
+    if user_preferences.get('major'):
+        user_context += f"- Major: {user_preferences['major']}\n"
+    
+    if user_preferences.get('interests'):
+        interests = ', '.join(user_preferences['interests'])
+        user_context += f"- Interests: {interests}\n"
+    
+    if user_preferences.get('study_preferences'):
+        prefs = user_preferences['study_preferences']
+        user_context += "- Study Preferences:\n"
+        if prefs.get('environment'):
+            user_context += f"  • Environment: {prefs['environment']}\n"
+        if prefs.get('time'):
+            user_context += f"  • Preferred time: {prefs['time']}\n"
+        if prefs.get('group_size'):
+            user_context += f"  • Group size: {prefs['group_size']}\n"
+    
+    if user_preferences.get('accessibility_needs'):
+        needs = ', '.join([n.replace('_', ' ').title() for n in user_preferences['accessibility_needs']])
+        user_context += f"- Accessibility Needs: {needs}\n"
+    
+    if user_preferences.get('preferred_locations'):
+        locs = ', '.join(user_preferences['preferred_locations'])
+        user_context += f"- Preferred Locations: {locs}\n"
+    
+    user_context += "\n🎯 IMPORTANT: Use these preferences to personalize your recommendations!"
+    return user_context
+
+
+# Global instance
+prompt_assembler = PromptAssembler()
@@ -0,0 +1,131 @@
+"""
+Booking reminder scheduler for Campus Resource Hub.
+Periodically scans bookings starting within the reminder lead time and creates
+one reminder notification and one queued reminder email per booking, recorded
+in bookings.reminder_sent_at so a booking is never reminded twice.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from src.extensions import db
+from src.models import Booking
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Materializes booking reminders on a fixed interval.
+
+    Each run is one indexed range query on (reminder_sent_at, start_time).
+    A booking is claimed with a conditional UPDATE on reminder_sent_at, so
+    concurrent schedulers (e.g. several worker processes) cannot both remind.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.poll_interval = 300
+        self.lead_time = timedelta(hours=24)
+        self.send_emails = True
+        self._thread = None
+        self._stop = threading.Event()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize scheduler settings from the Flask app config."""
+        self.app = app
+        self.poll_interval = app.config.get('BOOKING_REMINDER_POLL_INTERVAL', self.poll_interval)
+        self.lead_time = timedelta(hours=app.config.get('BOOKING_REMINDER_HOURS', 24))
+        self.send_emails = app.config.get('EMAIL_NOTIFICATIONS_ENABLED', True)
+
+    def start(self):
+        """Start the scheduler thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='booking-reminder-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Booking reminder scheduler started")
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """Scheduler loop."""
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_due()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Booking reminder scheduler error: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def due_bookings(self, now: datetime) -> list:
+        """
+        Get bookings starting within the lead time that have not been reminded.
+
+        Args:
+            now (datetime): Current UTC time
+
+        Returns:
+            list: Pending and confirmed bookings, soonest first
+        """
+        return Booking.query.filter(
+            Booking.reminder_sent_at.is_(None),
+            Booking.start_time > now,
+            Booking.start_time <= now + self.lead_time,
+            Booking.status.in_([Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED])
+        ).order_by(Booking.start_time).all()
+
+    def run_due(self, now: datetime = None) -> int:
+        """
+        Create reminders for every due booking.
+
+        The claim, the queued email and the notification for a booking commit
+        together, so a failure leaves the booking eligible for the next run.
+
+        Args:
+            now (datetime): Current UTC time (defaults to utcnow)
+
+        Returns:
+            int: Number of bookings reminded
+        """
+        from src.services.email_service import email_service
+        from src.services.notification_service import NotificationService
+
+        now = now or datetime.utcnow()
+        sent = 0
+        for booking in self.due_bookings(now):
+            try:
+                claimed = Booking.query.filter(
+                    Booking.id == booking.id,
+                    Booking.reminder_sent_at.is_(None)
+                ).update({Booking.reminder_sent_at: now}, synchronize_session=False)
+                if not claimed:
+                    db.session.rollback()
+                    continue
+
+                hours_before = max(int((booking.start_time - now).total_seconds() // 3600), 1)
+                if self.send_emails:
+                    email_service.send_booking_reminder(booking, booking.user, hours_before=hours_before)
+
+                NotificationService.notify_booking_reminder(booking)
+                db.session.commit()
+                sent += 1
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error creating reminder for booking {booking.id}: {str(e)}")
+        return sent
+
+
+# Global instance
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,142 @@
+"""
+Rendered review fragments for Campus Resource Hub.
+Keeps the first page of each resource's reviews (with its rating summary) as
+rendered HTML. On a hit, a resource detail page runs one primary-key lookup of
+the resource's review version and no other review query. Every review write
+bumps that version, so a fragment cached by any worker process is only served
+while it is current. Writes also drop this process's fragments once their
+transaction commits. Entries expire after a TTL, bounding staleness for changes
+made outside the review DAL (e.g. a reviewer's display name).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Callable
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from src.services.after_commit import run_after_commit
+
+
+class ReviewFragmentCache:
+    """Thread-safe LRU cache of rendered HTML keyed by (resource_id, variant)."""
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._fragments = OrderedDict()  # (resource_id, variant) -> (html, rendered_at, version)
+        self._generations = {}  # resource_id -> invalidation count
+        self._epoch = 0  # Bumped when every fragment is dropped
+
+    def init_app(self, app):
+        """Initialize cache limits from the Flask app config."""
+        self.ttl_seconds = app.config.get('REVIEW_FRAGMENT_CACHE_TTL', self.ttl_seconds)
+        self.max_entries = app.config.get('REVIEW_FRAGMENT_CACHE_SIZE', self.max_entries)
+
+    def get(self, resource_id: int, variant: str, render: Callable[[], str], version=None) -> str:
+        """
+        Get a resource's rendered fragment, rendering and caching it on a miss.
+
+        Args:
+            resource_id (int): ID of resource
+            variant (str): Viewer-dependent flavour of the fragment (e.g. 'guest')
+            render (callable): Renders the fragment from the database
+            version: Current version of the resource's reviews; a fragment
+                rendered at another version is re-rendered
+
+        Returns:
+            str: Rendered HTML
+        """
+        key = (resource_id, variant)
+        with self._lock:
+            entry = self._fragments.get(key)
+            if entry and entry[2] == version and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._fragments.move_to_end(key)
+                return entry[0]
+            generation = (self._epoch, self._generations.get(resource_id, 0))
+
+        html = render()
+        with self._lock:
+            # A write committed while rendering may make this render stale; don't keep it
+            if (self._epoch, self._generations.get(resource_id, 0)) == generation:
+                self._fragments[key] = (html, time.monotonic(), version)
+                self._fragments.move_to_end(key)
+                while len(self._fragments) > self.max_entries:
+                    self._fragments.popitem(last=False)
+        return html
+
+    def invalidate(self, resource_id: int = None) -> None:
+        """Drop a resource's fragments (or every fragment) so the next view re-renders."""
+        with self._lock:
+            if resource_id is None:
+                self._fragments.clear()
+                self._generations.clear()
+                self._epoch += 1
+                return
+            self._generations[resource_id] = self._generations.get(resource_id, 0) + 1
+            for key in [key for key in self._fragments if key[0] == resource_id]:
+                del self._fragments[key]
+
+    def invalidate_after_commit(self, session, resource_id: int = None) -> None:
+        """
+        Drop a resource's fragments (every fragment when resource_id is None)
+        once the session's transaction commits. Used by review writes so a view
+        can't re-cache pre-commit data.
+        """
+        run_after_commit(session, ('review_fragments', resource_id), partial(self.invalidate, resource_id))
+
+
+# Global instance
+review_fragments = ReviewFragmentCache()
+
+
+def review_viewer(user) -> dict:
+    """
+    Viewer-dependent flags for review list templates.
+
+    Args:
+        user: Current user (may be anonymous)
+
+    Returns:
+        dict: can_report (any signed-in user) and can_moderate (staff/admin)
+    """
+    authenticated = bool(user and user.is_authenticated)
+    return {
+        'can_report': authenticated,
+        'can_moderate': authenticated and (user.is_admin() or user.is_staff())
+    }
+
+
+def render_resource_reviews(resource_id: int, user) -> Markup:
+    """
+    Render the first page of a resource's reviews and its rating summary,
+    served from the fragment cache when fresh.
+
+    Args:
+        resource_id (int): ID of resource
+        user: Current user (may be anonymous)
+
+    Returns:
+        Markup: Rendered reviews/_review_list.html
+    """
+    from src.data_access.review_dal import ReviewDAL
+
+    viewer = review_viewer(user)
+    variant = 'moderator' if viewer['can_moderate'] else 'member' if viewer['can_report'] else 'guest'
+
+    def render():
+        page_size = current_app.config.get('REVIEW_PAGE_SIZE', 10)
+        return render_template(
+            'reviews/_review_list.html',
+            resource_id=resource_id,
+            reviews=ReviewDAL.get_resource_reviews(resource_id, limit=page_size),
+            stats=ReviewDAL.get_review_stats(resource_id),
+            **viewer
+        )
+
+    version = ReviewDAL.get_review_version(resource_id)
+    return Markup(review_fragments.get(resource_id, variant, render, version=version))
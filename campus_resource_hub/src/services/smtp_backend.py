@@ -0,0 +1,226 @@
+"""
+SMTP email backend for Campus Resource Hub.
+Keeps a small pool of persistent, authenticated SMTP connections so bulk sends
+(e.g. approving many bookings at once) skip the per-message connect, TLS and
+AUTH handshake. Broken connections are discarded and replaced transparently.
+"""
+
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """
+    Whether an error means the connection can no longer be used.
+
+    SMTPException subclasses OSError, so socket failures are told apart from
+    message-level rejections (bad recipient, policy refusal) explicitly.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of persistent SMTP connections.
+
+    At most pool_size connections are open at once; callers block until one is
+    free. Idle connections are checked with NOOP before reuse, and connections
+    are recycled after max_messages so servers with per-session limits are
+    respected.
+    """
+
+    def __init__(self, host: str, port: int = 587, username: str = None, password: str = None,
+                 use_tls: bool = True, use_ssl: bool = False, timeout: float = 10,
+                 pool_size: int = 4, max_messages: int = 100, idle_check: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_messages = max_messages
+        self.idle_check = idle_check
+        self._idle = queue.LifoQueue()  # Most recently used first, so spare connections age out
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open, secure and authenticate a new connection."""
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                conn.starttls(context=context)
+        if self.username:
+            conn.login(self.username, self.password or '')
+        self.connections_opened += 1
+        return conn
+
+    def _checkout(self):
+        """Return an idle connection that is still alive, or open a new one."""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return {'conn': self._connect(), 'sent': 0, 'last_used': time.monotonic()}
+            if time.monotonic() - entry['last_used'] < self.idle_check:
+                return entry
+            try:
+                if entry['conn'].noop()[0] == 250:
+                    return entry
+            except OSError:
+                pass
+            self._discard(entry)
+
+    @staticmethod
+    def _discard(entry):
+        """Close a connection, ignoring errors from an already-dead socket."""
+        try:
+            entry['conn'].quit()
+        except Exception:
+            try:
+                entry['conn'].close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one or more sends.
+
+        The connection returns to the pool on success; it is closed if the
+        block raises a connection-level error.
+        """
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry
+            entry['last_used'] = time.monotonic()
+            if entry['sent'] >= self.max_messages:
+                self._discard(entry)
+            else:
+                self._idle.put(entry)
+            entry = None
+        except OSError as e:
+            if entry and is_connection_error(e):
+                self._discard(entry)
+                entry = None
+            raise
+        finally:
+            if entry:
+                # Message-level SMTP errors leave the session usable
+                self._idle.put(entry)
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class SMTPBackend:
+    """Builds MIME messages and sends them over pooled connections, retrying once on reconnect."""
+
+    def __init__(self, pool: SMTPConnectionPool, default_sender: str):
+        self.pool = pool
+        self.default_sender = default_sender
+
+    @classmethod
+    def from_config(cls, config) -> 'SMTPBackend':
+        """Create a backend from Flask config (MAIL_* settings)."""
+        pool = SMTPConnectionPool(
+            host=config.get('MAIL_SERVER', 'localhost'),
+            port=config.get('MAIL_PORT', 587),
+            username=config.get('MAIL_USERNAME'),
+            password=config.get('MAIL_PASSWORD'),
+            use_tls=config.get('MAIL_USE_TLS', True),
+            use_ssl=config.get('MAIL_USE_SSL', False),
+            timeout=config.get('MAIL_TIMEOUT', 10),
+            pool_size=config.get('MAIL_POOL_SIZE', 4),
+            max_messages=config.get('MAIL_MAX_MESSAGES_PER_CONNECTION', 100)
+        )
+        return cls(pool, config.get('MAIL_DEFAULT_SENDER', 'noreply@campus-hub.local'))
+
+    def build_message(self, to_email: str, subject: str, body: str,
+                      to_name: Optional[str] = None, html_body: Optional[str] = None) -> EmailMessage:
+        """Build a plain-text message with an optional HTML alternative."""
+        msg = EmailMessage()
+        msg['From'] = self.default_sender
+        msg['To'] = formataddr((to_name, to_email)) if to_name else to_email
+        msg['Subject'] = subject
+        msg['Message-ID'] = make_msgid(domain=self.default_sender.rsplit('@', 1)[-1])
+        msg.set_content(body)
+        if html_body:
+            msg.add_alternative(html_body, subtype='html')
+        return msg
+
+    def send(self, to_email: str, subject: str, body: str,
+             to_name: Optional[str] = None, html_body: Optional[str] = None) -> bool:
+        """
+        Send one email.
+
+        Returns:
+            True if the server accepted the message
+
+        Raises:
+            smtplib.SMTPException: If the server rejects the message
+            OSError: If the server is unreachable after a reconnect
+        """
+        return self.send_many([self.build_message(to_email, subject, body, to_name, html_body)]) == 1
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> int:
+        """
+        Send several messages back-to-back over one pooled connection.
+
+        Args:
+            messages: Messages built with build_message()
+
+        Returns:
+            int: Number of messages accepted
+
+        Raises:
+            smtplib.SMTPException: If the server rejects a message
+            OSError: If the server is unreachable after a reconnect
+        """
+        pending: List[EmailMessage] = list(messages)
+        sent = 0
+        retried = False
+        while pending:
+            try:
+                with self.pool.connection() as entry:
+                    while pending:
+                        entry['conn'].send_message(pending[0])
+                        entry['sent'] += 1
+                        pending.pop(0)
+                        sent += 1
+            except OSError as e:
+                # A pooled connection may have been dropped by the server; retry once on a fresh one
+                if retried or not is_connection_error(e):
+                    raise
+                logger.warning(f"SMTP connection lost ({str(e)}), reconnecting")
+                retried = True
+        return sent
+
+    def close(self):
+        """Close pooled connections (e.g. at shutdown)."""
+        self.pool.close()
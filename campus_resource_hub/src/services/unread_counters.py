@@ -0,0 +1,105 @@
+"""
+Per-user unread counters for Campus Resource Hub.
+Keeps unread notification and message counts in memory so badge refreshes
+are O(1) reads. Counters are adjusted by create/mark-read events, loaded from
+the database on a miss, and reconciled with a fresh COUNT once they are older
+than the reconcile interval (bounding drift across worker processes).
+"""
+
+import threading
+import time
+from functools import partial
+from typing import Callable
+
+from src.services.after_commit import run_after_commit
+
+NOTIFICATIONS = 'notifications'
+MESSAGES = 'messages'
+
+
+class UnreadCounters:
+    """Thread-safe cache of unread counts keyed by (kind, user_id)."""
+
+    def __init__(self, reconcile_seconds: float = 60):
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._counts = {}  # (kind, user_id) -> [count, loaded_at]
+        self._generations = {}  # (kind, user_id) -> change count
+        self._epoch = 0  # Bumped when every counter is dropped
+
+    def get(self, kind: str, user_id: int, loader: Callable[[], int]) -> int:
+        """
+        Get a user's unread count, loading it from the database when needed.
+
+        Args:
+            kind (str): Counter kind (NOTIFICATIONS or MESSAGES)
+            user_id (int): ID of user
+            loader (callable): Returns the authoritative count from the database
+
+        Returns:
+            int: Unread count
+        """
+        key = (kind, user_id)
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry and time.monotonic() - entry[1] < self.reconcile_seconds:
+                return entry[0]
+            generation = (self._epoch, self._generations.get(key, 0))
+
+        count = loader()
+        with self._lock:
+            # A change applied while loading may be missing from count; don't keep it
+            if (self._epoch, self._generations.get(key, 0)) == generation:
+                self._counts[key] = [count, time.monotonic()]
+        return count
+
+    def adjust(self, kind: str, user_id: int, delta: int) -> None:
+        """
+        Apply a change to a cached counter (no-op if the counter is not cached).
+        Call only after the change has been committed.
+        """
+        key = (kind, user_id)
+        with self._lock:
+            self._bump(key)
+            entry = self._counts.get(key)
+            if entry:
+                entry[0] = max(entry[0] + delta, 0)
+
+    def adjust_after_commit(self, session, kind: str, user_id: int, delta: int) -> None:
+        """
+        Apply a change once the session's transaction commits.
+        Used by writes that leave the commit to the caller; the change is
+        dropped if the transaction rolls back.
+        """
+        run_after_commit(session, None, partial(self.adjust, kind, user_id, delta))
+
+    def set(self, kind: str, user_id: int, count: int) -> None:
+        """Set a counter to a known value (e.g. 0 after marking everything read)."""
+        key = (kind, user_id)
+        with self._lock:
+            self._bump(key)
+            self._counts[key] = [count, time.monotonic()]
+
+    def invalidate(self, kind: str = None, user_id: int = None) -> None:
+        """Drop cached counters so the next read reloads them from the database."""
+        with self._lock:
+            if kind is None and user_id is None:
+                self._counts.clear()
+                self._generations.clear()
+                self._epoch += 1
+                return
+            for key in list(self._counts):
+                if (kind is None or key[0] == kind) and (user_id is None or key[1] == user_id):
+                    del self._counts[key]
+            if kind is not None and user_id is not None:
+                self._bump((kind, user_id))
+            else:
+                self._epoch += 1
+
+    def _bump(self, key: tuple) -> None:
+        """Record a change to a counter so in-flight loads of it are discarded. Lock held."""
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+
+# Global instance
+unread_counters = UnreadCounters()
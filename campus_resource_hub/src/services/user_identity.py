@@ -0,0 +1,165 @@
+"""
+User identity cache for Campus Resource Hub.
+Flask-Login resolves current_user on every authenticated request. Instead of
+loading the full users row each time, the user loader serves a UserIdentity:
+a snapshot of the columns used for permission checks and page chrome, cached
+per user ID with the row's updated_at as its version. The full ORM row is
+loaded (once per request) only when a view touches anything else.
+
+Any committed change to a users row (UserDAL.update_user, update_preferences,
+role changes, deactivation, deletion) drops that user's entry; entries also
+expire after a short TTL, bounding staleness across worker processes.
+"""
+
+import threading
+import time
+from functools import partial
+from itertools import chain
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.extensions import db
+from src.models import User
+from src.services.after_commit import run_after_commit
+
+# Columns copied into the cached snapshot
+IDENTITY_FIELDS = ('id', 'username', 'email', 'full_name', 'role', 'is_active', 'profile_image',
+                   'department', 'email_frequency', 'updated_at')
+
+
+class UserIdentity(UserMixin):
+    """
+    Lightweight stand-in for User as Flask-Login's current_user.
+    Snapshot columns are plain attributes; any other attribute or method
+    (relationships, preferences, check_password, ...) is served from the full
+    User row, loaded on first use and kept for the rest of the request.
+    """
+
+    def __init__(self, snapshot: dict, user: User = None):
+        self.__dict__.update(snapshot)
+        self._user = user
+
+    @property
+    def is_active(self):
+        """Whether the account is active (Flask-Login)."""
+        return self.__dict__['is_active']
+
+    @property
+    def version(self):
+        """updated_at of the row this snapshot was taken from."""
+        return self.updated_at
+
+    def load(self) -> User:
+        """
+        Get the full User row for this identity (one query per request).
+
+        Returns:
+            User: ORM user, or None if the user no longer exists
+        """
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def is_admin(self):
+        """Check if user has admin role."""
+        return self.role == User.ROLE_ADMIN
+
+    def is_staff(self):
+        """Check if user has staff role."""
+        return self.role == User.ROLE_STAFF
+
+    def is_student(self):
+        """Check if user has student role."""
+        return self.role == User.ROLE_STUDENT
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        user = self.load()
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+
+class UserIdentityCache:
+    """Thread-safe cache of identity snapshots keyed by user ID."""
+
+    def __init__(self, ttl_seconds: float = 30):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshots = {}  # user_id -> [snapshot, loaded_at]
+
+    def init_app(self, app):
+        """Initialize the TTL from the Flask app config."""
+        self.ttl_seconds = app.config.get('USER_IDENTITY_CACHE_TTL', self.ttl_seconds)
+
+    def get(self, user_id: int) -> dict:
+        """Get a fresh cached snapshot, or None on a miss."""
+        with self._lock:
+            entry = self._snapshots.get(user_id)
+            if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+        return None
+
+    def put(self, user: User) -> dict:
+        """
+        Cache a snapshot of a user row unless a newer version is already cached.
+
+        Args:
+            user (User): Freshly loaded user
+
+        Returns:
+            dict: The cached snapshot (the newer one if the row was stale)
+        """
+        snapshot = {field: getattr(user, field) for field in IDENTITY_FIELDS}
+        with self._lock:
+            entry = self._snapshots.get(user.id)
+            if entry and entry[0]['updated_at'] > snapshot['updated_at']:
+                return entry[0]
+            self._snapshots[user.id] = [snapshot, time.monotonic()]
+        return snapshot
+
+    def invalidate(self, user_id: int = None) -> None:
+        """Drop a user's snapshot (or every snapshot) so the next request reloads it."""
+        with self._lock:
+            if user_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(user_id, None)
+
+    def load_identity(self, user_id: int) -> UserIdentity:
+        """
+        Resolve a user ID to a UserIdentity, querying only on a cache miss.
+
+        Args:
+            user_id (int): ID of user
+
+        Returns:
+            UserIdentity: Identity for the user, or None if the user doesn't exist
+        """
+        snapshot = self.get(user_id)
+        if snapshot is not None:
+            return UserIdentity(snapshot)
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        snapshot = self.put(user)
+        return UserIdentity(snapshot, user if snapshot['updated_at'] == user.updated_at else None)
+
+
+# Global instance
+user_identities = UserIdentityCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_user_changes(session, flush_context):
+    """Session hook: drop snapshots of users this transaction changed once it commits."""
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, User):
+            run_after_commit(session, ('user_identities', obj.id), partial(user_identities.invalidate, obj.id))
@@ -25,6 +25,20 @@ from src.data_access.user_dal import UserDAL
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.booking_dal import BookingDAL
 
+
+def pytest_configure(config):
+    """Register the markers used across the suite."""
+    for marker in (
+        'unit: fast tests of a single component',
+        'dal: data access layer tests',
+        'integration: tests that exercise several components or real network services',
+        'security: authentication, authorization and input-handling tests',
+        'e2e: end-to-end user workflows',
+        'slow: tests that take noticeably longer to run',
+    ):
+        config.addinivalue_line('markers', marker)
+
+
 # Enable foreign key constraints for SQLite (must be done before any connections)
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_conn, connection_record):
@@ -120,6 +134,16 @@ def app():
         yield app
         _db.session.remove()
         _db.drop_all()
+    
+    # Cached unread counters are keyed by user ID, which each fresh database reuses
+    from src.services.unread_counters import unread_counters
+    unread_counters.invalidate()
+    
+    # Likewise review fragments, keyed by resource ID, and user identities
+    from src.services.review_fragments import review_fragments
+    review_fragments.invalidate()
+    from src.services.user_identity import user_identities
+    user_identities.invalidate()
 
 
 @pytest.fixture(scope='function')
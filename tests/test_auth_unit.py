@@ -0,0 +1,177 @@
+"""
+Unit tests for authentication internals.
+
+Tests cover:
+- Cached user identities served to Flask-Login
+- Invalidation when a users row changes
+- Password hashing pool: cost factor, 503 when the queue is full, rehash on login
+"""
+
+import pytest
+import sys
+import os
+import threading
+from datetime import timedelta
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.data_access.user_dal import UserDAL
+from src.services.user_identity import UserIdentity, user_identities
+from src.services.password_hasher import PasswordHasher, PasswordHasherBusy, password_hasher
+
+
+def _user_queries(db, call):
+    """Run call and return its result and the SELECTs it issued against users."""
+    from sqlalchemy import event
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        result = call()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    return result, statements
+
+
+@pytest.mark.unit
+class TestUserIdentityCache:
+    """Test the Flask-Login identity cache."""
+
+    def test_cache_hit_skips_query(self, db, sample_student):
+        """Test a cached identity answers permission checks without touching users."""
+        user_id, username = sample_student.id, sample_student.username
+        user_identities.load_identity(user_id)
+        db.session.expire_all()
+
+        identity, statements = _user_queries(db, lambda: user_identities.load_identity(user_id))
+
+        assert statements == []
+        assert isinstance(identity, UserIdentity)
+        assert identity.username == username
+        assert identity.is_student() and not identity.is_admin()
+        assert identity.is_authenticated and identity.is_active
+
+    def test_full_row_loaded_on_demand(self, db, sample_student):
+        """Test non-snapshot attributes load the ORM row once per identity."""
+        user_identities.load_identity(sample_student.id)
+        identity = user_identities.load_identity(sample_student.id)
+        db.session.expire_all()
+
+        (valid, _), statements = _user_queries(db, lambda: (identity.check_password('SecurePass123!'),
+                                                            identity.created_at))
+
+        assert valid
+        assert len(statements) == 1
+        assert identity.load() is sample_student
+
+    def test_role_change_invalidates(self, db, sample_student):
+        """Test UserDAL.update_user drops the cached identity after commit."""
+        assert not user_identities.load_identity(sample_student.id).is_admin()
+
+        UserDAL.update_user(sample_student.id, role='admin')
+
+        assert user_identities.get(sample_student.id) is None
+        assert user_identities.load_identity(sample_student.id).is_admin()
+
+    def test_preferences_and_deactivation_invalidate(self, db, sample_student):
+        """Test preference updates and deactivation drop the cached identity."""
+        user_identities.load_identity(sample_student.id)
+        UserDAL.update_preferences(sample_student.id, major='History')
+        assert user_identities.get(sample_student.id) is None
+
+        user_identities.load_identity(sample_student.id)
+        UserDAL.deactivate_user(sample_student.id)
+        assert not user_identities.load_identity(sample_student.id).is_active
+
+    def test_stale_row_does_not_replace_newer(self, db, sample_student):
+        """Test a snapshot read before an update can't overwrite the newer cached version."""
+        user_identities.put(sample_student)
+        newer = user_identities.get(sample_student.id)
+
+        sample_student.updated_at = sample_student.updated_at - timedelta(minutes=1)
+        user_identities.put(sample_student)
+
+        assert user_identities.get(sample_student.id) is newer
+        db.session.rollback()
+
+    def test_profile_renders_full_row(self, db, authenticated_client, sample_student):
+        """Test the profile page loads through the identity and shows the stored name."""
+        response = authenticated_client.get('/auth/profile')
+
+        assert response.status_code == 200
+        assert sample_student.full_name in response.get_data(as_text=True)
+
+
+@pytest.mark.unit
+class TestPasswordHasher:
+    """Test bcrypt hashing on the bounded pool."""
+
+    def test_hash_and_verify(self):
+        """Test hashes use the configured cost and verify only the right password."""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        try:
+            password_hash = hasher.hash('correct horse')
+
+            assert password_hash.startswith('$2b$04$')
+            assert hasher.verify('correct horse', password_hash)
+            assert not hasher.verify('wrong horse', password_hash)
+            assert not hasher.needs_rehash(password_hash)
+            assert PasswordHasher(rounds=12).needs_rehash(password_hash)
+        finally:
+            hasher.shutdown()
+
+    def test_full_queue_raises(self):
+        """Test a full queue fails fast instead of waiting."""
+        hasher = PasswordHasher(rounds=4, max_pending=0)
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('anything')
+
+    def test_waiting_request_threads_count_against_limit(self):
+        """Test threads already waiting on the pool make the next caller fail fast."""
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=2)
+        release = threading.Event()
+        waiting = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(2)]
+        try:
+            for thread in waiting:
+                thread.start()
+            while hasher._pending < 2:
+                release.wait(0.01)
+
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash('anything')
+        finally:
+            release.set()
+            for thread in waiting:
+                thread.join()
+            hasher.shutdown()
+
+        assert hasher._pending == 0
+
+    def test_login_returns_503_when_busy(self, db, client, sample_student, monkeypatch):
+        """Test a login during a hashing overload gets 503 with Retry-After."""
+        monkeypatch.setattr(password_hasher, 'max_pending', 0)
+
+        response = client.post('/auth/login', data={'username': sample_student.username,
+                                                    'password': 'SecurePass123!'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+
+    def test_login_rehashes_to_policy_cost(self, db, client, sample_student, monkeypatch):
+        """Test a successful login upgrades a hash stored at another cost."""
+        monkeypatch.setattr(password_hasher, 'rounds', 4)
+        assert password_hasher.needs_rehash(sample_student.password_hash)
+
+        response = client.post('/auth/login', data={'username': sample_student.username,
+                                                    'password': 'SecurePass123!'})
+
+        assert response.status_code == 302
+        db.session.expire_all()
+        assert sample_student.password_hash.startswith('$2b$04$')
+        assert sample_student.check_password('SecurePass123!')
@@ -0,0 +1,92 @@
+"""
+Unit tests for scheduled booking reminders.
+
+Tests cover:
+- One reminder notification and email per booking entering the reminder window
+- Bookings outside the window or no longer active are skipped
+- Rescheduling a booking makes it eligible for a fresh reminder
+- Notification polling returns only stored notifications
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.data_access.booking_dal import BookingDAL
+from src.models.models import Booking, EmailOutbox, Notification
+from src.services.email_service import email_service
+from src.services.reminder_scheduler import ReminderScheduler
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Queue emails in the outbox so tests can count them."""
+    monkeypatch.setattr(email_service, 'use_outbox', True)
+
+
+def _book(db, user, resource, starts_in, status=Booking.STATUS_CONFIRMED):
+    start = datetime.utcnow() + starts_in
+    booking = BookingDAL.create_booking(user_id=user.id, resource_id=resource.id,
+                                        start_time=start, end_time=start + timedelta(hours=1))
+    booking.status = status
+    db.session.commit()
+    return booking
+
+
+@pytest.mark.unit
+class TestReminderScheduler:
+    """Test reminder materialization."""
+
+    def test_reminder_created_once(self, db, outbox, sample_student, sample_resource):
+        """Test a due booking gets exactly one notification and one email."""
+        booking = _book(db, sample_student, sample_resource, timedelta(hours=3))
+        scheduler = ReminderScheduler()
+
+        assert scheduler.run_due() == 1
+        assert scheduler.run_due() == 0
+
+        reminders = Notification.query.filter_by(
+            notification_type=Notification.TYPE_BOOKING_REMINDER).all()
+        assert len(reminders) == 1
+        assert reminders[0].booking_id == booking.id
+        assert reminders[0].action_url == f'/bookings/{booking.id}/view'
+        assert EmailOutbox.query.one().subject.startswith('Reminder: Upcoming Booking')
+        assert db.session.get(Booking, booking.id).reminder_sent_at is not None
+
+    def test_outside_window_and_inactive_skipped(self, db, outbox, sample_student, sample_resource):
+        """Test only active bookings starting within the lead time are reminded."""
+        _book(db, sample_student, sample_resource, timedelta(hours=30))
+        _book(db, sample_student, sample_resource, timedelta(hours=-2))
+        _book(db, sample_student, sample_resource, timedelta(hours=5), status=Booking.STATUS_CANCELLED)
+
+        assert ReminderScheduler().run_due() == 0
+        assert Notification.query.count() == 0
+
+    def test_reschedule_resets_reminder(self, db, outbox, sample_student, sample_resource):
+        """Test moving a booking makes it eligible for a new reminder."""
+        booking = _book(db, sample_student, sample_resource, timedelta(hours=3))
+        scheduler = ReminderScheduler()
+        scheduler.run_due()
+
+        new_start = datetime.utcnow() + timedelta(hours=6)
+        BookingDAL.update_booking(booking.id, start_time=new_start, end_time=new_start + timedelta(hours=1))
+
+        assert db.session.get(Booking, booking.id).reminder_sent_at is None
+        assert scheduler.run_due() == 1
+
+    def test_polling_returns_stored_notifications_only(self, db, app, client, sample_student, sample_booking):
+        """Test upcoming bookings no longer appear as synthetic poll items."""
+        from src.controllers import messages
+        if 'api' not in app.blueprints:
+            app.register_blueprint(messages.api_bp)
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(sample_student.id)
+
+        data = client.get('/api/notifications').get_json()
+
+        assert data['count'] == 0
+        assert data['unread_count'] == 0
@@ -0,0 +1,133 @@
+"""
+Unit tests for the concierge intent router.
+
+Tests cover:
+- Parsing capacity, building, resource type and time-window intents
+- Head-count ranges and time ranges that cross noon
+- Durations and bare building names not mistaken for search filters
+- Open-ended questions falling through to the LLM
+- Answering structured intents from the database with resource links
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.services.concierge_intents import ConciergeIntentRouter
+from src.data_access.booking_dal import BookingDAL
+
+
+NOW = datetime(2025, 11, 12, 10, 0)  # A Wednesday morning
+
+
+@pytest.mark.unit
+class TestIntentParsing:
+    """Test rule-based intent extraction."""
+
+    def test_capacity_and_building(self):
+        """Test 'rooms for 8 people in Luddy Hall' yields all three slots."""
+        intent = ConciergeIntentRouter.parse('rooms for 8 people in Luddy Hall', now=NOW)
+
+        assert intent['resource_type'] == 'room'
+        assert intent['min_capacity'] == 8
+        assert intent['location'] == 'Luddy Hall'
+        assert intent['start_time'] is None
+
+    def test_tomorrow_at_time(self):
+        """Test 'tomorrow at 3pm' becomes a one-hour window on the next day."""
+        intent = ConciergeIntentRouter.parse("what's available tomorrow at 3pm", now=NOW)
+
+        assert intent['start_time'] == datetime(2025, 11, 13, 15, 0)
+        assert intent['end_time'] == datetime(2025, 11, 13, 16, 0)
+
+    def test_time_range_shares_meridiem(self):
+        """Test '2-4pm' is read as 14:00-16:00."""
+        intent = ConciergeIntentRouter.parse('any labs free friday 2-4pm', now=NOW)
+
+        assert intent['resource_type'] == 'lab'
+        assert intent['start_time'] == datetime(2025, 11, 14, 14, 0)
+        assert intent['end_time'] == datetime(2025, 11, 14, 16, 0)
+
+    def test_time_range_crossing_noon(self):
+        """Test '11-1pm' is read as 11:00-13:00, not 23:00 onwards."""
+        intent = ConciergeIntentRouter.parse('book a room tomorrow 11-1pm', now=NOW)
+
+        assert intent['start_time'] == datetime(2025, 11, 13, 11, 0)
+        assert intent['end_time'] == datetime(2025, 11, 13, 13, 0)
+
+    def test_head_count_range_is_not_time(self):
+        """Test 'for 8 to 10 people' is a capacity, not an 8-10 time window."""
+        intent = ConciergeIntentRouter.parse('Any rooms for 8 to 10 people?', now=NOW)
+
+        assert intent['min_capacity'] == 8
+        assert intent['start_time'] is None
+        assert intent['end_time'] is None
+
+    def test_clock_time_is_not_capacity(self):
+        """Test 'for 3pm' is not parsed as a capacity of 3."""
+        intent = ConciergeIntentRouter.parse('find a room for 3pm today', now=NOW)
+
+        assert intent['min_capacity'] is None
+        assert intent['start_time'] == datetime(2025, 11, 12, 15, 0)
+
+    def test_duration_is_not_capacity(self):
+        """Test 'for 2 days' is not parsed as a capacity of 2."""
+        intent = ConciergeIntentRouter.parse('book a laptop for 2 days', now=NOW)
+
+        assert intent['resource_type'] == 'equipment'
+        assert intent['min_capacity'] is None
+
+    def test_building_with_search_cue(self):
+        """Test a building narrows a search once a resource type or search cue is present."""
+        assert ConciergeIntentRouter.parse('anything free in the Wells Library?', now=NOW)['location'] == 'Wells Library'
+        assert ConciergeIntentRouter.parse('labs in Luddy Hall', now=NOW)['resource_type'] == 'lab'
+
+    @pytest.mark.parametrize('question', [
+        'Why do some rooms require approval?',
+        'What are the best places to study?',
+        'Hello there!',
+        'Where is the Wells Library?',
+        'Tell me about the Kelley School',
+    ])
+    def test_open_ended_questions_fall_through(self, question):
+        """Test open-ended questions are left to the LLM."""
+        assert ConciergeIntentRouter.parse(question, now=NOW) is None
+
+
+@pytest.mark.unit
+class TestIntentAnswers:
+    """Test answering intents from the database."""
+
+    def test_answer_filters_by_capacity_and_links_resources(self, db, multiple_resources):
+        """Test only sufficiently large rooms are returned, with markdown links."""
+        response = ConciergeIntentRouter.route('study rooms for 6 people in Luddy Hall', now=NOW)
+
+        assert response is not None
+        assert '[Study Room 2](http://127.0.0.1:5000/resources/' in response
+        assert '[Study Room 3](http://127.0.0.1:5000/resources/' in response
+        assert 'Study Room 1' not in response
+        assert '## 🔗 Quick Links' in response
+
+    def test_answer_excludes_booked_resources(self, db, sample_student, multiple_resources):
+        """Test resources with an overlapping booking are not offered."""
+        start = datetime.now().replace(hour=15, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        BookingDAL.create_booking(
+            user_id=sample_student.id,
+            resource_id=multiple_resources[0].id,
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+            status='confirmed'
+        )
+
+        response = ConciergeIntentRouter.route('rooms available in Luddy Hall tomorrow at 3pm')
+
+        assert 'Study Room 1' not in response
+        assert 'Study Room 2' in response
+
+    def test_no_match_falls_through(self, db, multiple_resources):
+        """Test an intent with no matching resources returns None."""
+        assert ConciergeIntentRouter.route('rooms for 500 people', now=NOW) is None
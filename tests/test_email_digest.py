@@ -0,0 +1,170 @@
+"""
+Unit tests for email digests.
+
+Tests cover:
+- Routing emails to the pending digest for hourly/daily users
+- Digest window cutoffs
+- One combined email per user per closed window, sent once across concurrent runs
+- Admin and profile controls for the delivery mode
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.models.models import EmailOutbox, PendingDigestItem, User
+from src.services.email_service import email_service
+from src.services.email_digest import DigestScheduler
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Queue emails in the outbox so tests can count them."""
+    monkeypatch.setattr(email_service, 'use_outbox', True)
+
+
+def _event(db, user, subject, created_at=None):
+    email_service.send_to_user(user, subject, f'{subject} details')
+    db.session.commit()
+    if created_at:
+        PendingDigestItem.query.filter_by(subject=subject).update({'created_at': created_at})
+        db.session.commit()
+
+
+@pytest.mark.unit
+class TestDigestQueueing:
+    """Test events are held back for digest users."""
+
+    def test_immediate_user_gets_email(self, db, outbox, sample_student):
+        """Test immediate delivery bypasses the digest."""
+        _event(db, sample_student, 'Booking Confirmed')
+
+        assert EmailOutbox.query.count() == 1
+        assert PendingDigestItem.query.count() == 0
+
+    def test_digest_user_gets_pending_item(self, db, outbox, sample_student):
+        """Test hourly/daily users accumulate pending items instead of emails."""
+        sample_student.email_frequency = User.EMAIL_DAILY
+        db.session.commit()
+
+        _event(db, sample_student, 'Booking Confirmed')
+        _event(db, sample_student, 'Booking Cancelled')
+
+        assert EmailOutbox.query.count() == 0
+        assert PendingDigestItem.query.filter_by(user_id=sample_student.id).count() == 2
+
+
+@pytest.mark.unit
+class TestDigestScheduler:
+    """Test digest windows and rendering."""
+
+    def test_window_cutoffs(self):
+        """Test hourly windows close on the hour and daily ones at the configured hour."""
+        scheduler = DigestScheduler()
+        scheduler.daily_hour = 7
+        now = datetime(2025, 11, 12, 6, 30)
+
+        assert scheduler.window_cutoff(User.EMAIL_HOURLY, now) == datetime(2025, 11, 12, 6, 0)
+        assert scheduler.window_cutoff(User.EMAIL_DAILY, now) == datetime(2025, 11, 11, 7, 0)
+        assert scheduler.window_cutoff(User.EMAIL_IMMEDIATE, now) == now
+
+    def test_one_email_per_user_per_closed_window(self, db, outbox, sample_student, sample_admin):
+        """Test closed windows produce a single combined email and clear the queue."""
+        sample_student.email_frequency = User.EMAIL_HOURLY
+        sample_admin.email_frequency = User.EMAIL_HOURLY
+        db.session.commit()
+        now = datetime(2025, 11, 12, 10, 15)
+        for i in range(3):
+            _event(db, sample_student, f'Booking {i}', created_at=datetime(2025, 11, 12, 9, 10 + i))
+        _event(db, sample_admin, 'Current window', created_at=datetime(2025, 11, 12, 10, 5))
+
+        scheduler = DigestScheduler()
+        assert scheduler.run_due(now) == 1
+
+        email = EmailOutbox.query.one()
+        assert email.to_email == sample_student.email
+        assert email.subject == 'Your hourly Campus Resource Hub digest: 3 updates'
+        assert 'Booking 0' in email.body and 'Booking 2 details' in email.body
+        assert [i.subject for i in PendingDigestItem.query.all()] == ['Current window']
+
+        assert scheduler.run_due(now) == 0
+
+    def test_concurrent_run_sends_once(self, db, outbox, monkeypatch, sample_student):
+        """Test a digest claimed by another run between read and send is skipped."""
+        from src.services.email_digest import email_renderer
+        sample_student.email_frequency = User.EMAIL_HOURLY
+        db.session.commit()
+        _event(db, sample_student, 'Booking Confirmed', created_at=datetime(2025, 11, 12, 9, 0))
+        render = email_renderer.render
+
+        def render_while_another_run_claims(name, **context):
+            email = render(name, **context)
+            PendingDigestItem.query.delete()  # The other worker's run commits first
+            db.session.commit()
+            return email
+
+        monkeypatch.setattr(email_renderer, 'render', render_while_another_run_claims)
+
+        assert DigestScheduler().run_due(datetime(2025, 11, 12, 10, 15)) == 0
+        assert EmailOutbox.query.count() == 0
+
+    def test_render_failure_skips_only_that_digest(self, db, outbox, monkeypatch, sample_student, sample_admin):
+        """Test one digest failing to render doesn't hold back the others."""
+        from src.services.email_digest import email_renderer
+        for user in (sample_student, sample_admin):
+            user.email_frequency = User.EMAIL_HOURLY
+            _event(db, user, f'Update for {user.username}', created_at=datetime(2025, 11, 12, 9, 0))
+        render = email_renderer.render
+
+        def render_failing_for_student(name, user, **context):
+            if user.id == sample_student.id:
+                raise ValueError('Bad template data')
+            return render(name, user=user, **context)
+
+        monkeypatch.setattr(email_renderer, 'render', render_failing_for_student)
+
+        assert DigestScheduler().run_due(datetime(2025, 11, 12, 10, 15)) == 1
+        assert EmailOutbox.query.one().to_email == sample_admin.email
+        assert PendingDigestItem.query.one().user_id == sample_student.id
+
+    def test_switching_back_to_immediate_flushes_leftovers(self, db, outbox, sample_student):
+        """Test items left after switching to immediate delivery are sent on the next run."""
+        sample_student.email_frequency = User.EMAIL_DAILY
+        db.session.commit()
+        _event(db, sample_student, 'Booking Confirmed')
+        sample_student.email_frequency = User.EMAIL_IMMEDIATE
+        db.session.commit()
+
+        assert DigestScheduler().run_due(datetime.utcnow() + timedelta(seconds=1)) == 1
+        assert PendingDigestItem.query.count() == 0
+
+
+@pytest.mark.unit
+class TestDigestSettings:
+    """Test choosing the delivery mode."""
+
+    def test_admin_sets_email_frequency(self, db, admin_client, sample_student):
+        """Test admins can switch a user to daily digests."""
+        response = admin_client.put(f'/admin/users/{sample_student.id}/email-frequency',
+                                    json={'email_frequency': 'daily'})
+
+        assert response.status_code == 200
+        assert db.session.get(User, sample_student.id).email_frequency == User.EMAIL_DAILY
+
+    def test_invalid_frequency_rejected(self, db, admin_client, sample_student):
+        """Test unknown delivery modes are rejected."""
+        response = admin_client.put(f'/admin/users/{sample_student.id}/email-frequency',
+                                    json={'email_frequency': 'weekly'})
+
+        assert response.status_code == 400
+
+    def test_student_cannot_set_others(self, db, authenticated_client, sample_admin):
+        """Test non-admins cannot change another user's delivery mode."""
+        response = authenticated_client.put(f'/admin/users/{sample_admin.id}/email-frequency',
+                                            json={'email_frequency': 'daily'})
+
+        assert response.status_code == 403
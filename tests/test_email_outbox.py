@@ -0,0 +1,123 @@
+"""
+Unit tests for the transactional email outbox.
+
+Tests cover:
+- Emails queued in the same transaction as the booking change
+- Worker delivery, retry with exponential backoff and dead-lettering
+- Reclaiming rows held by a crashed worker
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.models.models import EmailOutbox
+from src.services.email_service import email_service
+from src.services.email_outbox import EmailOutboxWorker
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Route email_service through the outbox and record deliveries."""
+    sent = []
+    monkeypatch.setattr(email_service, 'use_outbox', True)
+    monkeypatch.setattr(email_service, 'deliver',
+                        lambda to_email, subject, body, to_name=None, html_body=None:
+                        sent.append((to_email, subject)) or True)
+    return sent
+
+
+def _future_slot(days=1, hour=10):
+    start = (datetime.now() + timedelta(days=days)).replace(hour=hour, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(hours=1)
+
+
+@pytest.mark.unit
+class TestOutboxEnqueue:
+    """Test emails are written with the booking transaction."""
+
+    def test_booking_request_queues_email_without_sending(self, db, outbox, authenticated_client,
+                                                          sample_resource):
+        """Test the request commits an outbox row and returns before delivery."""
+        start, end = _future_slot()
+        response = authenticated_client.post('/bookings/', json={
+            'resource_id': sample_resource.id,
+            'start_datetime': start.isoformat(),
+            'end_datetime': end.isoformat()
+        })
+
+        assert response.status_code == 201
+        assert outbox == []
+        entry = EmailOutbox.query.one()
+        assert entry.status == EmailOutbox.STATUS_PENDING
+        assert entry.to_email == 'student1@iu.edu'
+
+    def test_rollback_discards_queued_email(self, db, outbox):
+        """Test an email staged in a rolled-back transaction is never sent."""
+        email_service.send_email('someone@iu.edu', 'Subject', 'Body')
+        db.session.rollback()
+
+        assert EmailOutbox.query.count() == 0
+
+
+@pytest.mark.unit
+class TestOutboxWorker:
+    """Test draining the outbox."""
+
+    @pytest.fixture
+    def worker(self):
+        worker = EmailOutboxWorker()
+        worker.max_attempts = 3
+        worker.backoff_base = 10
+        return worker
+
+    def _queue(self, db):
+        entry = email_service.queue_email('someone@iu.edu', 'Subject', 'Body')
+        db.session.commit()
+        return entry
+
+    def test_delivers_due_rows(self, db, outbox, worker):
+        """Test due rows are sent once and marked sent."""
+        entry = self._queue(db)
+
+        assert worker.process_due() == 1
+        assert worker.process_due() == 0
+        assert outbox == [('someone@iu.edu', 'Subject')]
+        assert db.session.get(EmailOutbox, entry.id).status == EmailOutbox.STATUS_SENT
+
+    def test_failure_backs_off_then_dead_letters(self, db, outbox, worker, monkeypatch):
+        """Test failures retry with doubling delays and end in the dead-letter state."""
+        def fail(*args, **kwargs):
+            raise ConnectionError('SMTP down')
+        monkeypatch.setattr(email_service, 'deliver', fail)
+        entry = self._queue(db)
+
+        delays = []
+        for _ in range(3):
+            before = datetime.utcnow()
+            worker.process_due(now=datetime.utcnow() + timedelta(days=1))
+            db.session.refresh(entry)
+            if entry.status == EmailOutbox.STATUS_PENDING:
+                delays.append(round((entry.next_attempt_at - before).total_seconds()))
+
+        assert delays == [10, 20]
+        assert entry.status == EmailOutbox.STATUS_DEAD
+        assert entry.attempts == 3
+        assert 'SMTP down' in entry.last_error
+
+        assert worker.retry_dead() == 1
+        db.session.refresh(entry)
+        assert entry.status == EmailOutbox.STATUS_PENDING
+
+    def test_expired_claim_is_reclaimed(self, db, outbox, worker):
+        """Test rows left in 'sending' by a crashed worker are picked up again."""
+        entry = self._queue(db)
+        assert worker.claim_due() == [entry.id]
+
+        assert worker.claim_due() == []
+        later = datetime.utcnow() + timedelta(seconds=worker.lease_seconds + 1)
+        assert worker.process_due(now=later) == 1
@@ -0,0 +1,79 @@
+"""
+Unit tests for Jinja email templates.
+
+Tests cover:
+- Subject, plain-text and HTML rendering of booking emails
+- HTML escaping of user-provided content
+- Batch rendering and the on-disk bytecode cache
+"""
+
+import pytest
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.models.models import EmailOutbox
+from src.services.email_service import email_service
+from src.services.email_templates import EmailRenderer
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    return EmailRenderer(cache_dir=str(tmp_path))
+
+
+@pytest.mark.unit
+class TestEmailTemplates:
+    """Test email template rendering."""
+
+    def test_confirmation_has_subject_text_and_html(self, db, renderer, sample_booking, sample_student):
+        """Test both variants share the booking details."""
+        email = renderer.render('booking_confirmation', booking=sample_booking, user=sample_student)
+
+        assert email.subject == f'Booking Confirmed: {sample_booking.resource.name}'
+        assert email.text.startswith(f'Hi {sample_student.full_name},')
+        assert f'Booking ID: {sample_booking.id}' in email.text
+        assert f'/bookings/{sample_booking.id}/view' in email.html
+        assert '<html' in email.html
+
+    def test_html_escapes_user_content(self, db, renderer, sample_booking, sample_student):
+        """Test notes are escaped in HTML but kept verbatim in text."""
+        sample_booking.notes = '<script>alert(1)</script>'
+
+        email = renderer.render('booking_created', booking=sample_booking, user=sample_student)
+
+        assert 'Notes: <script>alert(1)</script>' in email.text
+        assert '<script>' not in email.html
+        assert '&lt;script&gt;' in email.html
+
+    def test_modified_lists_changes(self, db, renderer, sample_booking, sample_student, sample_admin):
+        """Test the modification email lists every change."""
+        email = renderer.render('booking_modified', booking=sample_booking, user=sample_student,
+                                modified_by=sample_admin, changes=['Start time moved', 'Notes updated'])
+
+        assert '  • Start time moved\n  • Notes updated' in email.text
+        assert '<li>Notes updated</li>' in email.html
+
+    def test_render_many_and_bytecode_cache(self, db, renderer, sample_booking, sample_student, tmp_path):
+        """Test batch rendering returns one email per context and caches compiled templates."""
+        emails = renderer.render_many('booking_reminder', [
+            {'booking': sample_booking, 'user': sample_student, 'hours_before': hours}
+            for hours in (1, 24)
+        ])
+
+        assert [e.subject for e in emails] == [f'Reminder: Upcoming Booking for {sample_booking.resource.name}'] * 2
+        assert 'in 1 hours' in emails[0].text and 'in 24 hours' in emails[1].text
+        assert any(name.endswith('.cache') for name in os.listdir(tmp_path))
+
+    def test_confirmation_is_queued_with_html(self, db, sample_booking, monkeypatch):
+        """Test a rendered confirmation is queued with its HTML part."""
+        monkeypatch.setattr(email_service, 'use_outbox', True)
+
+        assert email_service.send_booking_confirmation(sample_booking, sample_booking.user)
+        db.session.commit()
+
+        entry = EmailOutbox.query.one()
+        assert entry.html_body is not None
+        assert entry.subject.startswith('Booking Confirmed')
@@ -0,0 +1,362 @@
+"""
+Unit tests for messaging.
+
+Tests cover:
+- The conversations read model maintained on send, read and delete
+- The inbox listing served from conversations
+- Sending a message when its notification fails
+- Thread and conversation lookup through the indexed conversation_key
+- Keyset-paginated thread windows (latest page, older pages, newer-since)
+- Full-text message search (ranking, snippets, index maintenance, cursors)
+- Live message and read-receipt events on the /api/notifications/stream endpoint
+"""
+
+import pytest
+from datetime import datetime
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.data_access.conversation_dal import ConversationDAL
+from src.data_access.message_dal import MessageDAL
+from src.models.models import Conversation, Message
+from src.services.event_broker import event_broker
+
+
+def _conversation(user_a, user_b):
+    low, high = Conversation.pair(user_a.id, user_b.id)
+    return Conversation.query.filter_by(user_low_id=low, user_high_id=high).one()
+
+
+@pytest.mark.unit
+class TestConversations:
+    """Test the conversations read model."""
+
+    def test_send_updates_summary(self, db, sample_student, sample_admin):
+        """Test one row per pair tracks latest message, preview and recipient unread count."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Re: Hi', 'Three')
+
+        conversation = _conversation(sample_student, sample_admin)
+        assert Conversation.query.count() == 1
+        assert conversation.last_message_id == reply.id
+        assert conversation.preview == 'Three'
+        assert conversation.thread_id == first.id
+        assert conversation.unread_for(sample_admin.id) == 2
+        assert conversation.unread_for(sample_student.id) == 1
+
+    def test_mark_read_paths_update_unread(self, db, sample_student, sample_admin):
+        """Test single, thread and conversation mark-read keep unread counts exact."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Three')
+
+        MessageDAL.mark_as_read(first.id)
+        assert _conversation(sample_student, sample_admin).unread_for(sample_admin.id) == 2
+
+        MessageDAL.mark_thread_as_read(first.id)
+        assert _conversation(sample_student, sample_admin).unread_for(sample_admin.id) == 0
+
+        MessageDAL.mark_as_unread(first.id)
+        assert _conversation(sample_student, sample_admin).unread_for(sample_admin.id) == 1
+
+        MessageDAL.mark_conversation_as_read(sample_admin.id, sample_student.id)
+        assert _conversation(sample_student, sample_admin).unread_for(sample_admin.id) == 0
+
+    def test_delete_refreshes_summary(self, db, sample_student, sample_admin):
+        """Test deleting the latest message falls back to the previous one, and the last removes the row."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        second = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+
+        MessageDAL.delete_message(second.id)
+        conversation = _conversation(sample_student, sample_admin)
+        assert conversation.preview == 'One'
+        assert conversation.unread_for(sample_admin.id) == 1
+
+        MessageDAL.delete_message(first.id)
+        assert Conversation.query.count() == 0
+
+    def test_rebuild_matches_live_model(self, db, sample_student, sample_admin, sample_staff):
+        """Test the backfill reproduces the incrementally maintained rows."""
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        MessageDAL.send_message(sample_staff.id, sample_student.id, 'Hello', 'Two')
+        live = {(c.user_low_id, c.user_high_id, c.preview, c.unread_low, c.unread_high)
+                for c in Conversation.query.all()}
+
+        Conversation.query.delete()
+        assert ConversationDAL.rebuild_all() == 2
+        db.session.commit()
+
+        assert {(c.user_low_id, c.user_high_id, c.preview, c.unread_low, c.unread_high)
+                for c in Conversation.query.all()} == live
+
+    def test_inbox_lists_conversations(self, db, authenticated_client, sample_student, sample_admin, sample_staff):
+        """Test the inbox JSON comes from the read model, most recent first."""
+        MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', 'Older')
+        MessageDAL.send_message(sample_staff.id, sample_student.id, 'Hi', 'Newer')
+        MessageDAL.send_message(sample_staff.id, sample_student.id, 'Hi', 'Newest')
+
+        data = authenticated_client.get('/messages/?json=1').get_json()
+
+        assert [c['other_user']['id'] for c in data['conversations']] == [sample_staff.id, sample_admin.id]
+        assert data['conversations'][0]['last_message'] == 'Newest'
+        assert data['conversations'][0]['unread_count'] == 2
+        assert data['conversations'][0]['is_read'] is False
+
+    def test_failed_notification_keeps_message(self, db, authenticated_client, monkeypatch,
+                                               sample_student, sample_admin):
+        """Test a failing new-message notification is dropped while the message is still sent."""
+        from sqlalchemy.exc import OperationalError
+        from src.models.models import Notification
+        from src.services import notification_service
+
+        def fail(session, mapping):
+            raise OperationalError('INSERT INTO notifications', {}, Exception('disk I/O error'))
+
+        monkeypatch.setattr(notification_service, '_upsert_coalesced', fail)
+
+        response = authenticated_client.post('/messages/', json={'recipient_id': sample_admin.id, 'body': 'Hello'})
+
+        assert response.status_code == 201
+        db.session.expire_all()
+        assert Message.query.filter_by(recipient_id=sample_admin.id).count() == 1
+        assert Notification.query.count() == 0
+
+
+@pytest.mark.unit
+class TestConversationKey:
+    """Test lookups through the canonical conversation_key."""
+
+    def test_key_is_direction_independent(self, db, sample_student, sample_admin):
+        """Test both directions of a conversation share one key and one thread."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Re: Hi', 'Two')
+
+        low, high = sorted([sample_student.id, sample_admin.id])
+        assert first.conversation_key == reply.conversation_key == f"{low}-{high}"
+        assert reply.thread_id == first.id
+
+    def test_conversation_between_users(self, db, sample_student, sample_admin, sample_staff):
+        """Test the conversation holds both directions in order and nothing else."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Re: Hi', 'Two')
+        MessageDAL.send_message(sample_staff.id, sample_student.id, 'Hello', 'Other')
+
+        messages = MessageDAL.get_conversation_between_users(sample_admin.id, sample_student.id)
+
+        assert [m.id for m in messages] == [first.id, reply.id]
+
+    def test_backfill_fills_missing_keys(self, db, sample_student, sample_admin):
+        """Test the backfill computes the same key as new writes."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Re: Hi', 'Two')
+        expected = first.conversation_key
+        Message.query.update({Message.conversation_key: None})
+        db.session.commit()
+
+        assert MessageDAL.backfill_conversation_keys(batch_size=1) == 2
+
+        assert {m.conversation_key for m in Message.query.all()} == {expected}
+        assert MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Three').thread_id == first.id
+
+
+@pytest.mark.unit
+class TestThreadWindow:
+    """Test keyset pagination of thread views."""
+
+    def _send_many(self, sender, recipient, count):
+        return [MessageDAL.send_message(sender.id, recipient.id, 'Hi', f'Message {i}') for i in range(count)]
+
+    def test_window_pages_by_keyset(self, db, sample_student, sample_admin):
+        """Test the latest page comes first, then older pages, then newer-since."""
+        sent = self._send_many(sample_student, sample_admin, 5)
+
+        latest, has_more = MessageDAL.get_conversation_window(sample_admin.id, sample_student.id, limit=2)
+        assert [m.id for m in latest] == [sent[3].id, sent[4].id]
+        assert has_more is True
+
+        older, has_more = MessageDAL.get_conversation_window(
+            sample_admin.id, sample_student.id, limit=2, before=(latest[0].created_at, latest[0].id))
+        assert [m.id for m in older] == [sent[1].id, sent[2].id]
+        oldest, has_more = MessageDAL.get_conversation_window(
+            sample_admin.id, sample_student.id, limit=2, before=(older[0].created_at, older[0].id))
+        assert [m.id for m in oldest] == [sent[0].id]
+        assert has_more is False
+
+        newer, has_more = MessageDAL.get_conversation_window(
+            sample_admin.id, sample_student.id, limit=10, since=(sent[2].created_at, sent[2].id))
+        assert [m.id for m in newer] == [sent[3].id, sent[4].id]
+        assert has_more is False
+
+    def test_window_breaks_timestamp_ties_by_id(self, db, sample_student, sample_admin):
+        """Test messages sharing a created_at are neither skipped nor repeated across pages."""
+        sent = self._send_many(sample_student, sample_admin, 3)
+        for message in sent:
+            message.created_at = datetime(2025, 11, 12, 9, 0)
+        db.session.commit()
+
+        latest, _ = MessageDAL.get_conversation_window(sample_student.id, sample_admin.id, limit=2)
+        older, has_more = MessageDAL.get_conversation_window(
+            sample_student.id, sample_admin.id, limit=2, before=(latest[0].created_at, latest[0].id))
+
+        assert [m.id for m in older + latest] == [m.id for m in sent]
+        assert has_more is False
+
+    def test_thread_json_cursors(self, app, db, authenticated_client, sample_student, sample_admin):
+        """Test the JSON API returns the latest page and follows older and since cursors."""
+        app.config['MESSAGE_THREAD_PAGE_SIZE'] = 2
+        sent = self._send_many(sample_admin, sample_student, 3)
+        url = f'/messages/thread/{sent[0].id}?json=1'
+
+        data = authenticated_client.get(url).get_json()
+        assert [m['id'] for m in data['messages']] == [sent[1].id, sent[2].id]
+        assert data['has_more'] is True
+        assert MessageDAL.get_unread_count(sample_student.id) == 0
+
+        older = authenticated_client.get(f"{url}&before={data['older_cursor']}").get_json()
+        assert [m['id'] for m in older['messages']] == [sent[0].id]
+        assert older['older_cursor'] is None
+
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', 'Newest')
+        newer = authenticated_client.get(f"{url}&since={data['latest_cursor']}").get_json()
+        assert [m['id'] for m in newer['messages']] == [reply.id]
+        assert authenticated_client.get(f"{url}&since={newer['latest_cursor']}").get_json()['messages'] == []
+
+        assert authenticated_client.get(f'{url}&before=garbage').status_code == 400
+
+    def test_thread_page_renders_window(self, app, db, authenticated_client, sample_student, sample_admin):
+        """Test the HTML view renders only the latest page and offers older messages."""
+        app.config['MESSAGE_THREAD_PAGE_SIZE'] = 2
+        sent = self._send_many(sample_admin, sample_student, 3)
+
+        html = authenticated_client.get(f'/messages/thread/{sent[0].id}').get_data(as_text=True)
+
+        assert 'Message 2' in html and 'Message 1' in html
+        assert 'Message 0' not in html
+        assert 'id="loadOlder" hidden' not in html
+
+    def test_thread_forbidden_for_non_participant(self, db, authenticated_client, sample_admin, sample_staff):
+        """Test users outside the conversation cannot read it."""
+        message = MessageDAL.send_message(sample_admin.id, sample_staff.id, 'Hi', 'Private')
+
+        assert authenticated_client.get(f'/messages/thread/{message.id}?json=1').status_code == 403
+
+
+@pytest.mark.unit
+class TestMessageSearch:
+    """Test FTS5-backed message search."""
+
+    def test_ranked_results_for_participants_only(self, db, sample_student, sample_admin, sample_staff):
+        """Test matches are ranked, prefix-matched and limited to the user's messages."""
+        once = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'The projector is booked')
+        often = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Projector', 'projector projector')
+        MessageDAL.send_message(sample_admin.id, sample_staff.id, 'Projector', 'Not for the student')
+
+        rows, has_more = MessageDAL.search_messages(sample_student.id, 'proj')
+
+        assert [message.id for message, _, _ in rows] == [often.id, once.id]
+        assert has_more is False
+        assert MessageDAL.search_messages(sample_student.id, '  "*) ') == ([], False)
+
+    def test_index_follows_update_and_delete(self, db, sample_student, sample_admin):
+        """Test edits and deletes are reflected by the triggers."""
+        message = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Need a whiteboard')
+
+        MessageDAL.update_message(message.id, body='Need a microphone')
+        assert MessageDAL.search_messages(sample_student.id, 'whiteboard')[0] == []
+        assert len(MessageDAL.search_messages(sample_student.id, 'microphone')[0]) == 1
+
+        MessageDAL.delete_message(message.id)
+        assert MessageDAL.search_messages(sample_student.id, 'microphone')[0] == []
+
+    def test_search_endpoint_snippets_and_cursor(self, db, authenticated_client, sample_student, sample_admin):
+        """Test snippets are escaped and highlighted, and the cursor pages without repeats."""
+        MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', '<b>Room</b> 101 is free')
+        for i in range(2):
+            MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', f'Room update {i}')
+
+        data = authenticated_client.get('/messages/search?q=room&limit=2').get_json()
+        assert data['count'] == 2
+        assert data['has_more'] is True
+
+        rest = authenticated_client.get(f"/messages/search?q=room&limit=2&cursor={data['next_cursor']}").get_json()
+        assert rest['has_more'] is False
+        results = data['results'] + rest['results']
+        assert len({r['id'] for r in results}) == 3
+
+        snippet = next(r['snippet'] for r in results if '101' in r['snippet'])
+        assert snippet == '&lt;b&gt;<mark>Room</mark>&lt;/b&gt; 101 is free'
+        assert authenticated_client.get('/messages/search?q=room&cursor=bad').status_code == 400
+
+
+@pytest.mark.unit
+class TestMessageStream:
+    """Test message events published for live inbox and thread views."""
+
+    def test_send_publishes_to_both_participants_on_commit(self, db, sample_student, sample_admin):
+        """Test a message event reaches sender and recipient only once committed."""
+        recipient = event_broker.subscribe(sample_admin.id)
+        sender = event_broker.subscribe(sample_student.id)
+        try:
+            message = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Hello', commit=False)
+            assert recipient.empty()
+
+            db.session.commit()
+
+            for subscriber in (recipient, sender):
+                event = subscriber.get_nowait()
+                assert event['type'] == 'message'
+                assert event['data']['id'] == message.id
+        finally:
+            event_broker.unsubscribe(sample_admin.id, recipient)
+            event_broker.unsubscribe(sample_student.id, sender)
+
+    def test_rollback_publishes_nothing(self, db, sample_student, sample_admin):
+        """Test a rolled back send never reaches the stream."""
+        subscriber = event_broker.subscribe(sample_admin.id)
+        try:
+            MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Hello', commit=False)
+            db.session.rollback()
+            db.session.commit()
+
+            assert subscriber.empty()
+        finally:
+            event_broker.unsubscribe(sample_admin.id, subscriber)
+
+    def test_read_receipts(self, db, sample_student, sample_admin):
+        """Test reading one message or a whole conversation tells the sender."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+        subscriber = event_broker.subscribe(sample_student.id)
+        try:
+            MessageDAL.mark_as_read(first.id)
+            MessageDAL.mark_conversation_as_read(sample_admin.id, sample_student.id)
+            MessageDAL.mark_conversation_as_read(sample_admin.id, sample_student.id)  # Nothing left
+
+            receipts = [subscriber.get_nowait()['data'] for _ in range(2)]
+            assert subscriber.empty()
+            assert [r['message_id'] for r in receipts] == [first.id, None]
+            assert all(r['reader_id'] == sample_admin.id for r in receipts)
+        finally:
+            event_broker.unsubscribe(sample_student.id, subscriber)
+
+    def test_stream_endpoint_replays_events(self, app, db, authenticated_client, sample_student, sample_admin):
+        """Test the tab's single live stream replays message events missed since Last-Event-ID."""
+        from src.controllers import messages
+        if 'api' not in app.blueprints:
+            app.register_blueprint(messages.api_bp)
+        app.config['NOTIFICATION_STREAM_HEARTBEAT'] = 0.05
+        app.config['NOTIFICATION_STREAM_MAX_AGE'] = 0.2
+        last = event_broker.publish(sample_student.id, 'read', {'reader_id': sample_admin.id})
+        MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', 'Live')
+
+        response = authenticated_client.get('/api/notifications/stream', headers={'Last-Event-ID': str(last['id'])})
+        body = response.get_data(as_text=True)
+
+        assert response.mimetype == 'text/event-stream'
+        assert 'event: message' in body
+        assert '"body": "Live"' in body
+        assert 'event: read' not in body
@@ -0,0 +1,86 @@
+"""
+Unit tests for notification retention.
+
+Tests cover:
+- Archiving expired read notifications and keeping unread/recent ones
+- Collapsing bursts of similar notifications into one summary row
+- Delete mode and bounded batches
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.models.models import Notification, NotificationArchive
+from src.services.notification_retention import NotificationRetention, MODE_DELETE
+
+NOW = datetime(2025, 11, 12, 12, 0)
+
+
+def _notification(db, user, created_at, is_read=True, notification_type=Notification.TYPE_BOOKING_CONFIRMED,
+                  title='Booking confirmed', sender=None):
+    notification = Notification(user_id=user.id, notification_type=notification_type, title=title,
+                                description=title, is_read=is_read, created_at=created_at,
+                                read_at=created_at + timedelta(hours=1) if is_read else None,
+                                sender_id=sender.id if sender else None)
+    db.session.add(notification)
+    db.session.commit()
+    return notification
+
+
+@pytest.mark.unit
+class TestNotificationRetention:
+    """Test moving notifications out of the hot table."""
+
+    def test_archives_only_expired_read_notifications(self, db, sample_student):
+        """Test unread and recent notifications stay in the hot table."""
+        old_id = _notification(db, sample_student, NOW - timedelta(days=40)).id
+        kept_ids = {_notification(db, sample_student, NOW - timedelta(days=40), is_read=False).id,
+                    _notification(db, sample_student, NOW - timedelta(days=5)).id}
+
+        assert NotificationRetention().run_due(NOW) == 1
+
+        assert {n.id for n in Notification.query.all()} == kept_ids
+        archived = NotificationArchive.query.one()
+        assert archived.id == old_id
+        assert archived.collapsed_count == 1
+        assert archived.title == 'Booking confirmed'
+
+    def test_message_burst_collapses_to_summary(self, db, sample_student, sample_admin):
+        """Test many 'new message from X' notifications become one archive row."""
+        day = NOW - timedelta(days=40)
+        for minute in range(5):
+            _notification(db, sample_student, day + timedelta(minutes=minute),
+                          notification_type=Notification.TYPE_NEW_MESSAGE,
+                          title=f'New message from {sample_admin.full_name}', sender=sample_admin)
+        _notification(db, sample_student, day - timedelta(days=1),
+                      notification_type=Notification.TYPE_NEW_MESSAGE,
+                      title=f'New message from {sample_admin.full_name}', sender=sample_admin)
+
+        assert NotificationRetention().run_due(NOW) == 6
+
+        rows = NotificationArchive.query.order_by(NotificationArchive.created_at).all()
+        assert [r.collapsed_count for r in rows] == [1, 5]
+        assert rows[1].title == f'5 new messages from {sample_admin.full_name}'
+        assert rows[1].first_created_at == day
+        assert Notification.query.count() == 0
+
+    def test_delete_mode_and_batches(self, db, sample_student):
+        """Test delete mode skips the archive and runs in bounded batches."""
+        for day in range(5):
+            _notification(db, sample_student, NOW - timedelta(days=40 + day))
+        retention = NotificationRetention()
+        retention.mode = MODE_DELETE
+        retention.batch_size = 2
+        retention.max_batches = 2
+
+        assert retention.run_due(NOW) == 4
+        assert Notification.query.count() == 1
+        assert NotificationArchive.query.count() == 0
+
+        assert retention.run_due(NOW) == 1
+        assert Notification.query.count() == 0
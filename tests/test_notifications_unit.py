@@ -0,0 +1,553 @@
+"""
+Unit tests for notification delivery.
+
+Tests cover:
+- In-process event broker fan-out, replay, backpressure and replay eviction
+- NotificationService publishing to live streams
+- The Server-Sent Events notification stream endpoint
+- Incremental notification polling with since-cursor, limit and ETag/304
+- Cached per-user unread counters for notifications and messages
+- Set-based bulk mark-read for notifications and message threads
+- Batched notification fan-out written in the caller's commit
+- Write-time coalescing of new-message notifications
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.services.event_broker import Broker, EventBroker, event_broker, format_sse
+from src.services.notification_service import NotificationService
+from src.services.unread_counters import UnreadCounters
+from src.data_access.message_dal import MessageDAL
+from src.models.models import Notification
+
+
+@pytest.fixture
+def api_client(app, client):
+    """Provide a test client with the /api blueprint registered."""
+    from src.controllers import messages
+    if 'api' not in app.blueprints:
+        app.register_blueprint(messages.api_bp)
+    return client
+
+
+@pytest.mark.unit
+class TestEventBroker:
+    """Test the in-process pub/sub broker."""
+
+    def test_publish_reaches_only_that_users_subscribers(self):
+        """Test events are delivered per user."""
+        broker = EventBroker()
+        alice = broker.subscribe(1)
+        bob = broker.subscribe(2)
+
+        broker.publish(1, 'notification', {'title': 'Hi'})
+
+        assert alice.get_nowait()['data'] == {'title': 'Hi'}
+        assert bob.empty()
+
+    def test_broker_interface_is_abstract(self):
+        """Test Broker cannot be used without implementing the fan-out methods."""
+        with pytest.raises(TypeError):
+            Broker()
+
+    def test_reconnect_replays_events_after_last_event_id(self):
+        """Test a reconnecting client receives events it missed."""
+        broker = EventBroker()
+        first = broker.publish(1, 'notification', {'n': 1})
+        broker.publish(1, 'notification', {'n': 2})
+
+        subscriber = broker.subscribe(1, last_event_id=first['id'])
+
+        assert subscriber.get_nowait()['data'] == {'n': 2}
+        assert subscriber.empty()
+
+    def test_slow_subscriber_drops_oldest(self):
+        """Test a full queue keeps the newest events instead of blocking publishers."""
+        broker = EventBroker(queue_size=2)
+        subscriber = broker.subscribe(1)
+
+        for n in range(3):
+            broker.publish(1, 'notification', {'n': n})
+
+        assert [subscriber.get_nowait()['data']['n'] for _ in range(2)] == [1, 2]
+
+    def test_unsubscribe(self):
+        """Test unsubscribed queues stop receiving events."""
+        broker = EventBroker()
+        subscriber = broker.subscribe(1)
+        broker.unsubscribe(1, subscriber)
+
+        broker.publish(1, 'notification', {})
+
+        assert subscriber.empty()
+        assert broker.subscriber_count() == 0
+
+    def test_idle_replay_buffers_expire(self):
+        """Test replay buffers of users without a stream are evicted after the TTL."""
+        broker = EventBroker(replay_ttl=0)
+        subscriber = broker.subscribe(1)
+        broker.publish(1, 'notification', {})
+        broker.publish(2, 'notification', {})
+        broker.publish(3, 'notification', {})
+
+        assert broker.replay_user_count() == 2  # Subscribed user 1 and the newest, user 3
+
+        broker.unsubscribe(1, subscriber)
+        broker.publish(4, 'notification', {})
+        assert broker.replay_user_count() == 1
+
+    def test_replay_buffers_are_bounded(self):
+        """Test only the most recently used replay buffers are kept."""
+        broker = EventBroker(max_replay_users=2)
+        for user_id in (1, 2, 3):
+            broker.publish(user_id, 'notification', {'n': user_id})
+
+        assert broker.replay_user_count() == 2
+        assert broker.subscribe(1, last_event_id=0).empty()
+        assert broker.subscribe(3, last_event_id=0).get_nowait()['data'] == {'n': 3}
+
+    def test_format_sse(self):
+        """Test SSE wire format."""
+        chunk = format_sse({'id': 7, 'type': 'notification', 'data': {'a': 1}})
+        assert chunk == 'id: 7\nevent: notification\ndata: {"a": 1}\n\n'
+
+
+@pytest.mark.unit
+class TestNotificationStream:
+    """Test notification publishing and the SSE endpoint."""
+
+    def test_create_notification_publishes(self, db, sample_student):
+        """Test creating a notification pushes it to the user's stream."""
+        subscriber = event_broker.subscribe(sample_student.id)
+        try:
+            notification = NotificationService.create_notification(
+                user_id=sample_student.id,
+                notification_type=Notification.TYPE_BOOKING_CONFIRMED,
+                title='Booking confirmed',
+                description='Your booking is confirmed.'
+            )
+
+            event = subscriber.get_nowait()
+            assert event['type'] == 'notification'
+            assert event['data']['id'] == notification.id
+        finally:
+            event_broker.unsubscribe(sample_student.id, subscriber)
+
+    def test_stream_endpoint_replays_and_heartbeats(self, app, api_client, sample_student):
+        """Test the stream sends retry hint, missed events and heartbeats."""
+        app.config['NOTIFICATION_STREAM_HEARTBEAT'] = 0.05
+        app.config['NOTIFICATION_STREAM_MAX_AGE'] = 0.2
+        with api_client.session_transaction() as sess:
+            sess['_user_id'] = str(sample_student.id)
+        event = event_broker.publish(sample_student.id, 'notification', {'title': 'Missed'})
+
+        response = api_client.get('/api/notifications/stream',
+                                  headers={'Last-Event-ID': str(event['id'] - 1)})
+        body = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert body.startswith('retry: ')
+        assert '"title": "Missed"' in body
+        assert ': heartbeat' in body
+
+
+def _notify(user_id, title='Notice'):
+    return NotificationService.create_notification(
+        user_id=user_id,
+        notification_type=Notification.TYPE_BOOKING_CONFIRMED,
+        title=title,
+        description='Details'
+    )
+
+
+@pytest.mark.unit
+class TestIncrementalNotifications:
+    """Test the incremental /api/notifications endpoint."""
+
+    @pytest.fixture
+    def student_api(self, api_client, sample_student):
+        with api_client.session_transaction() as sess:
+            sess['_user_id'] = str(sample_student.id)
+        return api_client
+
+    def test_full_fetch_reports_cursor_and_unread_count(self, db, student_api, sample_student):
+        """Test a full fetch returns notifications, unread count and cursor."""
+        _notify(sample_student.id, 'First')
+        _notify(sample_student.id, 'Second')
+
+        data = student_api.get('/api/notifications').get_json()
+
+        assert data['count'] == 2
+        assert data['unread_count'] == 2
+        assert data['has_more'] is False
+        assert data['cursor'] is not None
+
+    def test_limit_bounds_results(self, db, student_api, sample_student):
+        """Test limit caps the page and flags has_more."""
+        for i in range(3):
+            _notify(sample_student.id, f'N{i}')
+
+        data = student_api.get('/api/notifications?limit=2').get_json()
+
+        assert data['count'] == 2
+        assert data['has_more'] is True
+        assert data['unread_count'] == 3
+
+    def test_since_returns_only_new_or_read(self, db, student_api, sample_student):
+        """Test since returns notifications created or read after the cursor."""
+        old = _notify(sample_student.id, 'Old')
+        old.created_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        cursor = student_api.get('/api/notifications').get_json()['cursor']
+
+        fresh = _notify(sample_student.id, 'Fresh')
+        data = student_api.get(f'/api/notifications?since={cursor}').get_json()
+        assert [n['id'] for n in data['notifications']] == [fresh.id]
+
+        old.mark_as_read()
+        db.session.commit()
+        data = student_api.get(f"/api/notifications?since={data['cursor']}").get_json()
+        assert [n['id'] for n in data['notifications']] == [old.id]
+
+    def test_cursor_pages_through_equal_timestamps(self, db, student_api, sample_student):
+        """Test changes sharing a timestamp at a page boundary are all returned, once."""
+        stamp = datetime.utcnow() - timedelta(minutes=5)
+        notifications = [_notify(sample_student.id, f'N{i}') for i in range(3)]
+        for notification in notifications:
+            notification.created_at = stamp
+        db.session.commit()
+
+        since = (stamp - timedelta(seconds=1)).isoformat()
+        data = student_api.get(f'/api/notifications?since={since}&limit=2').get_json()
+        assert data['has_more'] is True
+        first_page = [n['id'] for n in data['notifications']]
+
+        data = student_api.get(f"/api/notifications?since={data['cursor']}&limit=2").get_json()
+        assert first_page + [n['id'] for n in data['notifications']] == [n.id for n in notifications]
+        assert data['has_more'] is False
+
+        data = student_api.get(f"/api/notifications?since={data['cursor']}").get_json()
+        assert data['count'] == 0
+
+    def test_state_is_answered_from_the_index(self, db, sample_student):
+        """Test the ETag state aggregate never reads notification rows."""
+        from sqlalchemy import case, func
+        query = db.session.query(
+            func.count(Notification.id),
+            func.sum(case((Notification.is_read == False, 1), else_=0)),
+            func.max(Notification.created_at),
+            func.max(Notification.read_at)
+        ).filter(Notification.user_id == sample_student.id)
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)))
+
+        assert 'COVERING INDEX ix_notifications_user_state' in plan
+
+    def test_etag_returns_304_until_something_changes(self, db, student_api, sample_student):
+        """Test an unchanged poll gets 304 and a new notification invalidates the ETag."""
+        _notify(sample_student.id)
+        first = student_api.get('/api/notifications')
+        etag = first.headers['ETag']
+
+        idle = student_api.get('/api/notifications', headers={'If-None-Match': etag})
+        assert idle.status_code == 304
+        assert idle.get_data() == b''
+
+        _notify(sample_student.id, 'New')
+        changed = student_api.get('/api/notifications', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+
+    def test_invalid_since(self, db, student_api):
+        """Test a malformed cursor is rejected."""
+        assert student_api.get('/api/notifications?since=yesterday').status_code == 400
+
+
+@pytest.mark.unit
+class TestUnreadCounters:
+    """Test maintained unread counters."""
+
+    def test_cached_count_skips_loader(self):
+        """Test a cached counter is served without hitting the database."""
+        counters = UnreadCounters()
+        assert counters.get('messages', 1, lambda: 3) == 3
+
+        def fail():
+            raise AssertionError('loader should not run on a cache hit')
+
+        counters.adjust('messages', 1, -1)
+        assert counters.get('messages', 1, fail) == 2
+
+    def test_stale_counter_is_reconciled(self):
+        """Test counters older than the reconcile interval are reloaded."""
+        counters = UnreadCounters(reconcile_seconds=0)
+        counters.get('messages', 1, lambda: 3)
+        assert counters.get('messages', 1, lambda: 5) == 5
+
+    def test_adjust_uncached_is_noop(self):
+        """Test adjusting an uncached counter does not invent a value."""
+        counters = UnreadCounters()
+        counters.adjust('messages', 1, 1)
+        assert counters.get('messages', 1, lambda: 0) == 0
+
+    def test_change_during_load_is_not_overwritten(self):
+        """Test a load that raced with an adjust isn't cached over the adjusted value."""
+        counters = UnreadCounters()
+        counters.get('messages', 1, lambda: 3)
+        counters.invalidate('messages', 1)
+
+        def racing_loader():
+            counters.adjust('messages', 1, 1)  # Commit lands mid-load
+            return 3
+
+        assert counters.get('messages', 1, racing_loader) == 3
+        assert counters.get('messages', 1, lambda: 4) == 4
+
+    def test_notification_counter_tracks_create_and_read(self, db, sample_student):
+        """Test the notification counter follows creates."""
+        assert NotificationService.get_unread_count(sample_student.id) == 0
+        _notify(sample_student.id)
+        _notify(sample_student.id)
+        assert NotificationService.get_unread_count(sample_student.id) == 2
+
+    def test_message_counter_tracks_send_and_read(self, db, sample_student, sample_admin):
+        """Test the message counter follows send, mark-read and delete."""
+        assert MessageDAL.get_unread_count(sample_admin.id) == 0
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        second = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+        assert MessageDAL.get_unread_count(sample_admin.id) == 2
+
+        MessageDAL.mark_as_read(first.id)
+        assert MessageDAL.get_unread_count(sample_admin.id) == 1
+
+        MessageDAL.delete_message(second.id)
+        assert MessageDAL.get_unread_count(sample_admin.id) == 0
+
+
+@pytest.mark.unit
+class TestBulkMarkRead:
+    """Test single-statement mark-read operations."""
+
+    def test_mark_all_notifications_read(self, db, sample_student, sample_admin):
+        """Test only the user's unread notifications are updated."""
+        _notify(sample_student.id)
+        _notify(sample_student.id)
+        other = _notify(sample_admin.id)
+        assert NotificationService.get_unread_count(sample_student.id) == 2
+
+        assert NotificationService.mark_all_read(sample_student.id) == 2
+        assert NotificationService.mark_all_read(sample_student.id) == 0
+
+        assert NotificationService.get_unread_count(sample_student.id) == 0
+        assert db.session.get(Notification, other.id).is_read is False
+
+    def test_mark_all_endpoint(self, db, api_client, sample_student):
+        """Test the mark-all endpoint reports the updated row count."""
+        with api_client.session_transaction() as sess:
+            sess['_user_id'] = str(sample_student.id)
+        _notify(sample_student.id)
+
+        data = api_client.post('/api/notifications/read-all').get_json()
+
+        assert data['count'] == 1
+        assert NotificationService.get_unread_count(sample_student.id) == 0
+
+    def test_mark_thread_read_for_recipient(self, db, sample_student, sample_admin):
+        """Test only messages addressed to the viewer are marked read."""
+        first = MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One', thread_id=1)
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two', thread_id=1)
+        reply = MessageDAL.send_message(sample_admin.id, sample_student.id, 'Re: Hi', 'Three', thread_id=1)
+        assert MessageDAL.get_unread_count(sample_admin.id) == 2
+
+        assert MessageDAL.mark_thread_as_read(1, recipient_id=sample_admin.id) == 2
+
+        assert MessageDAL.get_unread_count(sample_admin.id) == 0
+        assert db.session.get(type(first), reply.id).is_read is False
+
+    def test_mark_conversation_read(self, db, sample_student, sample_admin):
+        """Test conversation mark-read covers messages without a thread ID."""
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'One')
+        MessageDAL.send_message(sample_student.id, sample_admin.id, 'Hi', 'Two')
+
+        assert MessageDAL.mark_conversation_as_read(sample_admin.id, sample_student.id) == 2
+        assert MessageDAL.get_unread_count(sample_admin.id) == 0
+
+
+@pytest.mark.unit
+class TestNotificationBatching:
+    """Test enqueue()/flush() and single-commit booking actions."""
+
+    def _enqueue(self, user_id, title='Queued'):
+        return NotificationService.enqueue(
+            user_id=user_id,
+            notification_type=Notification.TYPE_BOOKING_CANCELLED,
+            title=title,
+            description='Details'
+        )
+
+    def test_enqueued_notifications_written_on_commit(self, db, sample_student, sample_admin):
+        """Test queued notifications are bulk inserted, counted and published on commit."""
+        assert NotificationService.get_unread_count(sample_student.id) == 0
+        subscriber = event_broker.subscribe(sample_student.id)
+        try:
+            queued = [self._enqueue(sample_student.id), self._enqueue(sample_admin.id)]
+            assert Notification.query.count() == 0
+            assert subscriber.empty()
+
+            db.session.commit()
+
+            assert Notification.query.count() == 2
+            assert NotificationService.get_unread_count(sample_student.id) == 1
+            assert subscriber.get_nowait()['data']['id'] == queued[0]['id']
+        finally:
+            event_broker.unsubscribe(sample_student.id, subscriber)
+
+    def test_rollback_discards_queue(self, db, sample_student):
+        """Test notifications queued in a rolled back transaction are never written."""
+        self._enqueue(sample_student.id)
+        NotificationService.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        assert Notification.query.count() == 0
+
+    def test_savepoint_rollback_keeps_queued_work(self, db, sample_student):
+        """Test rolling back a savepoint leaves the outer transaction's queued notifications alone."""
+        subscriber = event_broker.subscribe(sample_student.id)
+        try:
+            self._enqueue(sample_student.id)
+            db.session.begin_nested().rollback()
+            db.session.commit()
+
+            assert Notification.query.filter_by(user_id=sample_student.id).count() == 1
+            assert subscriber.get_nowait()['type'] == 'notification'
+        finally:
+            event_broker.unsubscribe(sample_student.id, subscriber)
+
+    def test_fan_out_uses_one_insert(self, db, sample_student, sample_booking, sample_staff):
+        """Test a two-party cancellation writes both notifications in one statement."""
+        from sqlalchemy import event
+        inserts = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO notifications'):
+                inserts.append(statement)
+
+        sample_booking.resource.creator_id = sample_staff.id
+        db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', _count)
+        try:
+            queued = NotificationService.notify_booking_cancelled(sample_booking, sample_student.id)
+            assert len(queued) == 2
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count)
+
+        assert len(inserts) == 1
+        assert Notification.query.filter_by(booking_id=sample_booking.id).count() == 2
+        # Returned ids are matched to their mappings, not just sorted
+        assert all(db.session.get(Notification, m['id']).user_id == m['user_id'] for m in queued)
+
+    def test_confirm_commits_once(self, db, admin_client, sample_booking, sample_student):
+        """Test approval, notification and in-app message share a single commit."""
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        from src.models.models import Booking, Message
+        commits = []
+        listener = lambda session: session.in_nested_transaction() or commits.append(session)  # Not savepoints
+
+        event.listen(Session, 'after_commit', listener)
+        try:
+            response = admin_client.post(f'/bookings/{sample_booking.id}/confirm')
+        finally:
+            event.remove(Session, 'after_commit', listener)
+
+        assert response.status_code == 200
+        assert len(commits) == 1
+        assert db.session.get(Booking, sample_booking.id).status == Booking.STATUS_CONFIRMED
+        assert Notification.query.filter_by(user_id=sample_student.id,
+                                            notification_type=Notification.TYPE_BOOKING_CONFIRMED).count() == 1
+        assert Message.query.filter_by(recipient_id=sample_student.id).count() == 1
+        assert MessageDAL.get_unread_count(sample_student.id) == 1
+
+    def test_failed_message_keeps_booking_change(self, db, admin_client, monkeypatch, sample_booking, sample_student):
+        """Test a failing in-app message insert doesn't discard the approval it accompanies."""
+        from sqlalchemy.exc import OperationalError
+        from src.data_access.conversation_dal import ConversationDAL
+        from src.models.models import Booking, Message
+
+        def fail(message):
+            raise OperationalError('INSERT INTO conversations', {}, Exception('disk I/O error'))
+
+        monkeypatch.setattr(ConversationDAL, 'record_message', staticmethod(fail))
+
+        response = admin_client.post(f'/bookings/{sample_booking.id}/confirm')
+
+        assert response.status_code == 200
+        db.session.expire_all()
+        assert db.session.get(Booking, sample_booking.id).status == Booking.STATUS_CONFIRMED
+        assert Notification.query.filter_by(user_id=sample_student.id,
+                                            notification_type=Notification.TYPE_BOOKING_CONFIRMED).count() == 1
+        assert Message.query.filter_by(recipient_id=sample_student.id).count() == 0
+        assert MessageDAL.get_unread_count(sample_student.id) == 0
+
+    def test_rollback_after_deferred_send_discards_message(self, db, sample_student, sample_admin):
+        """Test a message sent with commit=False as the transaction's first write is undone by the caller's rollback."""
+        from src.models.models import Message
+
+        db.session.commit()  # Start from a fresh transaction, so the savepoint is its first statement
+        MessageDAL.send_message(sample_admin.id, sample_student.id, 'Hi', 'Body', commit=False)
+        db.session.rollback()
+
+        assert Message.query.count() == 0
+
+
+@pytest.mark.unit
+class TestNotificationCoalescing:
+    """Test unread new-message notifications are merged per conversation."""
+
+    def _send(self, db, sender, recipient, body, thread_id=None):
+        message = MessageDAL.send_message(sender.id, recipient.id, 'Hi', body, thread_id=thread_id, commit=False)
+        NotificationService.notify_new_message(sender.id, recipient.id, message)
+        db.session.commit()
+        return message
+
+    def test_burst_updates_one_row(self, db, sample_student, sample_admin):
+        """Test a message burst keeps one unread row with count, latest preview and one badge increment."""
+        assert NotificationService.get_unread_count(sample_admin.id) == 0
+        first = self._send(db, sample_student, sample_admin, 'One')
+        for body in ('Two', 'Three'):
+            last = self._send(db, sample_student, sample_admin, body)
+
+        notification = Notification.query.filter_by(user_id=sample_admin.id).one()
+        assert notification.event_count == 3
+        assert notification.description == 'Three'
+        assert notification.message_id == last.id
+        assert notification.to_dict()['count'] == 3
+        assert notification.action_url == f'/messages/thread/{first.thread_id or first.id}'
+        assert NotificationService.get_unread_count(sample_admin.id) == 1
+
+    def test_read_notification_starts_new_row(self, db, sample_student, sample_admin):
+        """Test messages after the notification was read create a fresh notification."""
+        self._send(db, sample_student, sample_admin, 'One')
+        NotificationService.mark_all_read(sample_admin.id)
+
+        self._send(db, sample_student, sample_admin, 'Two')
+
+        rows = Notification.query.filter_by(user_id=sample_admin.id).order_by(Notification.id).all()
+        assert [(n.is_read, n.event_count) for n in rows] == [(True, 1), (False, 1)]
+        assert NotificationService.get_unread_count(sample_admin.id) == 1
+
+    def test_different_senders_not_merged(self, db, sample_student, sample_staff, sample_admin):
+        """Test each sender gets its own notification."""
+        self._send(db, sample_student, sample_admin, 'From student')
+        self._send(db, sample_staff, sample_admin, 'From staff')
+
+        assert Notification.query.filter_by(user_id=sample_admin.id, is_read=False).count() == 2
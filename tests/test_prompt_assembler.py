@@ -0,0 +1,56 @@
+"""
+Unit tests for the concierge prompt assembler.
+
+Tests cover:
+- Section trimming to token budgets
+- Predictable total prompt size regardless of input size
+"""
+
+import pytest
+import sys
+import os
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.services.prompt_assembler import (
+    PromptAssembler, STATIC_PREFIX, TRUNCATION_NOTE, estimate_tokens, format_user_profile
+)
+
+
+@pytest.mark.unit
+class TestPromptAssembler:
+    """Test budgeted prompt assembly."""
+
+    def test_small_sections_are_untouched(self):
+        """Test sections under budget are passed through verbatim."""
+        assert PromptAssembler.fit('## Rooms\nStudy Room 1', 100) == '## Rooms\nStudy Room 1'
+
+    def test_fit_respects_budget_and_lists_dropped_headings(self):
+        """Test oversized sections are cut to budget with a topic summary."""
+        text = '\n'.join(f'## Topic {i}\n' + 'detail ' * 40 for i in range(50))
+
+        fitted = PromptAssembler.fit(text, 300)
+
+        assert estimate_tokens(fitted) <= 300
+        assert fitted.startswith('## Topic 0')
+        assert 'Also covered (details omitted): Topic' in fitted
+        assert fitted.endswith(TRUNCATION_NOTE)
+
+    def test_prompt_size_is_bounded(self):
+        """Test total prompt size stays within prefix + budgets for huge inputs."""
+        budgets = {'persona': 100, 'knowledge': 200, 'resources': 200, 'profile': 50}
+        assembler = PromptAssembler(budgets)
+        huge = 'resource line\n' * 50000
+
+        prompt = assembler.assemble('rooms?', persona=huge, knowledge=huge, resources=huge,
+                                    user_preferences={'major': 'Informatics'})
+
+        assert prompt.startswith(STATIC_PREFIX)
+        assert prompt.endswith('Student Question: rooms?')
+        assert estimate_tokens(prompt) <= estimate_tokens(STATIC_PREFIX) + sum(budgets.values()) + 50
+
+    def test_empty_profile(self):
+        """Test missing preferences produce no profile section."""
+        assert format_user_profile(None) == ''
+        assert '- Major: Informatics' in format_user_profile({'major': 'Informatics'})
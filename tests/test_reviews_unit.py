@@ -0,0 +1,297 @@
+"""
+Unit tests for reviews.
+
+Tests cover:
+- Review stats maintained on create, update and delete
+- Verifying and rebuilding stats from the reviews table
+- Batch stats for many resources (endpoint and listing cards)
+- Review flags: one per user, moderation queue order and paging, legacy migration
+- Cached first page of reviews on the resource detail page
+"""
+
+import json
+import pytest
+import sys
+import os
+from datetime import datetime
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from src.data_access.review_dal import ReviewDAL
+from src.models.models import ResourceReviewStats, Review, ReviewFlag
+
+
+@pytest.mark.unit
+class TestReviewStats:
+    """Test the resource_review_stats aggregates."""
+
+    def test_writes_maintain_stats(self, db, sample_resource, sample_student, sample_staff):
+        """Test create, rating change and delete keep count, sum and histogram exact."""
+        first = ReviewDAL.create_review(sample_student.id, sample_resource.id, 5, 'Great')
+        second = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 2, 'Noisy')
+
+        stats = ReviewDAL.get_review_stats(sample_resource.id)
+        assert stats == {'average_rating': 3.5, 'total_reviews': 2,
+                         'distribution': {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}}
+
+        ReviewDAL.update_review(second.id, rating=4, comment='Better now')
+        assert ReviewDAL.get_rating_distribution(sample_resource.id) == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+        assert ReviewDAL.get_average_rating(sample_resource.id) == 4.5
+
+        ReviewDAL.delete_review(first.id)
+        assert ReviewDAL.get_review_stats(sample_resource.id)['total_reviews'] == 1
+        assert ReviewDAL.verify_review_stats() == []
+
+    def test_no_reviews(self, db, sample_resource):
+        """Test a resource without reviews reports zeros without a stats row."""
+        assert ReviewDAL.get_review_stats(sample_resource.id) == {
+            'average_rating': 0.0, 'total_reviews': 0, 'distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}}
+        assert ResourceReviewStats.query.count() == 0
+
+    def test_verify_and_rebuild(self, db, sample_resource, sample_student):
+        """Test drifted stats are reported and a rebuild repairs them."""
+        ReviewDAL.create_review(sample_student.id, sample_resource.id, 3)
+        stats = db.session.get(ResourceReviewStats, sample_resource.id)
+        stats.rating_sum = 99
+        db.session.commit()
+
+        assert ReviewDAL.verify_review_stats() == [sample_resource.id]
+
+        assert ReviewDAL.rebuild_review_stats() == 1
+        assert ReviewDAL.verify_review_stats() == []
+        assert ReviewDAL.get_average_rating(sample_resource.id) == 3.0
+
+    def test_endpoint_uses_stats(self, db, client, sample_resource, sample_student):
+        """Test the reviews JSON endpoint returns the maintained stats."""
+        ReviewDAL.create_review(sample_student.id, sample_resource.id, 4, 'Nice')
+
+        data = client.get(f'/reviews/resource/{sample_resource.id}').get_json()
+
+        assert data['stats']['average_rating'] == 4.0
+        assert data['stats']['total_reviews'] == 1
+
+
+@pytest.mark.unit
+class TestBatchReviewStats:
+    """Test review stats for many resources at once."""
+
+    def test_batch_endpoint(self, db, client, sample_resource, sample_equipment, sample_student):
+        """Test one request returns stats for every id, with zeros for unreviewed resources."""
+        ReviewDAL.create_review(sample_student.id, sample_resource.id, 5)
+
+        data = client.get(f'/reviews/stats?ids={sample_resource.id},{sample_equipment.id}').get_json()
+
+        assert data['stats'][str(sample_resource.id)]['average_rating'] == 5.0
+        assert data['stats'][str(sample_equipment.id)]['total_reviews'] == 0
+        assert client.get('/reviews/stats?ids=1,x').status_code == 400
+        assert client.get('/reviews/stats').status_code == 400
+
+    def test_listing_embeds_stats(self, db, client, sample_resource, sample_student):
+        """Test the resource list renders ratings server-side."""
+        ReviewDAL.create_review(sample_student.id, sample_resource.id, 4)
+
+        html = client.get('/resources').get_data(as_text=True)
+
+        assert '★ 4.0' in html
+        assert '(1 review)' in html
+
+
+@pytest.mark.unit
+class TestReviewFlags:
+    """Test the review_flags table and moderation queue."""
+
+    def test_flag_once_per_user(self, db, sample_resource, sample_student, sample_staff):
+        """Test each user's flag is stored once and the count tracks the rows."""
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 1, 'Bad')
+
+        ReviewDAL.flag_review(review.id, sample_student.id, 'Spam')
+        with pytest.raises(ValueError):
+            ReviewDAL.flag_review(review.id, sample_student.id, 'Spam again')
+
+        review = db.session.get(Review, review.id)
+        assert review.is_flagged
+        assert review.flag_count == 1
+        assert ReviewFlag.query.filter_by(review_id=review.id).count() == 1
+
+    def test_flag_endpoint(self, db, authenticated_client, sample_resource, sample_staff):
+        """Test the flag endpoint records the reason and rejects a repeat flag."""
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 2, 'Meh')
+
+        response = authenticated_client.post(f'/reviews/{review.id}/flag', json={'reason': 'Off topic'})
+        assert response.status_code == 200
+        assert response.get_json()['flag_count'] == 1
+
+        response = authenticated_client.post(f'/reviews/{review.id}/flag', json={'reason': 'Off topic'})
+        assert response.status_code == 400
+        assert ReviewFlag.query.one().reason == 'Off topic'
+
+    def test_queue_order_and_paging(self, db, admin_client, sample_resource, sample_equipment,
+                                    sample_student, sample_staff, sample_admin):
+        """Test the queue lists most-flagged reviews first and pages with has_more."""
+        once = ReviewDAL.create_review(sample_student.id, sample_resource.id, 3, 'Once')
+        twice = ReviewDAL.create_review(sample_student.id, sample_equipment.id, 3, 'Twice')
+        ReviewDAL.flag_review(twice.id, sample_staff.id, 'Rude')
+        ReviewDAL.flag_review(once.id, sample_staff.id, 'Spam')
+        ReviewDAL.flag_review(twice.id, sample_admin.id, 'Rude')
+
+        assert [review.id for review in ReviewDAL.get_flag_queue()] == [twice.id, once.id]
+
+        data = admin_client.get('/reviews/flagged?per_page=1').get_json()
+        assert [review['id'] for review in data['reviews']] == [twice.id]
+        assert [flag['reason'] for flag in data['reviews'][0]['flags']] == ['Rude', 'Rude']
+        assert data['has_more'] is True
+        assert data['total'] == 2
+
+        data = admin_client.get(f"/reviews/flagged?per_page=1&cursor={data['next_cursor']}").get_json()
+        assert [review['id'] for review in data['reviews']] == [once.id]
+        assert data['has_more'] is False
+        assert data['next_cursor'] is None
+        assert admin_client.get('/reviews/flagged?cursor=bad').status_code == 400
+
+    def test_queue_cursor_skips_reflagged_reviews(self, db, sample_resource, sample_equipment,
+                                                  sample_student, sample_staff, sample_admin):
+        """Test a review flagged again after its page was shown does not repeat on the next page."""
+        first = ReviewDAL.create_review(sample_student.id, sample_resource.id, 3, 'First')
+        second = ReviewDAL.create_review(sample_student.id, sample_equipment.id, 3, 'Second')
+        ReviewDAL.flag_review(second.id, sample_staff.id, 'Spam')
+        ReviewDAL.flag_review(first.id, sample_staff.id, 'Spam')
+
+        page = ReviewDAL.get_flag_queue(limit=1)
+        assert [review.id for review in page] == [first.id]
+        after = (page[0].flag_count, page[0].flagged_at, page[0].id)
+        ReviewDAL.flag_review(first.id, sample_admin.id, 'Rude')  # Moves ahead of the cursor
+
+        assert [review.id for review in ReviewDAL.get_flag_queue(after=after)] == [second.id]
+
+    def test_unflag_clears_flags(self, db, admin_client, sample_resource, sample_student, sample_staff):
+        """Test dismissing a review's flags removes its rows and takes it off the queue."""
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 4)
+        ReviewDAL.flag_review(review.id, sample_student.id, 'Wrong resource')
+
+        response = admin_client.post(f'/reviews/{review.id}/unflag')
+
+        assert response.status_code == 200
+        assert ReviewFlag.query.count() == 0
+        assert ReviewDAL.get_flag_queue() == []
+        assert ReviewDAL.count_flagged() == 0
+
+    def test_migrate_legacy_flags(self, db, sample_resource, sample_student, sample_staff):
+        """Test JSON flagged_by and flag_reason text become review_flags rows, once."""
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 1, 'Legacy')
+        review.is_flagged = True
+        review.flag_count = 1
+        review.flagged_by = json.dumps([sample_student.id])
+        review.flag_reason = f"[{sample_student.username} - 2024-03-01 09:30]: Inappropriate"
+        db.session.commit()
+
+        assert ReviewDAL.migrate_legacy_flags() == 1
+        assert ReviewDAL.migrate_legacy_flags() == 0
+
+        flag = ReviewFlag.query.one()
+        assert (flag.user_id, flag.reason) == (sample_student.id, 'Inappropriate')
+        assert flag.created_at == datetime(2024, 3, 1, 9, 30)
+        review = db.session.get(Review, review.id)
+        assert review.flag_count == 1
+        assert review.flagged_at == datetime(2024, 3, 1, 9, 30)
+        assert review.flagged_by is None and review.flag_reason is None
+
+
+@pytest.mark.unit
+class TestReviewFragments:
+    """Test the cached reviews fragment on the resource detail page."""
+
+    def _review_queries(self, db, request):
+        """Run request and return the SQL statements that touched review tables."""
+        from sqlalchemy import event
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if 'reviews' in statement or 'review_stats' in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            response = request()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+        return response, statements
+
+    def test_cache_hit_runs_only_version_lookup(self, db, client, sample_resource, sample_student):
+        """Test a repeat view serves the rendered reviews after one review version lookup."""
+        ReviewDAL.create_review(sample_student.id, sample_resource.id, 5, 'Spotless room')
+        url = f'/resources/{sample_resource.id}'
+
+        response, statements = self._review_queries(db, lambda: client.get(url))
+        assert 'Spotless room' in response.get_data(as_text=True)
+        assert statements
+
+        response, statements = self._review_queries(db, lambda: client.get(url))
+        html = response.get_data(as_text=True)
+        assert 'Spotless room' in html
+        assert '★ 5.0 · 1 review' in html
+        assert len(statements) == 1
+        assert statements[0].startswith('SELECT resource_review_stats.updated_at')
+
+    def test_writes_invalidate(self, db, client, sample_resource, sample_student, sample_staff):
+        """Test review create, update and delete show up on the next view."""
+        url = f'/resources/{sample_resource.id}'
+        assert 'No reviews yet' in client.get(url).get_data(as_text=True)
+
+        review = ReviewDAL.create_review(sample_student.id, sample_resource.id, 4, 'Quiet')
+        assert 'Quiet' in client.get(url).get_data(as_text=True)
+
+        ReviewDAL.update_review(review.id, comment='Very quiet')
+        assert 'Very quiet' in client.get(url).get_data(as_text=True)
+
+        ReviewDAL.delete_review(review.id)
+        assert 'No reviews yet' in client.get(url).get_data(as_text=True)
+
+    def test_guests_cannot_report(self, db, client, sample_resource, sample_staff):
+        """Test the guest variant renders reviews without report buttons."""
+        ReviewDAL.create_review(sample_staff.id, sample_resource.id, 2, 'Dirty')
+
+        html = client.get(f'/resources/{sample_resource.id}').get_data(as_text=True)
+
+        assert 'Dirty' in html
+        assert 'onclick="reportReview(' not in html
+
+    def test_flag_invalidates(self, db, admin_client, sample_resource, sample_student, sample_staff):
+        """Test moderators see the flag notice once a cached review is flagged."""
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 2, 'Dirty')
+        url = f'/resources/{sample_resource.id}'
+        assert 'pending review' not in admin_client.get(url).get_data(as_text=True)
+
+        ReviewDAL.flag_review(review.id, sample_student.id, 'Rude')
+
+        html = admin_client.get(url).get_data(as_text=True)
+        assert 'onclick="reportReview(' in html
+        assert 'pending review' in html
+
+    def test_writes_from_other_processes_are_seen(self, db, admin_client, monkeypatch, sample_resource,
+                                                  sample_student, sample_staff):
+        """Test a flag committed by another worker (no local invalidation) shows up via the version."""
+        from src.services.review_fragments import review_fragments
+        review = ReviewDAL.create_review(sample_staff.id, sample_resource.id, 2, 'Dirty')
+        url = f'/resources/{sample_resource.id}'
+        assert 'pending review' not in admin_client.get(url).get_data(as_text=True)
+
+        monkeypatch.setattr(review_fragments, 'invalidate_after_commit', lambda session, resource_id=None: None)
+        ReviewDAL.flag_review(review.id, sample_student.id, 'Rude')
+
+        assert 'pending review' in admin_client.get(url).get_data(as_text=True)
+
+    def test_show_more(self, app, db, client, sample_resource, sample_student, sample_staff, sample_admin):
+        """Test the first page is rendered inline and the rest loads as HTML."""
+        app.config['REVIEW_PAGE_SIZE'] = 2
+        for user, comment in ((sample_student, 'First'), (sample_staff, 'Second'), (sample_admin, 'Third')):
+            ReviewDAL.create_review(user.id, sample_resource.id, 3, comment)
+
+        html = client.get(f'/resources/{sample_resource.id}').get_data(as_text=True)
+        assert html.count('class="review-item') == 2
+        assert 'data-offset="2"' in html
+
+        data = client.get(f'/reviews/resource/{sample_resource.id}?format=html&offset=2').get_json()
+        assert data['count'] == 1
+        assert 'First' in data['html']
+        assert data['has_more'] is False
@@ -0,0 +1,79 @@
+"""
+Integration tests for the pooled SMTP backend.
+
+Tests cover:
+- Delivery of plain-text and HTML emails to a local SMTP sink
+- Connection reuse across messages and threads
+- Reconnecting after the server drops a pooled connection
+"""
+
+import pytest
+import socket
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+pytest.importorskip('aiosmtpd')
+
+# Add campus_resource_hub to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'campus_resource_hub')))
+
+from scripts.smtp_sink import SMTPSink
+from src.services.smtp_backend import SMTPBackend, SMTPConnectionPool
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+@pytest.fixture
+def backend(sink):
+    backend = SMTPBackend(
+        SMTPConnectionPool(sink.host, sink.port, use_tls=False, pool_size=2),
+        'noreply@campus-hub.local'
+    )
+    yield backend
+    backend.close()
+
+
+@pytest.mark.integration
+class TestSMTPBackend:
+    """Test the SMTP backend against a local sink."""
+
+    def test_send_plain_and_html(self, sink, backend):
+        """Test a message arrives with both text and HTML parts."""
+        assert backend.send('student1@iu.edu', 'Booking Confirmed', 'Plain body',
+                            to_name='Test Student', html_body='<p>HTML body</p>')
+
+        message = sink.messages[0]
+        assert message['To'] == 'Test Student <student1@iu.edu>'
+        assert message.get_body(('plain',)).get_content().strip() == 'Plain body'
+        assert '<p>HTML body</p>' in message.get_body(('html',)).get_content()
+
+    def test_connections_are_reused(self, sink, backend):
+        """Test many messages share the pool's connections."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: backend.send('student1@iu.edu', f'Msg {i}', 'Body'), range(20)))
+
+        assert len(sink.messages) == 20
+        assert backend.pool.connections_opened <= 2
+        assert sink.sessions <= 2
+
+    def test_send_many_uses_one_connection(self, sink, backend):
+        """Test a batch is sent over a single session."""
+        messages = [backend.build_message('student1@iu.edu', f'Msg {i}', 'Body') for i in range(5)]
+
+        assert backend.send_many(messages) == 5
+        assert sink.sessions == 1
+
+    def test_reconnects_after_dropped_connection(self, sink, backend):
+        """Test a connection closed by the server is replaced transparently."""
+        backend.send('student1@iu.edu', 'First', 'Body')
+        entry = backend.pool._idle.queue[0]
+        entry['conn'].sock.shutdown(socket.SHUT_RDWR)  # Simulate the server dropping an idle session
+
+        assert backend.send('student1@iu.edu', 'Second', 'Body')
+        assert [m['Subject'] for m in sink.messages] == ['First', 'Second']
+        assert backend.pool.connections_opened == 2